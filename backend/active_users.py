@@ -0,0 +1,100 @@
+# backend/active_users.py
+
+from sqlalchemy import func
+
+from db_routing import use_replica_a
+from extensions import db, get_redis
+from models import Booking
+
+# -------------------------------------------------
+# ACTIVE BOOKING COUNTS PER USER (Redis hash)
+# -------------------------------------------------
+# active_booking_counts: {user_id: number of ACTIVE bookings}; a user is
+# "active" when the count is > 0. Book, release and the cleanup job write
+# the affected users' counts after commit, read back from bookings (like
+# the occupancy bitmaps, so a late update cannot undo a newer one). The
+# hash is a derived copy: a missing key is rebuilt whole on read and the
+# key expires, so drift heals itself.
+
+ACTIVE_COUNTS_KEY_A = "active_booking_counts"
+ACTIVE_COUNTS_TTL_SECONDS_A = 600
+
+
+def load_active_counts_a(user_ids=None):
+    """{user_id: ACTIVE bookings} from the DB (all users, or user_ids)."""
+    query_a = db.session.query(Booking.user_id, func.count(Booking.id)).filter(
+        Booking.status == "ACTIVE"
+    )
+    if user_ids is not None:
+        query_a = query_a.filter(Booking.user_id.in_(list(user_ids)))
+    return dict(query_a.group_by(Booking.user_id).all())
+
+
+def rebuild_active_counts_a():
+    """Rewrite the whole hash from bookings. Returns the counts."""
+    # shared cache: filled from the primary, never a lagging replica
+    with use_replica_a(False):
+        counts_a = load_active_counts_a()
+
+    pipe_a = get_redis().pipeline(transaction=True)
+    pipe_a.delete(ACTIVE_COUNTS_KEY_A)
+    # a placeholder field keeps the key (and its TTL) when nobody is active
+    pipe_a.hset(ACTIVE_COUNTS_KEY_A, mapping={"_": 0, **counts_a})
+    pipe_a.expire(ACTIVE_COUNTS_KEY_A, ACTIVE_COUNTS_TTL_SECONDS_A)
+    pipe_a.execute()
+
+    print(f"[ACTIVE USERS] Rebuilt active booking counts ({len(counts_a)} user(s))")
+    return counts_a
+
+
+def sync_active_users_a(user_ids):
+    """Write the committed ACTIVE counts of user_ids into the hash."""
+    user_ids = {int(u) for u in user_ids if u is not None}
+    if not user_ids:
+        return
+
+    counts_a = load_active_counts_a(user_ids)
+
+    try:
+        redis_a = get_redis()
+        pipe_a = redis_a.pipeline(transaction=False)
+        pipe_a.hset(
+            ACTIVE_COUNTS_KEY_A,
+            mapping={u: counts_a.get(u, 0) for u in user_ids},
+        )
+        pipe_a.ttl(ACTIVE_COUNTS_KEY_A)
+        _, ttl_a = pipe_a.execute()
+
+        # HSET on a missing key created a hash with only these users:
+        # drop it so the next read rebuilds the whole thing
+        if ttl_a == -1:
+            redis_a.delete(ACTIVE_COUNTS_KEY_A)
+    except Exception as e:
+        print(f"[ACTIVE USERS] Could not update counts: {e}")
+
+
+def active_user_flags_a(user_ids):
+    """
+    {user_id: is_active} for user_ids: one HMGET, the hash rebuilt if
+    missing, one grouped query for just these users if Redis is down.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+
+    try:
+        redis_a = get_redis()
+        pipe_a = redis_a.pipeline(transaction=False)
+        pipe_a.exists(ACTIVE_COUNTS_KEY_A)
+        pipe_a.hmget(ACTIVE_COUNTS_KEY_A, user_ids)
+        exists_a, values_a = pipe_a.execute()
+
+        if exists_a:
+            return {u: int(v or 0) > 0 for u, v in zip(user_ids, values_a)}
+
+        counts_a = rebuild_active_counts_a()
+    except Exception as e:
+        print(f"[ACTIVE USERS] Redis unavailable, counting from DB: {e}")
+        counts_a = load_active_counts_a(user_ids)
+
+    return {u: counts_a.get(u, 0) > 0 for u in user_ids}
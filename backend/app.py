@@ -1,10 +1,13 @@
 # backend/app.py
 
+import json
+
+import click
 from flask import Flask
 from flask_cors import CORS
 
-from config import Config
-from extensions import db, bcrypt, init_redis_a   # ✅ import init_redis_a
+from config import DEFAULT_SECRET_KEY, Config
+from extensions import db, bcrypt, init_db_a, init_l1_cache_a, init_redis_a   # ✅ import init_redis_a
 
 # import all blueprints
 from routes.auth_routes import auth_bp
@@ -14,18 +17,24 @@ from routes.booking_routes import booking_bp
 from routes.export_routes import export_bp        # ✅ NEW import
 
 
-def create_app():
-    """Create and configure the Flask application."""
+def create_app(config_overrides=None):
+    """
+    Create and configure the Flask application.
+    config_overrides: settings applied on top of Config (tests use
+    sqlite:// and their own SECRET_KEY).
+    """
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.config.update(config_overrides or {})
 
     # allow frontend (Vue) to call this API later
     CORS(app)
 
-    # initialise extensions (database, bcrypt, redis)
-    db.init_app(app)
+    # initialise extensions (database with its DB_PROFILE, bcrypt, redis)
+    init_db_a(app)
     bcrypt.init_app(app)
     init_redis_a(app)      # ✅ initialise Redis
+    init_l1_cache_a(app)
 
     # register all blueprints
     app.register_blueprint(auth_bp, url_prefix="/auth")
@@ -39,15 +48,116 @@ def create_app():
     def home():
         return {"message": "Vehicle Parking System backend is running"}
 
+    register_cli_commands_a(app)
+
+    if app.config["SECRET_KEY"] == DEFAULT_SECRET_KEY:
+        print(
+            "[AUTH] SECRET_KEY is the public default: login tokens are only "
+            "issued in debug/testing. Set SECRET_KEY for any other deployment."
+        )
+
     return app
 
 
+def register_cli_commands_a(app):
+    """Maintenance commands, run as `flask --app app <command>`."""
+
+    @app.cli.command("upgrade-db")
+    def upgrade_db_command():
+        """Create missing tables and columns in an existing database."""
+        from db_upgrade import upgrade_schema_a
+
+        added = upgrade_schema_a()
+        click.echo(f"Schema up to date ({len(added)} column(s) added).")
+
+    @app.cli.command("reconcile-counters")
+    @click.option("--dry-run", is_flag=True, help="Only report drift, do not repair.")
+    def reconcile_counters_command(dry_run):
+        """Compare lot free/occupied counters with parking_slots and repair drift."""
+        from lot_summary import reconcile_lot_counters_a
+
+        drifted = reconcile_lot_counters_a(repair=not dry_run)
+        for d in drifted:
+            click.echo(json.dumps(d))
+        action = "found" if dry_run else "repaired"
+        click.echo(f"{len(drifted)} lot(s) with drifted counters {action}.")
+
+    @app.cli.command("rebuild-slot-pools")
+    def rebuild_slot_pools_command():
+        """Rebuild the Redis free-slot pools from parking_slots."""
+        from slot_pool import rebuild_free_slot_pools_a
+
+        pools = rebuild_free_slot_pools_a()
+        click.echo(f"Rebuilt free-slot pools for {len(pools)} lot(s).")
+
+    @app.cli.command("check-query-plans")
+    @click.option("--live", is_flag=True, help="Explain against the configured database.")
+    def check_query_plans_command(live):
+        """EXPLAIN the hot queries and fail if one stops using its index."""
+        from query_plans import check_query_plans_a
+
+        if live and db.engine.dialect.name != "sqlite":
+            click.echo("check-query-plans only understands SQLite plans.")
+            return
+
+        results = check_query_plans_a(live=live)
+        for r in results:
+            status = "OK  " if r["ok"] else "MISS"
+            click.echo(f"{status} {r['query']}  [{r['index']}]")
+            if not r["ok"]:
+                for line in r["plan"]:
+                    click.echo(f"       {line}")
+
+        missed = [r for r in results if not r["ok"]]
+        if missed:
+            raise SystemExit(f"{len(missed)} query(ies) not using their index.")
+        click.echo(f"All {len(results)} hot queries use their index.")
+
+    @app.cli.command("replicate-sqlite")
+    @click.option("--interval", type=float, default=0, help="Repeat every N seconds (0 = once).")
+    def replicate_sqlite_command(interval):
+        """Copy the SQLite primary over the SQLite replicas (local stand-in replicator)."""
+        import time
+
+        from db_routing import replicate_sqlite_a
+
+        replicas = app.config["SQLALCHEMY_REPLICA_URIS"]
+        if not replicas:
+            click.echo("No replicas configured (DATABASE_REPLICA_URLS).")
+            return
+
+        while True:
+            written = replicate_sqlite_a(app.config["SQLALCHEMY_DATABASE_URI"], replicas)
+            click.echo(f"Replicated to {len(written)} replica(s).")
+            if interval <= 0:
+                break
+            time.sleep(interval)
+
+    @app.cli.command("rebuild-lot-bitmaps")
+    def rebuild_lot_bitmaps_command():
+        """Rebuild the Redis occupancy bitmaps from parking_slots."""
+        from slot_bitmap import rebuild_lot_bitmaps_a
+
+        bitmaps = rebuild_lot_bitmaps_a()
+        click.echo(f"Rebuilt occupancy bitmaps for {len(bitmaps)} lot(s).")
+
+
 if __name__ == "__main__":
     app = create_app()
 
-    # create tables in the database if they do not exist
+    # create tables (and any newer columns) if they do not exist
     with app.app_context():
-        db.create_all()
+        from db_upgrade import upgrade_schema_a
+        upgrade_schema_a()
+
+        # Redis free-slot pools / bitmaps may be stale or empty after a restart
+        from slot_bitmap import rebuild_lot_bitmaps_a
+        from slot_pool import rebuild_free_slot_pools_a
+        try:
+            rebuild_free_slot_pools_a()
+            rebuild_lot_bitmaps_a()
+        except Exception as e:
+            print(f"[POOL] Skipped free-slot pool rebuild: {e}")
 
     # start the development server
     app.run(debug=True)
@@ -0,0 +1,164 @@
+# backend/auth_tokens.py
+
+import time
+import uuid
+from functools import wraps
+
+from flask import current_app, g, jsonify, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+from config import DEFAULT_SECRET_KEY, Config
+from extensions import get_redis
+
+# -------------------------------------------------
+# SIGNED AUTH TOKENS
+# -------------------------------------------------
+# Login / register return a token signed with SECRET_KEY that carries
+# {"id", "role", "jti"}. Checking it is an HMAC plus one Redis EXISTS on
+# the denylist, no DB lookup. Logout denylists the token's jti until the
+# token would have expired anyway, so the denylist stays small.
+#
+# Clients send "Authorization: Bearer <token>". Only routes that serve
+# plain links which cannot set headers (the export download) also take
+# ?token=<token>; anywhere else a token in the URL would end up in access
+# logs, browser history and Referer headers.
+
+TOKEN_SALT_A = "vps-auth-token"
+DENYLIST_PREFIX_A = "auth_denylist_"
+
+
+def signing_key_ok_a():
+    """
+    False when SECRET_KEY is the placeholder from this repo and the app is
+    not in debug/testing: anyone could forge an ADMIN token with it, so no
+    token is issued or accepted until a real key is set.
+    """
+    if current_app.config.get("SECRET_KEY") != DEFAULT_SECRET_KEY:
+        return True
+    return current_app.debug or current_app.testing
+
+
+def auth_unavailable_response_a():
+    return jsonify({"message": "Login is disabled: the server has no SECRET_KEY set"}), 503
+
+
+def _serializer_a():
+    if not signing_key_ok_a():
+        raise RuntimeError("Refusing to sign/verify tokens with the default SECRET_KEY")
+    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt=TOKEN_SALT_A)
+
+
+def issue_token_a(user):
+    return _serializer_a().dumps(
+        {"id": user.id, "role": user.role, "jti": uuid.uuid4().hex}
+    )
+
+
+def denylist_key_a(jti):
+    return f"{DENYLIST_PREFIX_A}{jti}"
+
+
+def is_revoked_a(jti):
+    try:
+        return bool(get_redis().exists(denylist_key_a(jti)))
+    except Exception as e:
+        # same trade-off as the caches: Redis down does not log everyone out
+        print(f"[AUTH] Denylist check failed, accepting token: {e}")
+        return False
+
+
+def verify_token_a(token):
+    """Claims dict (plus "iat") of a valid, unrevoked token, else None."""
+    try:
+        claims_a, signed_at_a = _serializer_a().loads(
+            token, max_age=Config.AUTH_TOKEN_MAX_AGE_SECONDS, return_timestamp=True
+        )
+    except (SignatureExpired, BadSignature):
+        return None
+
+    if is_revoked_a(claims_a.get("jti")):
+        return None
+    claims_a["iat"] = signed_at_a.timestamp()
+    return claims_a
+
+
+def revoke_token_a(claims):
+    """Denylist a token for the rest of its lifetime."""
+    remaining_a = int(
+        claims["iat"] + Config.AUTH_TOKEN_MAX_AGE_SECONDS - time.time()
+    )
+    if remaining_a <= 0:
+        return
+    try:
+        get_redis().set(denylist_key_a(claims["jti"]), 1, ex=remaining_a)
+    except Exception as e:
+        print(f"[AUTH] Could not revoke token {claims['jti']}: {e}")
+
+
+def request_token_a(allow_query_token=False):
+    header_a = request.headers.get("Authorization", "")
+    if header_a.startswith("Bearer "):
+        return header_a[len("Bearer "):].strip()
+    if allow_query_token:
+        return request.args.get("token")
+    return None
+
+
+def current_auth_a():
+    """Claims of the verified token of this request (None if not checked yet)."""
+    return g.get("auth_user")
+
+
+def authenticate_a(role=None, allow_query_token=False):
+    """
+    Verify the request's token and store its claims in g.auth_user.
+    Returns an error response (401 / 403) or None when access is allowed.
+    """
+    if not signing_key_ok_a():
+        return auth_unavailable_response_a()
+
+    token_a = request_token_a(allow_query_token)
+    if not token_a:
+        return jsonify({"message": "Login required"}), 401
+
+    claims_a = verify_token_a(token_a)
+    if claims_a is None:
+        return jsonify({"message": "Invalid or expired token, please login again"}), 401
+
+    if role is not None and claims_a.get("role") != role:
+        return jsonify({"message": "Not allowed"}), 403
+
+    g.auth_user = claims_a
+    return None
+
+
+def login_required_a(role=None, allow_query_token=False):
+    """
+    Route decorator: a valid token (of `role`, if given) is required.
+    allow_query_token: also accept ?token= (download links only).
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            error_a = authenticate_a(role, allow_query_token)
+            if error_a is not None:
+                return error_a
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def may_act_for_a(user_id):
+    """True if the authenticated user is user_id or an admin."""
+    claims_a = current_auth_a()
+    if claims_a is None:
+        return False
+    if claims_a.get("role") == "ADMIN":
+        return True
+    try:
+        return int(user_id) == claims_a["id"]
+    except (TypeError, ValueError):
+        return False
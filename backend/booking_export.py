@@ -0,0 +1,301 @@
+# backend/booking_export.py
+
+import csv
+import glob
+import gzip
+import io
+import os
+import shutil
+
+from sqlalchemy import and_, exists, or_, select
+
+from extensions import db
+from models import Booking, ExportJob, ParkingLot, ParkingSlot
+
+EXPORT_FIELDNAMES = [
+    "booking_id",
+    "user_id",
+    "slot_id",
+    "vehicle_number",
+    "start_time",
+    "end_time",
+    "amount",
+    "status",
+]
+
+# only these columns are selected; rows stay plain tuples (no ORM objects)
+EXPORT_COLUMNS = [
+    Booking.id,
+    Booking.user_id,
+    Booking.slot_id,
+    Booking.vehicle_number,
+    Booking.start_time,
+    Booking.end_time,
+    Booking.amount,
+    Booking.status,
+]
+
+# file_format -> (file extension, download mimetype)
+EXPORT_FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "csv.gz": (".csv.gz", "application/gzip"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+
+def exports_dir_a():
+    """backend/exports, created on first use."""
+    path_a = os.path.join(os.path.dirname(__file__), "exports")
+    os.makedirs(path_a, exist_ok=True)
+    return path_a
+
+
+def partition_criteria_a(range_start, range_end, lot_id):
+    """
+    Criteria of one lot's partition of the admin all-bookings export.
+    lot_id=None is the partition of bookings whose slot or lot is gone.
+    """
+    if lot_id is None:
+        in_lot_a = ~exists().where(
+            ParkingSlot.id == Booking.slot_id,
+            ParkingLot.id == ParkingSlot.lot_id,
+        )
+    else:
+        in_lot_a = Booking.slot_id.in_(
+            select(ParkingSlot.id).where(ParkingSlot.lot_id == lot_id)
+        )
+    return [
+        Booking.start_time >= range_start,
+        Booking.start_time < range_end,
+        in_lot_a,
+    ]
+
+
+def booking_chunk_query_a(criteria, chunk_size, after=None):
+    """
+    One export chunk: bookings matching criteria after the (start_time, id)
+    `after` (None = from the start), ordered by start_time, id.
+    """
+    query_a = db.session.query(*EXPORT_COLUMNS).filter(*criteria)
+
+    if after is not None:
+        last_start_a, last_id_a = after
+        if last_start_a is None:
+            query_a = query_a.filter(
+                or_(
+                    Booking.start_time.isnot(None),
+                    Booking.id > last_id_a,
+                )
+            )
+        else:
+            query_a = query_a.filter(
+                or_(
+                    Booking.start_time > last_start_a,
+                    and_(
+                        Booking.start_time == last_start_a,
+                        Booking.id > last_id_a,
+                    ),
+                )
+            )
+
+    return query_a.order_by(
+        Booking.start_time.asc().nulls_first(), Booking.id.asc()
+    ).limit(chunk_size)
+
+
+def iter_booking_chunks_a(criteria, chunk_size):
+    """
+    Yield lists of booking tuples (EXPORT_COLUMNS) ordered by start_time, id.
+
+    Keyset pagination: every chunk is its own short query that continues
+    after the last (start_time, id) seen, so memory stays bounded and the
+    caller may commit progress between chunks without a cursor held open
+    (SQLite readers would block those progress writes).
+    """
+    last_a = None
+
+    while True:
+        chunk_a = booking_chunk_query_a(criteria, chunk_size, after=last_a).all()
+        if not chunk_a:
+            return
+
+        yield chunk_a
+
+        last_a = (chunk_a[-1][4], chunk_a[-1][0])
+        if len(chunk_a) < chunk_size:
+            return
+
+
+def csv_row_a(row):
+    """Booking tuple -> CSV tuple (ISO timestamps, empty for NULL)."""
+    booking_id, user_id, slot_id, vehicle, start, end, amount, status = row
+    return (
+        booking_id,
+        user_id,
+        slot_id,
+        vehicle,
+        start.isoformat() if start else "",
+        end.isoformat() if end else "",
+        amount,
+        status,
+    )
+
+
+def write_csv_export_a(file_path, chunks, compress=False, header=True, on_progress=None):
+    """
+    Stream booking chunks into a CSV (optionally gzip) file.
+
+    on_progress(rows_written, bytes_written) is called after every chunk;
+    bytes are measured on disk, i.e. after compression.
+    Returns (rows_written, bytes_written).
+    """
+    rows_written_a = 0
+
+    with open(file_path, "wb") as raw_a:
+        sink_a = gzip.GzipFile(fileobj=raw_a, mode="wb") if compress else raw_a
+        text_a = io.TextIOWrapper(sink_a, encoding="utf-8", newline="")
+        writer_a = csv.writer(text_a)
+
+        if header:
+            writer_a.writerow(EXPORT_FIELDNAMES)
+
+        for chunk_a in chunks:
+            writer_a.writerows(csv_row_a(r) for r in chunk_a)
+            rows_written_a += len(chunk_a)
+
+            if on_progress:
+                text_a.flush()
+                on_progress(rows_written_a, raw_a.tell())
+
+        text_a.flush()
+        text_a.detach()
+        if compress:
+            sink_a.close()
+        bytes_written_a = raw_a.tell()
+
+    return rows_written_a, bytes_written_a
+
+
+def write_parquet_export_a(file_path, chunks, on_progress=None):
+    """
+    Stream booking chunks into a Parquet file, one row group per chunk.
+
+    Columns are typed for analytics: int64 ids, timestamp start/end,
+    float64 amount, and dictionary-encoded vehicle_number / status.
+    pyarrow is imported here so only workers producing Parquet need it.
+    Returns (rows_written, bytes_written).
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("pyarrow is required for parquet exports")
+
+    dict_type_a = pa.dictionary(pa.int32(), pa.string())
+    schema_a = pa.schema([
+        ("booking_id", pa.int64()),
+        ("user_id", pa.int64()),
+        ("slot_id", pa.int64()),
+        ("vehicle_number", dict_type_a),
+        ("start_time", pa.timestamp("us")),
+        ("end_time", pa.timestamp("us")),
+        ("amount", pa.float64()),
+        ("status", dict_type_a),
+    ])
+
+    rows_written_a = 0
+
+    with pq.ParquetWriter(file_path, schema_a, compression="snappy") as writer_a:
+        for chunk_a in chunks:
+            columns_a = list(zip(*chunk_a))
+            arrays_a = []
+            for field_a, values_a in zip(schema_a, columns_a):
+                if pa.types.is_dictionary(field_a.type):
+                    arrays_a.append(
+                        pa.array(values_a, type=pa.string()).dictionary_encode()
+                    )
+                else:
+                    arrays_a.append(pa.array(values_a, type=field_a.type))
+
+            writer_a.write_table(pa.Table.from_arrays(arrays_a, schema=schema_a))
+            rows_written_a += len(chunk_a)
+
+            if on_progress:
+                on_progress(rows_written_a, os.path.getsize(file_path))
+
+    return rows_written_a, os.path.getsize(file_path)
+
+
+def add_export_progress_a(export_id, rows_delta, bytes_delta, partitions_delta=0):
+    """
+    Add to the ExportJob progress counters with column arithmetic, so
+    parallel partition tasks can report into the same row.
+    """
+    ExportJob.query.filter_by(id=export_id).update(
+        {
+            ExportJob.rows_written: ExportJob.rows_written + rows_delta,
+            ExportJob.bytes_written: ExportJob.bytes_written + bytes_delta,
+            ExportJob.partitions_done: ExportJob.partitions_done + partitions_delta,
+        },
+        synchronize_session=False,
+    )
+    db.session.commit()
+
+
+def export_part_path_a(export_id, lot_id, extension):
+    """exports/parts/export_{id}_lot_{lot}{ext}, the directory created on first use."""
+    parts_dir_a = os.path.join(exports_dir_a(), "parts")
+    os.makedirs(parts_dir_a, exist_ok=True)
+    return os.path.join(parts_dir_a, f"export_{export_id}_lot_{lot_id}{extension}")
+
+
+def remove_export_parts_a(export_id):
+    """
+    Delete every partition file of an export. A failed partition stops
+    the chord before the merge (which normally removes them), so the
+    failure path calls this. Returns how many files were removed.
+    """
+    pattern_a = os.path.join(exports_dir_a(), "parts", f"export_{export_id}_lot_*")
+    removed_a = 0
+    for part_a in glob.glob(pattern_a):
+        try:
+            os.remove(part_a)
+            removed_a += 1
+        except FileNotFoundError:
+            pass
+    return removed_a
+
+
+def merge_export_parts_a(file_path, part_paths, compress=False):
+    """
+    Concatenate partition files (written without header) into file_path.
+
+    The header is written first; gzip parts are appended byte for byte,
+    since concatenated gzip members form a valid gzip file. Part files
+    are removed afterwards. Returns the merged file size.
+    """
+    header_a = (",".join(EXPORT_FIELDNAMES) + "\r\n").encode("utf-8")
+
+    with open(file_path, "wb") as out_a:
+        out_a.write(gzip.compress(header_a) if compress else header_a)
+        for part_a in part_paths:
+            with open(part_a, "rb") as in_a:
+                shutil.copyfileobj(in_a, out_a, 1024 * 1024)
+        size_a = out_a.tell()
+
+    for part_a in part_paths:
+        os.remove(part_a)
+
+    return size_a
+
+
+def record_export_progress_a(export_id, rows_written, bytes_written):
+    """Store progress on the ExportJob row so export_status can report it."""
+    ExportJob.query.filter_by(id=export_id).update(
+        {
+            ExportJob.rows_written: rows_written,
+            ExportJob.bytes_written: bytes_written,
+        },
+        synchronize_session=False,
+    )
+    db.session.commit()
@@ -1,20 +1,46 @@
 # backend/celery_worker.py
 
 import os
-import csv
-import smtplib                           # for sending emails
-from email.mime.text import MIMEText     # for HTML email body
+import time
+from itertools import groupby
 from datetime import datetime, timedelta
 
-from celery import Celery
+from celery import Celery, chord
 from celery.schedules import crontab  # for periodic jobs
+from sqlalchemy import bindparam, update
 
 from config import Config
 from app import create_app
+from active_users import sync_active_users_a
+from db_routing import use_replica_a
+from booking_export import (
+    EXPORT_FORMATS,
+    exports_dir_a,
+    add_export_progress_a,
+    export_part_path_a,
+    iter_booking_chunks_a,
+    merge_export_parts_a,
+    partition_criteria_a,
+    record_export_progress_a,
+    remove_export_parts_a,
+    write_csv_export_a,
+    write_parquet_export_a,
+)
+from email_templates import render_email_a, render_many_a, render_stats_a
 from extensions import db
+from job_queries import (
+    monthly_usage_query_a,
+    stale_bookings_query_a,
+    users_without_booking_query_a,
+)
+from mailer import get_mailer, send_bulk_email
+from occupancy import (
+    compute_amount_a,
+    free_slots_without_booking_a,
+    on_slots_changed_a,
+)
 from models import (
     Booking,
-    ParkingSlot,
     ExportJob,
     User,
     ParkingLot,
@@ -40,58 +66,81 @@ _flask_app = create_app()
 
 def send_email_basic(to_email, subject, html_body):
 
-    try:
-        msg = MIMEText(html_body, "html")
-        msg["Subject"] = subject
-        msg["From"] = Config.FROM_EMAIL
-        msg["To"] = to_email
+    # Do not crash the Celery job if email fails (the mailer logs it)
+    if get_mailer().send_batch([(to_email, subject, html_body)]):
+        print(f"[EMAIL] Sent mail to {to_email} with subject '{subject}'")
 
-        with smtplib.SMTP(Config.MAIL_SERVER, Config.MAIL_PORT) as server:
-            server.sendmail(Config.FROM_EMAIL, [to_email], msg.as_string())
 
-        print(f"[EMAIL] Sent mail to {to_email} with subject '{subject}'")
-    except Exception as e:
-        # Do not crash the Celery job if email fails
-        print(f"[EMAIL] Failed to send mail to {to_email}: {e}")
+def send_email_batch_a(messages):
+    """
+    Send many [(to_email, subject, html_body), ...] through the pooled
+    mailer: MAIL_BATCH_SIZE messages per SMTP session, rate limited and
+    retried. Returns how many were accepted.
+    """
+    return send_bulk_email(messages)
 
 
 # -------------------------------------------------
-# 1. CLEANUP STALE BOOKINGS (manual trigger from Admin)
+# 1. CLEANUP STALE BOOKINGS (Admin button + scheduled)
 # -------------------------------------------------
 @celery.task
-def cleanup_stale_bookings_a():
+def cleanup_stale_bookings_a(batch_size=None):
 
-    with _flask_app.app_context():
-        # bookings older than 8 hours
-        cutoff_time = datetime.utcnow() - timedelta(hours=8)
+    batch_size = batch_size or Config.CLEANUP_BATCH_SIZE
 
-        stale_bookings = Booking.query.filter(
-            Booking.status == "ACTIVE",
-            Booking.start_time < cutoff_time,
-        ).all()
+    with _flask_app.app_context():
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        # bookings older than STALE_BOOKING_HOURS (8 by default)
+        cutoff_time = now - timedelta(hours=Config.STALE_BOOKING_HOURS)
+
+        close_stmt = (
+            update(Booking.__table__)
+            .where(
+                Booking.__table__.c.id == bindparam("b_id"),
+                Booking.__table__.c.status == "ACTIVE",
+            )
+            .values(status="COMPLETED", end_time=now, amount=bindparam("b_amount"))
+        )
 
         changed_count = 0
+        last_id = 0
+
+        # keyset over booking id, one short transaction per chunk
+        while True:
+            rows = stale_bookings_query_a(cutoff_time, last_id, batch_size).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            # same billing rule as release_slot
+            params = [
+                {
+                    "b_id": r.id,
+                    "b_amount": compute_amount_a(r.start_time, now, r.price_per_hour)[0],
+                }
+                for r in rows
+            ]
+            db.session.execute(close_stmt, params)
 
-        for booking in stale_bookings:
-            # free the slot
-            slot = ParkingSlot.query.get(booking.slot_id)
-            if slot:
-                slot.is_occupied = False
-
-            # close the booking
-            booking.status = "COMPLETED"
-            booking.end_time = datetime.utcnow()
-            changed_count += 1
-
-        if changed_count > 0:
+            freed = free_slots_without_booking_a({r.slot_id for r in rows})
             db.session.commit()
 
-        print(f"[CLEANUP] Closed {changed_count} stale bookings.")
+            on_slots_changed_a([(lot_id, slot_id, False) for lot_id, slot_id in freed])
+            sync_active_users_a({r.user_id for r in rows})
+            changed_count += len(rows)
+
+        elapsed = time.perf_counter() - started
+        rate = changed_count / elapsed if elapsed > 0 else 0.0
+        print(
+            f"[CLEANUP] Closed {changed_count} stale bookings in {elapsed:.2f}s "
+            f"({rate:.0f} rows/s, batch_size={batch_size})."
+        )
         return changed_count
 
 
 # -------------------------------------------------
-# 2. USER CSV EXPORT JOB (User-triggered async job)
+# 2. USER BOOKINGS EXPORT JOB (CSV / CSV.GZ / Parquet, user-triggered)
 # -------------------------------------------------
 @celery.task
 def export_user_bookings_csv(export_id):
@@ -103,62 +152,54 @@ def export_user_bookings_csv(export_id):
             return f"ExportJob {export_id} not found"
 
         try:
+            criteria = [Booking.user_id == job.user_id]
+
             job.status = "IN_PROGRESS"
+            job.rows_total = Booking.query.filter(*criteria).count()
+            job.rows_written = 0
+            job.bytes_written = 0
             db.session.commit()
 
-            # all bookings for this user
-            bookings = (
-                Booking.query
-                .filter_by(user_id=job.user_id)
-                .order_by(Booking.start_time.asc())
-                .all()
-            )
-
-            # ensure exports folder exists
-            base_dir = os.path.dirname(__file__)
-            exports_dir = os.path.join(base_dir, "exports")
-            os.makedirs(exports_dir, exist_ok=True)
-
+            extension, _ = EXPORT_FORMATS[job.file_format]
             timestamp_str = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-            file_name = f"bookings_user_{job.user_id}_{timestamp_str}.csv"
-            file_path = os.path.join(exports_dir, file_name)
-
-            fieldnames = [
-                "booking_id",
-                "user_id",
-                "slot_id",
-                "vehicle_number",
-                "start_time",
-                "end_time",
-                "amount",
-                "status",
-            ]
+            file_name = f"bookings_user_{job.user_id}_{timestamp_str}{extension}"
+            file_path = os.path.join(exports_dir_a(), file_name)
 
-            with open(file_path, mode="w", newline="", encoding="utf-8") as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-
-                for b in bookings:
-                    writer.writerow({
-                        "booking_id": b.id,
-                        "user_id": b.user_id,
-                        "slot_id": b.slot_id,
-                        "vehicle_number": b.vehicle_number,
-                        "start_time": b.start_time.isoformat() if b.start_time else "",
-                        "end_time": b.end_time.isoformat() if b.end_time else "",
-                        "amount": b.amount,
-                        "status": b.status,
-                    })
+            # all bookings for this user, streamed chunk by chunk
+            chunks = iter_booking_chunks_a(criteria, Config.EXPORT_CHUNK_SIZE)
 
+            def report(rows, size):
+                record_export_progress_a(export_id, rows, size)
+
+            if job.file_format == "parquet":
+                rows_written, bytes_written = write_parquet_export_a(
+                    file_path, chunks, on_progress=report
+                )
+            else:
+                rows_written, bytes_written = write_csv_export_a(
+                    file_path,
+                    chunks,
+                    compress=(job.file_format == "csv.gz"),
+                    on_progress=report,
+                )
+
+            job = ExportJob.query.get(export_id)
             job.status = "DONE"
             job.file_path = file_path
+            job.rows_written = rows_written
+            job.bytes_written = bytes_written
             job.completed_at = datetime.utcnow()
             db.session.commit()
 
-            print(f"[EXPORT] Export complete for user_id={job.user_id}: {file_path}")
+            print(
+                f"[EXPORT] Export complete for user_id={job.user_id}: {file_path} "
+                f"({rows_written} rows, {bytes_written} bytes)"
+            )
             return f"Export complete: {file_path}"
 
         except Exception as e:
+            db.session.rollback()
+            job = ExportJob.query.get(export_id)
             job.status = "FAILED"
             job.error_message = str(e)
             job.completed_at = datetime.utcnow()
@@ -169,12 +210,157 @@ def export_user_bookings_csv(export_id):
 
 
 # -------------------------------------------------
-# 3. DAILY REMINDER JOB (Scheduled)
+# 2b. ADMIN ALL-BOOKINGS EXPORT (one parallel task per lot, then merge)
 # -------------------------------------------------
+def _mark_export_failed(export_id, error):
+    db.session.rollback()
+    job = ExportJob.query.get(export_id)
+    if job:
+        job.status = "FAILED"
+        job.error_message = str(error)
+        job.completed_at = datetime.utcnow()
+        db.session.commit()
+    print(f"[EXPORT] Export failed for job_id={export_id}: {error}")
+
+    # the merge will not run: drop the parts written so far
+    removed = remove_export_parts_a(export_id)
+    if removed:
+        print(f"[EXPORT] Removed {removed} partition file(s) of job_id={export_id}")
+
+
+def _export_failed(export_id):
+    status = (
+        db.session.query(ExportJob.status).filter_by(id=export_id).scalar()
+    )
+    return status == "FAILED"
+
+
 @celery.task
-def send_daily_reminders_a():
+def export_all_bookings_a(export_id):
+
+    with _flask_app.app_context():
+        job = ExportJob.query.get(export_id)
+        if not job:
+            print(f"[EXPORT] ExportJob {export_id} not found.")
+            return f"ExportJob {export_id} not found"
+
+        try:
+            # one partition per lot, plus None for bookings whose slot or
+            # lot is gone: together they cover every row of rows_total
+            lot_ids = [
+                lot_id
+                for (lot_id,) in db.session.query(ParkingLot.id).order_by(ParkingLot.id)
+            ] + [None]
+
+            job.status = "IN_PROGRESS"
+            job.rows_total = Booking.query.filter(
+                Booking.start_time >= job.range_start,
+                Booking.start_time < job.range_end,
+            ).count()
+            job.rows_written = 0
+            job.bytes_written = 0
+            job.partitions_total = len(lot_ids)
+            job.partitions_done = 0
+            db.session.commit()
+        except Exception as e:
+            _mark_export_failed(export_id, e)
+            return f"Export failed: {e}"
+
+    chord(
+        export_bookings_partition_a.s(export_id, lot_id) for lot_id in lot_ids
+    )(merge_export_partitions_a.s(export_id))
+
+    print(f"[EXPORT] Admin export {export_id}: {len(lot_ids)} partition(s) queued")
+    return len(lot_ids)
+
+
+@celery.task
+def export_bookings_partition_a(export_id, lot_id):
 
     with _flask_app.app_context():
+        try:
+            job = ExportJob.query.get(export_id)
+            if job.status == "FAILED":
+                # another partition already failed: the merge will not run
+                return None
+            extension, _ = EXPORT_FORMATS[job.file_format]
+            part_path = export_part_path_a(export_id, lot_id, extension)
+
+            reported = {"rows": 0, "bytes": 0}
+
+            def report(rows, size):
+                add_export_progress_a(
+                    export_id, rows - reported["rows"], size - reported["bytes"]
+                )
+                reported.update(rows=rows, bytes=size)
+
+            chunks = iter_booking_chunks_a(
+                partition_criteria_a(job.range_start, job.range_end, lot_id),
+                Config.EXPORT_CHUNK_SIZE,
+            )
+            write_csv_export_a(
+                part_path,
+                chunks,
+                compress=(job.file_format == "csv.gz"),
+                header=False,
+                on_progress=report,
+            )
+
+            # a partition that failed while this one was writing has
+            # already cleaned up; do not leave this file behind it
+            if _export_failed(export_id):
+                os.remove(part_path)
+                return None
+
+            add_export_progress_a(export_id, 0, 0, partitions_delta=1)
+            return part_path
+
+        except Exception as e:
+            # failing the partition also stops the chord's merge step
+            _mark_export_failed(export_id, e)
+            raise
+
+
+@celery.task
+def merge_export_partitions_a(part_paths, export_id):
+
+    with _flask_app.app_context():
+        try:
+            job = ExportJob.query.get(export_id)
+            extension, _ = EXPORT_FORMATS[job.file_format]
+            file_name = (
+                f"bookings_all_{job.range_start:%Y%m%d}_"
+                f"{job.range_end - timedelta(days=1):%Y%m%d}_"
+                f"{datetime.utcnow():%Y%m%d_%H%M%S}{extension}"
+            )
+            file_path = os.path.join(exports_dir_a(), file_name)
+
+            size = merge_export_parts_a(
+                file_path, part_paths, compress=(job.file_format == "csv.gz")
+            )
+
+            job.status = "DONE"
+            job.file_path = file_path
+            job.bytes_written = size
+            job.completed_at = datetime.utcnow()
+            db.session.commit()
+
+            print(f"[EXPORT] Admin export {export_id} complete: {file_path}")
+            return f"Export complete: {file_path}"
+
+        except Exception as e:
+            _mark_export_failed(export_id, e)
+            return f"Export failed: {e}"
+
+
+# -------------------------------------------------
+# 3. DAILY REMINDER JOB (Scheduled, fanned out in chunks)
+# -------------------------------------------------
+@celery.task
+def send_daily_reminders_a():
+
+    # read-only: the recipient query can run on a replica
+    with _flask_app.app_context(), use_replica_a():
         lots_count = ParkingLot.query.count()
         if lots_count == 0:
             print("[REMINDER] No parking lots available, skipping reminders.")
@@ -184,46 +370,67 @@ def send_daily_reminders_a():
         start_of_day = datetime(today.year, today.month, today.day)
         end_of_day = start_of_day + timedelta(days=1)
 
-        # only regular users (skip ADMIN)
-        users = User.query.filter(User.role == "USER").all()
-        reminded_count = 0
-
-        for user in users:
-            has_booking_today = (
-                Booking.query.filter(
-                    Booking.user_id == user.id,
-                    Booking.start_time >= start_of_day,
-                    Booking.start_time < end_of_day,
-                ).count() > 0
+        # only regular users (skip ADMIN) with NO booking today: one anti-join
+        base_query = users_without_booking_query_a(start_of_day, end_of_day)
+
+        # keyset over user id; each chunk becomes one subtask
+        queued_count = 0
+        chunk_count = 0
+        last_id = 0
+        while True:
+            rows = (
+                base_query.filter(User.id > last_id)
+                .limit(Config.REMINDER_CHUNK_SIZE)
+                .all()
             )
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            send_daily_reminders_chunk_a.delay([(r.name, r.email) for r in rows])
+            queued_count += len(rows)
+            chunk_count += 1
 
-            if not has_booking_today:
-                subject = "Daily Parking Reminder"
-                body = f"""
-                <html>
-                  <body>
-                    <h3>Hello {user.name},</h3>
-                    <p>You have not made any parking bookings today.</p>
-                    <p>If needed, please log in to the Vehicle Parking System and book a parking slot.</p>
-                    <p><b>This is an automated reminder.</b></p>
-                  </body>
-                </html>
-                """
+        print(
+            f"[REMINDER] Users to remind today: {queued_count} "
+            f"(queued in {chunk_count} chunk(s))"
+        )
+        return queued_count
 
-                send_email_basic(user.email, subject, body)
-                reminded_count += 1
 
-        print(f"[REMINDER] Total users reminded today (emails sent): {reminded_count}")
-        return reminded_count
+@celery.task
+def send_daily_reminders_chunk_a(recipients):
+    """recipients: [(name, email), ...] -> reminder mails over one SMTP session."""
+    subject = "Daily Parking Reminder"
+    bodies = render_many_a(
+        "daily_reminder.html", [{"name": name} for name, _ in recipients]
+    )
+    messages = [
+        (email, subject, body)
+        for (_, email), body in zip(recipients, bodies)
+    ]
+
+    sent_count = send_email_batch_a(messages)
+    print(f"[REMINDER] Chunk done: {sent_count}/{len(messages)} emails sent")
+    print(f"[REMINDER] Template render stats: {render_stats_a()}")
+    return sent_count
 
 
 # -------------------------------------------------
 # 4. MONTHLY ACTIVITY REPORT JOB (Scheduled)
 # -------------------------------------------------
+def reports_dir_a():
+    """backend/reports, created on first use."""
+    path = os.path.join(os.path.dirname(__file__), "reports")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
 @celery.task
 def send_monthly_activity_report_a():
 
-    with _flask_app.app_context():
+    # read-only: the monthly aggregates can run on a replica
+    with _flask_app.app_context(), use_replica_a():
         # 1. Determine previous month (year, month)
         now = datetime.utcnow()
         if now.month == 1:
@@ -240,95 +447,72 @@ def send_monthly_activity_report_a():
         else:
             end_date = datetime(report_year, report_month + 1, 1)
 
-        # Create reports folder
-        base_dir = os.path.dirname(__file__)
-        reports_dir = os.path.join(base_dir, "reports")
-        os.makedirs(reports_dir, exist_ok=True)
+        reports_dir = reports_dir_a()
 
-        users = User.query.all()
-        generated_count = 0
+        # every user, with 0..n usage rows (one per lot name), streamed
+        rows = monthly_usage_query_a(start_date, end_date).yield_per(1000)
 
-        for user in users:
-            # All bookings for this user in previous month
-            bookings = Booking.query.filter(
-                Booking.user_id == user.id,
-                Booking.start_time >= start_date,
-                Booking.start_time < end_date,
-            ).all()
-
-            if not bookings:
-                total_bookings = 0
-                total_amount = 0.0
+        month_str = f"{report_year}-{report_month:02d}"
+        subject = f"Monthly Parking Activity Report - {month_str}"
+        generated_count = 0
+        pending_mails = []
+
+        for (user_id, user_name, user_email), user_rows in groupby(
+            rows, key=lambda r: (r[0], r[1], r[2])
+        ):
+            total_bookings = 0
+            total_amount = 0.0
+            top_lot_name, top_lot_count = None, 0
+
+            for _, _, _, lot_name, lot_bookings, lot_amount in user_rows:
+                if not lot_bookings:
+                    continue
+                total_bookings += lot_bookings
+                total_amount += lot_amount or 0.0
+                # ties: the lot name booked first this month wins
+                if lot_name is not None and lot_bookings > top_lot_count:
+                    top_lot_name, top_lot_count = lot_name, lot_bookings
+
+            if total_bookings == 0:
                 most_used_lot_name = "No bookings this month"
             else:
-                total_bookings = len(bookings)
-                total_amount = sum(b.amount or 0 for b in bookings)
-
-                # Count usage per parking lot
-                lot_usage = {}
-                for b in bookings:
-                    slot = ParkingSlot.query.get(b.slot_id)
-                    if not slot:
-                        continue
-                    lot = ParkingLot.query.get(slot.lot_id)
-                    if not lot:
-                        continue
-                    lot_usage[lot.name] = lot_usage.get(lot.name, 0) + 1
-
-                if lot_usage:
-                    most_used_lot_name = max(lot_usage, key=lot_usage.get)
-                else:
-                    most_used_lot_name = "Unknown"
-
-            # Build a very simple HTML report
-            month_str = f"{report_year}-{report_month:02d}"
-            html_content = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <title>Monthly Parking Activity Report - {month_str}</title>
-</head>
-<body>
-    <h2>Monthly Parking Activity Report</h2>
-    <p><strong>User:</strong> {user.name} ({user.email})</p>
-    <p><strong>Month:</strong> {month_str}</p>
-
-    <h3>Summary</h3>
-    <ul>
-        <li>Total bookings: {total_bookings}</li>
-        <li>Total amount spent: ₹{total_amount:.2f}</li>
-        <li>Most used parking lot: {most_used_lot_name}</li>
-    </ul>
-
-    <p>This report is auto-generated by the Vehicle Parking System.</p>
-</body>
-</html>
-"""
+                most_used_lot_name = top_lot_name or "Unknown"
+
+            # Rendered once, reused for both the saved file and the email
+            html_content = render_email_a(
+                "monthly_report.html",
+                month_str=month_str,
+                user_name=user_name,
+                user_email=user_email,
+                total_bookings=total_bookings,
+                total_amount=total_amount,
+                most_used_lot_name=most_used_lot_name,
+            )
 
             # Save to file
             file_name = (
-                f"monthly_report_user_{user.id}_{report_year}_{report_month:02d}.html"
+                f"monthly_report_user_{user_id}_{report_year}_{report_month:02d}.html"
             )
             file_path = os.path.join(reports_dir, file_name)
 
             with open(file_path, "w", encoding="utf-8") as f:
                 f.write(html_content)
 
-            # Also send as email using MailHog
-            subject = f"Monthly Parking Activity Report - {month_str}"
-            send_email_basic(user.email, subject, html_content)
+            # Also send as email (MailHog), batched over one SMTP session
+            pending_mails.append((user_email, subject, html_content))
+            if len(pending_mails) >= Config.MAIL_BATCH_SIZE:
+                send_email_batch_a(pending_mails)
+                pending_mails = []
 
-            print(
-                f"[MONTHLY REPORT] Generated report for user_id={user.id}, "
-                f"email={user.email}, file={file_path}"
-            )
             generated_count += 1
 
+        send_email_batch_a(pending_mails)
+
         print(
             f"[MONTHLY REPORT] Total user reports generated for "
-            f"{report_year}-{report_month:02d}: {generated_count}"
+            f"{month_str}: {generated_count}"
         )
+        print(f"[MONTHLY REPORT] Template render stats: {render_stats_a()}")
         return generated_count
 
 
@@ -347,6 +531,9 @@ celery.conf.beat_schedule = {
         "task": "celery_worker.send_monthly_activity_report_a",
         "schedule": crontab(day_of_month=1, hour=0, minute=5),
     },
-    # (Optional) we keep cleanup as manual via Admin button,
-    # so it is NOT scheduled here.
+    # Stale-booking cleanup every 30 minutes (still runnable from Admin)
+    "cleanup-stale-bookings-a": {
+        "task": "celery_worker.cleanup_stale_bookings_a",
+        "schedule": crontab(minute="*/30"),
+    },
 }
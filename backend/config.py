@@ -2,19 +2,85 @@ import os
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 
+# public placeholder: auth tokens are refused with it outside debug/testing
+DEFAULT_SECRET_KEY = "change-this-secret-key"
+
 
 class Config:
-    # Flask / DB
-    SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(BASE_DIR, "parking_system.db")
+    # Flask / DB (DATABASE_URL switches to a server database, e.g. postgresql://...)
+    SQLALCHEMY_DATABASE_URI = os.environ.get(
+        "DATABASE_URL", "sqlite:///" + os.path.join(BASE_DIR, "parking_system.db")
+    )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SECRET_KEY = "change-this-secret-key"
+
+    # Read replicas (comma-separated DATABASE_REPLICA_URLS), used by read-only
+    # routes and reporting tasks; see db_routing.py
+    SQLALCHEMY_REPLICA_URIS = [
+        u for u in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if u
+    ]
+    REPLICA_STICKY_SECONDS = 10   # a user's reads stay on the primary after they book/release
+
+    # Engine profile from DB_PROFILES (API and Celery worker alike)
+    DB_PROFILE = os.environ.get("DB_PROFILE", "tuned")
+    DB_PROFILES = {
+        # SQLAlchemy / SQLite defaults: rollback journal, full fsync per commit
+        "default": {"sqlite_pragmas": {}, "pool": {}},
+        # WAL lets readers run during a write; writers wait instead of failing
+        "tuned": {
+            "sqlite_pragmas": {
+                "journal_mode": "WAL",
+                "synchronous": "NORMAL",    # fsync at checkpoints, not every commit
+                "busy_timeout": 5000,       # ms to wait for the write lock
+                "cache_size": -20000,       # KiB of page cache per connection
+                "mmap_size": 268435456,     # 256 MB memory-mapped reads
+            },
+            "pool": {
+                "pool_size": 10,
+                "max_overflow": 20,
+                "pool_timeout": 30,
+                "pool_recycle": 1800,       # server databases drop idle connections
+                "pool_pre_ping": True,
+            },
+        },
+    }
+    SECRET_KEY = os.environ.get("SECRET_KEY", DEFAULT_SECRET_KEY)   # also signs auth tokens
+    AUTH_TOKEN_MAX_AGE_SECONDS = 12 * 60 * 60
 
     # Redis + Celery
     REDIS_URL = "redis://localhost:6379/0"
     CELERY_BROKER_URL = REDIS_URL
     CELERY_RESULT_BACKEND = REDIS_URL
 
+    # /parking/lots cache (entries are invalidated on change; TTL is a backstop)
+    LOT_CACHE_TTL_SECONDS = 300
+    LOT_CACHE_STALE_SECONDS = 30   # stale id list served while one request rebuilds it
+
+    # In-process L1 cache of hot responses (per web process)
+    L1_CACHE_MAX_ENTRIES = 1024
+    L1_CACHE_TTL_SECONDS = 5
+    L1_LISTENER_MAX_BACKOFF_SECONDS = 30   # reconnect delay cap while Redis is down
+
+    # Live slot events (Server-Sent Events)
+    SSE_HEARTBEAT_SECONDS = 15
+    SSE_RETRY_MS = 3000     # client reconnect delay
+    SSE_QUEUE_SIZE = 100    # buffered events per client before it must resync
+
+    # Stale-booking cleanup (celery_worker.cleanup_stale_bookings_a)
+    STALE_BOOKING_HOURS = 8
+    CLEANUP_BATCH_SIZE = 500
+
+    # Booking exports: rows fetched and written per chunk
+    EXPORT_CHUNK_SIZE = 5000
+
+    # Daily reminders: users per fanned-out subtask (one SMTP session each)
+    REMINDER_CHUNK_SIZE = 500
+
     # MailHog SMTP
     MAIL_SERVER = "localhost"
     MAIL_PORT = 1025
     FROM_EMAIL = "noreply@parkingapp.com"
+    MAIL_BATCH_SIZE = 100   # mails sent per SMTP session by bulk jobs
+    MAIL_POOL_SIZE = 4      # open SMTP connections kept per process
+    MAIL_RATE_LIMIT_PER_SEC = 0   # max mails/second per process, 0 = no limit
+    MAIL_MAX_RETRIES = 3
+    MAIL_RETRY_BACKOFF_SECONDS = 0.5   # doubled on every retry
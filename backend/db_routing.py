@@ -0,0 +1,144 @@
+# backend/db_routing.py
+
+import sqlite3
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, request
+from sqlalchemy.engine import make_url
+
+from config import Config
+from extensions import get_redis
+
+# -------------------------------------------------
+# READ-REPLICA ROUTING
+# -------------------------------------------------
+# Replicas are the SQLALCHEMY_REPLICA_URIS binds; RoutingSession in
+# extensions.py sends reads there while g.db_read_replica is set.
+#
+# - read-only routes use @replica_route_a(...)
+# - reporting tasks use `with use_replica_a():` inside their app context
+# - a user who just booked/released reads from the primary for
+#   REPLICA_STICKY_SECONDS (db_sticky_{scope} in Redis), so they see
+#   their own write even if the replicas lag
+#
+# Anything that fills a shared cache (Redis lot entries, bitmaps, L1)
+# keeps reading the primary: a lagging replica would put the old state
+# back into a cache that was just invalidated.
+
+
+def replicas_enabled_a():
+    return bool(current_app.config.get("SQLALCHEMY_REPLICA_URIS"))
+
+
+@contextmanager
+def use_replica_a(enabled=True):
+    """Route this app context's reads to a replica (enabled=False: the primary)."""
+    previous_a = g.get("db_read_replica", False)
+    g.db_read_replica = enabled
+    try:
+        yield
+    finally:
+        g.db_read_replica = previous_a
+
+
+def sticky_key_a(scope):
+    return f"db_sticky_{scope}"
+
+
+def user_scope_a(user_id):
+    return f"user_{user_id}"
+
+
+def mark_primary_sticky_a(scope):
+    """Keep `scope`'s reads on the primary for a while (after it wrote)."""
+    if not replicas_enabled_a():
+        return
+    try:
+        get_redis().set(sticky_key_a(scope), 1, ex=Config.REPLICA_STICKY_SECONDS)
+    except Exception as e:
+        print(f"[REPLICA] Could not mark {scope} sticky: {e}")
+
+
+def is_primary_sticky_a(scope):
+    try:
+        return bool(get_redis().exists(sticky_key_a(scope)))
+    except Exception as e:
+        # cannot tell whether the user just wrote: read the primary to be safe
+        print(f"[REPLICA] Stickiness check failed for {scope}: {e}")
+        return True
+
+
+def replica_route_a(scope=None):
+    """
+    Serve a read-only route from a replica.
+
+    scope: fixed stickiness scope (e.g. "admin"); by default the user_id
+    from the URL or query string, and no stickiness without one.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not replicas_enabled_a():
+                return view(*args, **kwargs)
+
+            scope_a = scope
+            if scope_a is None:
+                user_id_a = kwargs.get("user_id") or request.args.get("user_id")
+                scope_a = user_scope_a(user_id_a) if user_id_a else None
+
+            if scope_a is not None and is_primary_sticky_a(scope_a):
+                return view(*args, **kwargs)
+            with use_replica_a():
+                return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# -------------------------------------------------
+# STAND-IN REPLICATOR (local SQLite replicas)
+# -------------------------------------------------
+
+def sqlite_path_a(uri):
+    url_a = make_url(uri)
+    if url_a.get_backend_name() != "sqlite" or url_a.database in (None, "", ":memory:"):
+        return None
+    return url_a.database
+
+
+def replicate_sqlite_a(primary_uri, replica_uris):
+    """
+    Copy the primary SQLite file over each replica with the online backup
+    API (a consistent snapshot, readers of the replica just wait for it).
+    Returns the replica paths written.
+    """
+    primary_path_a = sqlite_path_a(primary_uri)
+    if primary_path_a is None:
+        raise RuntimeError("replicate-sqlite needs a file-based SQLite primary")
+
+    written_a = []
+    source_a = sqlite3.connect(primary_path_a)
+    try:
+        for replica_uri in replica_uris:
+            replica_path_a = sqlite_path_a(replica_uri)
+            if replica_path_a is None:
+                print(f"[REPLICA] Skipping non-SQLite replica {replica_uri}")
+                continue
+            target_a = sqlite3.connect(replica_path_a, timeout=30)
+            try:
+                started_a = time.time()
+                source_a.backup(target_a)
+                print(
+                    f"[REPLICA] Copied primary to {replica_path_a} "
+                    f"in {time.time() - started_a:.3f}s"
+                )
+                written_a.append(replica_path_a)
+            finally:
+                target_a.close()
+    finally:
+        source_a.close()
+    return written_a
@@ -0,0 +1,122 @@
+# backend/db_upgrade.py
+
+from sqlalchemy import inspect, text
+
+from extensions import db
+
+# Columns added after the first release: (table, column, DDL).
+# db.create_all() only creates missing tables, so existing
+# parking_system.db files get these through ALTER TABLE. Indexes declared
+# in models.py (__table_args__) are created the same way if missing.
+ADDED_COLUMNS_A = [
+    ("parking_lots", "occupied_slots", "INTEGER NOT NULL DEFAULT 0"),
+    ("parking_lots", "free_slots", "INTEGER NOT NULL DEFAULT 0"),
+    ("parking_lots", "slots_version", "INTEGER NOT NULL DEFAULT 0"),
+    ("parking_lots", "layout_version", "INTEGER NOT NULL DEFAULT 0"),
+    ("parking_slots", "version", "INTEGER NOT NULL DEFAULT 0"),
+    ("export_jobs", "file_format", "VARCHAR(20) NOT NULL DEFAULT 'csv'"),
+    ("export_jobs", "rows_total", "INTEGER"),
+    ("export_jobs", "rows_written", "INTEGER NOT NULL DEFAULT 0"),
+    ("export_jobs", "bytes_written", "INTEGER NOT NULL DEFAULT 0"),
+    ("export_jobs", "scope", "VARCHAR(10) NOT NULL DEFAULT 'USER'"),
+    ("export_jobs", "range_start", "DATETIME"),
+    ("export_jobs", "range_end", "DATETIME"),
+    ("export_jobs", "partitions_total", "INTEGER"),
+    ("export_jobs", "partitions_done", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+# SQLite tables whose ids must never be reused (sqlite_autoincrement in
+# models.py). AUTOINCREMENT cannot be added with ALTER TABLE, so older
+# files get the table rebuilt once: rename, create, copy rows, drop.
+AUTOINCREMENT_TABLES_A = ["parking_lots"]
+
+
+def ensure_autoincrement_a(table_name):
+    """Rebuild an existing SQLite table without AUTOINCREMENT. Returns True if rebuilt."""
+    table_obj_a = db.metadata.tables[table_name]
+    with db.engine.begin() as conn_a:
+        sql_a = conn_a.execute(
+            text("SELECT sql FROM sqlite_master WHERE type='table' AND name=:n"),
+            {"n": table_name},
+        ).scalar()
+        if sql_a is None or "AUTOINCREMENT" in sql_a.upper():
+            return False
+
+        old_name_a = f"{table_name}_old"
+        columns_a = ", ".join(c.name for c in table_obj_a.columns)
+
+        # keep other tables' REFERENCES parking_lots pointing at the name,
+        # not at the renamed copy
+        conn_a.execute(text("PRAGMA legacy_alter_table=ON"))
+        try:
+            # index names are global: drop them before creating the new table
+            for index_a in inspect(conn_a).get_indexes(table_name):
+                conn_a.execute(text(f'DROP INDEX IF EXISTS "{index_a["name"]}"'))
+            conn_a.execute(text(f"ALTER TABLE {table_name} RENAME TO {old_name_a}"))
+            table_obj_a.create(bind=conn_a)
+            conn_a.execute(
+                text(
+                    f"INSERT INTO {table_name} ({columns_a}) "
+                    f"SELECT {columns_a} FROM {old_name_a}"
+                )
+            )
+            conn_a.execute(text(f"DROP TABLE {old_name_a}"))
+        finally:
+            conn_a.execute(text("PRAGMA legacy_alter_table=OFF"))
+
+    print(f"[DB UPGRADE] Rebuilt {table_name} with AUTOINCREMENT ids")
+    return True
+
+
+def upgrade_schema_a():
+    """
+    Bring the database up to the current models without losing data.
+
+    Safe to run on every start: creates missing tables, adds missing
+    columns and indexes, and re-seeds derived counters when their
+    columns are new.
+    Returns the list of "table.column" names that were added.
+    """
+    from lot_summary import reconcile_lot_counters_a
+
+    db.create_all()
+
+    inspector_a = inspect(db.engine)
+    added_a = []
+
+    for table_a, column_a, ddl_a in ADDED_COLUMNS_A:
+        existing_a = {c["name"] for c in inspector_a.get_columns(table_a)}
+        if column_a not in existing_a:
+            db.session.execute(
+                text(f"ALTER TABLE {table_a} ADD COLUMN {column_a} {ddl_a}")
+            )
+            added_a.append(f"{table_a}.{column_a}")
+
+    db.session.commit()
+
+    if db.engine.dialect.name == "sqlite":
+        for table_name_a in AUTOINCREMENT_TABLES_A:
+            ensure_autoincrement_a(table_name_a)
+        inspector_a = inspect(db.engine)
+
+    created_a = []
+    for table_obj_a in db.metadata.sorted_tables:
+        existing_a = {i["name"] for i in inspector_a.get_indexes(table_obj_a.name)}
+        for index_a in table_obj_a.indexes:
+            if index_a.name not in existing_a:
+                index_a.create(bind=db.engine)
+                created_a.append(index_a.name)
+                print(f"[DB UPGRADE] Created index {index_a.name}")
+
+    if created_a and db.engine.dialect.name == "sqlite":
+        # refresh planner statistics so the new indexes get picked
+        with db.engine.begin() as conn_a:
+            conn_a.execute(text("ANALYZE"))
+
+    if any(a.startswith("parking_lots.") for a in added_a):
+        reconcile_lot_counters_a(repair=True)
+
+    for name_a in added_a:
+        print(f"[DB UPGRADE] Added column {name_a}")
+
+    return added_a
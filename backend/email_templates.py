@@ -0,0 +1,67 @@
+# backend/email_templates.py
+
+import os
+import time
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+# -------------------------------------------------
+# PRECOMPILED EMAIL / REPORT TEMPLATES (templates/emails/*.html)
+# -------------------------------------------------
+# Templates are compiled once when a worker imports this module and then
+# reused for every render. auto_reload is off, so Jinja never re-stats the
+# files inside the task loops.
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "templates", "emails")
+
+_env = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=False,
+)
+
+_templates = {
+    name: _env.get_template(name)
+    for name in ("daily_reminder.html", "monthly_report.html")
+}
+
+# template name -> {"renders": n, "seconds": total}
+_render_stats = {}
+
+
+def _record(name, count, seconds):
+    stats = _render_stats.setdefault(name, {"renders": 0, "seconds": 0.0})
+    stats["renders"] += count
+    stats["seconds"] += seconds
+
+
+def render_email_a(name, /, **context):
+    """
+    Render one precompiled template; the time taken is recorded.
+    name is positional-only, so templates may use a "name" variable.
+    """
+    started = time.perf_counter()
+    html = _templates[name].render(**context)
+    _record(name, 1, time.perf_counter() - started)
+    return html
+
+
+def render_many_a(name, contexts):
+    """Render a batch of contexts with the same template, timed as a batch."""
+    template = _templates[name]
+    started = time.perf_counter()
+    rendered = [template.render(**ctx) for ctx in contexts]
+    _record(name, len(rendered), time.perf_counter() - started)
+    return rendered
+
+
+def render_stats_a():
+    """Per-template render counts, total and average milliseconds."""
+    return {
+        name: {
+            "renders": s["renders"],
+            "total_ms": round(s["seconds"] * 1000, 3),
+            "avg_ms": round(s["seconds"] * 1000 / s["renders"], 3) if s["renders"] else 0.0,
+        }
+        for name, s in _render_stats.items()
+    }
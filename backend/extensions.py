@@ -1,16 +1,125 @@
 # backend/extensions.py
 
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as FlaskSession
 from flask_bcrypt import Bcrypt
+import json
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
 import redis
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+
+REPLICA_BIND_PREFIX = "replica_"
+
+
+class RoutingSession(FlaskSession):
+    """
+    Session that reads from a replica bind while g.db_read_replica is set
+    (see db_routing.py). Flushes and INSERT/UPDATE/DELETE statements always
+    go to the primary. One replica is picked per app context, so all reads
+    of a request see the same copy.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and not isinstance(clause, UpdateBase)
+            and has_app_context()
+            and g.get("db_read_replica")
+        ):
+            replica_a = self._replica_engine()
+            if replica_a is not None:
+                return replica_a
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
 
-db = SQLAlchemy()
+    def _replica_engine(self):
+        if "db_replica_key" not in g:
+            keys_a = [
+                k for k in self._db.engines
+                if isinstance(k, str) and k.startswith(REPLICA_BIND_PREFIX)
+            ]
+            g.db_replica_key = random.choice(keys_a) if keys_a else None
+        if g.db_replica_key is None:
+            return None
+        return self._db.engines[g.db_replica_key]
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 bcrypt = Bcrypt()
 
 # Global Redis client
 redis_client_a = None
 
 
+# ---------------------------------------------
+# DATABASE ENGINE PROFILE
+# ---------------------------------------------
+
+def db_engine_options_a(uri, profile):
+    """SQLALCHEMY_ENGINE_OPTIONS for a profile (pool sizing only applies to pooled URLs)."""
+    if uri in ("sqlite://", "sqlite:///:memory:"):
+        # in-memory SQLite uses a single-connection pool
+        return {}
+    return dict(profile.get("pool", {}))
+
+
+def init_db_a(app):
+    """Apply DB_PROFILE and initialise Flask-SQLAlchemy with it."""
+    profile_name_a = app.config.get("DB_PROFILE", "default")
+    profile_a = app.config.get("DB_PROFILES", {}).get(profile_name_a)
+    if profile_a is None:
+        raise RuntimeError(f"Unknown DB_PROFILE {profile_name_a!r}")
+
+    uri_a = app.config["SQLALCHEMY_DATABASE_URI"]
+    options_a = db_engine_options_a(uri_a, profile_a)
+    options_a.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options_a
+
+    # replicas become binds replica_0, replica_1, ... (binds do not inherit
+    # SQLALCHEMY_ENGINE_OPTIONS, so the profile is applied to each)
+    binds_a = app.config.setdefault("SQLALCHEMY_BINDS", {})
+    for i, replica_uri in enumerate(app.config.get("SQLALCHEMY_REPLICA_URIS", [])):
+        binds_a[f"{REPLICA_BIND_PREFIX}{i}"] = {
+            "url": replica_uri,
+            **db_engine_options_a(replica_uri, profile_a),
+        }
+
+    db.init_app(app)
+
+    pragmas_a = profile_a.get("sqlite_pragmas", {})
+    with app.app_context():
+        for key, engine in db.engines.items():
+            if engine.dialect.name != "sqlite":
+                continue
+            engine_pragmas_a = dict(pragmas_a)
+            if isinstance(key, str) and key.startswith(REPLICA_BIND_PREFIX):
+                # a write routed to a replica by mistake fails loudly
+                engine_pragmas_a["query_only"] = "ON"
+            if engine_pragmas_a:
+                event.listen(engine, "connect", _sqlite_pragmas_listener_a(engine_pragmas_a))
+
+
+def _sqlite_pragmas_listener_a(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return set_pragmas
+
+
 def init_redis_a(app):
 
     global redis_client_a
@@ -33,34 +142,315 @@ def get_redis():
 # SIMPLE REDIS CACHE HELPERS
 # ---------------------------------------------
 
-def cache_set(key, value, ex=60):
+def cache_set(key, value, ex=60, delta=None, stale_ttl=0):
+    """
+    Plain SET by default. Passing delta (seconds the value took to compute)
+    opts into early refresh: the value is kept in a hash {v, d, x} with its
+    logical expiry x, and lives stale_ttl seconds longer in Redis so it can
+    still be served while one caller recomputes it.
+    """
+    redis_client = get_redis()
+    if delta is None:
+        redis_client.set(key, value, ex=ex)
+        return
+
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.delete(key)
+    pipe.hset(key, mapping={"v": value, "d": delta, "x": time.time() + ex})
+    pipe.expire(key, int(ex + stale_ttl))
+    pipe.execute()
 
+
+def cache_get(key, beta=None):
+    """
+    Plain GET by default. With beta (early-refresh entries written with
+    delta=...), returns (value, fresh): fresh turns False once the entry
+    is past its logical expiry, or a little earlier at random
+    (XFetch: now - delta * beta * ln(rand) >= expiry), so one caller
+    refreshes it before everybody misses at once.
+    """
     redis_client = get_redis()
-    redis_client.set(key, value, ex=ex)
+    if beta is None:
+        return redis_client.get(key)
+
+    entry = redis_client.hgetall(key)
+    if not entry:
+        return None, False
+
+    delta = float(entry.get("d") or 0.0)
+    expiry = float(entry.get("x") or 0.0)
+    fresh = time.time() - delta * beta * math.log(1.0 - random.random()) < expiry
+    return entry.get("v"), fresh
+
 
+def cache_get_or_compute(key, compute, ex=60, beta=1.0, stale_ttl=30, lock_ttl=10):
+    """
+    Return the cached value for key, or compute() it with single-flight:
 
-def cache_get(key):
+    - fresh entry               -> served as is
+    - stale / early refresh     -> the caller that wins the lock recomputes,
+                                   everyone else keeps getting the stale value
+    - no entry at all           -> the lock winner recomputes, the others wait
+                                   for it (up to lock_ttl), then compute
+                                   themselves without caching
+
+    compute() must return a string. Redis errors fall back to compute().
+    """
+    try:
+        value, fresh = cache_get(key, beta=beta)
+    except Exception as e:
+        print(f"[CACHE] Early-refresh read failed for key={key}: {e}")
+        return compute()
+
+    if value is not None and fresh:
+        return value
 
     redis_client = get_redis()
-    return redis_client.get(key)
+    lock_key = f"lock:{key}"
+    token = uuid.uuid4().hex
 
+    try:
+        got_lock = redis_client.set(lock_key, token, nx=True, ex=lock_ttl)
+    except Exception as e:
+        print(f"[CACHE] Could not take recompute lock for key={key}: {e}")
+        return value if value is not None else compute()
 
-import smtplib
-from email.mime.text import MIMEText
-from flask import current_app
+    if got_lock:
+        try:
+            started = time.perf_counter()
+            value = compute()
+            cache_set(
+                key,
+                value,
+                ex=ex,
+                delta=time.perf_counter() - started,
+                stale_ttl=stale_ttl,
+            )
+            print(f"[CACHE] Recomputed key={key} (single-flight)")
+            return value
+        finally:
+            try:
+                if redis_client.get(lock_key) == token:
+                    redis_client.delete(lock_key)
+            except Exception:
+                pass
 
-def send_email(to_email, subject, body):
-    msg = MIMEText(body, "html")
-    msg["Subject"] = subject
-    msg["From"] = current_app.config["FROM_EMAIL"]
-    msg["To"] = to_email
-
-    with smtplib.SMTP(
-        current_app.config["MAIL_SERVER"],
-        current_app.config["MAIL_PORT"]
-    ) as server:
-        server.sendmail(
-            current_app.config["FROM_EMAIL"],
-            [to_email],
-            msg.as_string()
+    if value is not None:
+        print(f"[CACHE] Serving stale value for key={key} while it is recomputed")
+        return value
+
+    # nothing to serve yet: wait for the lock holder's result
+    deadline = time.monotonic() + lock_ttl
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        try:
+            value, _ = cache_get(key, beta=beta)
+        except Exception:
+            break
+        if value is not None:
+            return value
+
+    return compute()
+
+
+# ---------------------------------------------
+# IN-PROCESS L1 CACHE (in front of Redis)
+# ---------------------------------------------
+# Small per-process LRU holding ready-to-send response bytes, so a hot
+# endpoint skips the Redis round trip and the JSON decode/encode. Entries
+# carry tags (e.g. "lot:3"); invalidations are published on a Redis channel
+# and every web process drops the matching entries from a listener thread.
+# The short TTL bounds staleness if a message is ever missed.
+#
+# Like the Redis lot entries, a response is only stored if nothing it
+# contains was invalidated while it was being built: callers read
+# l1_generation() first and pass it to l1_set (seen=...). An invalidation
+# that arrives between the reads and the set would otherwise find nothing
+# to drop, and the stale bytes would then be served until the TTL.
+
+L1_INVALIDATION_CHANNEL = "l1_cache_invalidate"
+
+
+def key_prefix(key):
+    """Stats bucket of a key: 'parking_lots_user_560001' -> 'parking_lots_user'."""
+    return key.rsplit("_", 1)[0] if "_" in key else key
+
+
+class LocalCache:
+    """Bounded, thread-safe LRU with per-entry TTL and tags."""
+
+    def __init__(self, max_entries=1024, ttl=5):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (value, expires_at, tags)
+        self._stats = {}
+        self._generation = 0        # bumped by every invalidate / clear
+        self._invalidated = {}      # ("key"|"tag", name) -> generation
+        self._cleared = 0
+
+    def _count(self, key, field, n=1):
+        bucket = self._stats.setdefault(
+            key_prefix(key),
+            {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0},
+        )
+        bucket[field] += n
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._count(key, "misses")
+                return None
+            self._entries.move_to_end(key)
+            self._count(key, "hits")
+            return entry[0]
+
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def _changed_since(self, seen, key, tags):
+        if self._cleared > seen:
+            return True
+        if self._invalidated.get(("key", key), 0) > seen:
+            return True
+        return any(self._invalidated.get(("tag", t), 0) > seen for t in tags)
+
+    def set(self, key, value, ttl=None, tags=(), seen=None):
+        """
+        Store value; with seen (a generation() read before the value was
+        built) the set is skipped if key or one of its tags was
+        invalidated since. Returns whether the value was stored.
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        tags = frozenset(tags)
+        with self._lock:
+            if seen is not None and self._changed_since(seen, key, tags):
+                return False
+            self._entries[key] = (value, expires_at, tags)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._count(old_key, "evictions")
+            return True
+
+    def invalidate(self, keys=(), tags=()):
+        keys, tags = set(keys), set(tags)
+        with self._lock:
+            # one entry per key / tag ever invalidated (lots and list keys)
+            self._generation += 1
+            for k in keys:
+                self._invalidated[("key", k)] = self._generation
+            for t in tags:
+                self._invalidated[("tag", t)] = self._generation
+            doomed = [
+                k for k, (_, _, entry_tags) in self._entries.items()
+                if k in keys or entry_tags & tags
+            ]
+            for k in doomed:
+                del self._entries[k]
+                self._count(k, "invalidations")
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._cleared = self._generation
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "by_prefix": {p: dict(s) for p, s in self._stats.items()},
+            }
+
+
+l1_cache = LocalCache()
+_l1_listener_pid = None
+_l1_listener_lock = threading.Lock()
+_l1_max_backoff = 30   # listener reconnect delay cap (seconds)
+
+
+def init_l1_cache_a(app):
+    l1_cache.max_entries = app.config.get("L1_CACHE_MAX_ENTRIES", 1024)
+    l1_cache.ttl = app.config.get("L1_CACHE_TTL_SECONDS", 5)
+    global _l1_max_backoff
+    _l1_max_backoff = app.config.get("L1_LISTENER_MAX_BACKOFF_SECONDS", 30)
+
+
+def _l1_listen_a():
+    """
+    Apply published invalidations; resubscribe (and flush) on errors,
+    backing off from 1s up to L1_LISTENER_MAX_BACKOFF_SECONDS while
+    Redis stays unreachable.
+    """
+    delay = 1
+    while True:
+        try:
+            pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(L1_INVALIDATION_CHANNEL)
+            # anything published while we were not subscribed is lost
+            l1_cache.clear()
+            delay = 1
+            for message in pubsub.listen():
+                data = json.loads(message["data"])
+                l1_cache.invalidate(data.get("keys", ()), data.get("tags", ()))
+        except Exception as e:
+            print(f"[L1] Invalidation listener error, resubscribing in {delay}s: {e}")
+            l1_cache.clear()
+            time.sleep(delay)
+            delay = min(delay * 2, _l1_max_backoff)
+
+
+def _ensure_l1_listener_a():
+    # one listener per process (re-created after a fork, e.g. gunicorn)
+    global _l1_listener_pid
+    if _l1_listener_pid == os.getpid():
+        return
+    with _l1_listener_lock:
+        if _l1_listener_pid == os.getpid():
+            return
+        threading.Thread(target=_l1_listen_a, name="l1-invalidation", daemon=True).start()
+        _l1_listener_pid = os.getpid()
+
+
+def l1_get(key):
+    """Pre-serialized bytes for key from this process, or None."""
+    _ensure_l1_listener_a()
+    return l1_cache.get(key)
+
+
+def l1_generation():
+    """Read before building a value for l1_set(..., seen=...)."""
+    return l1_cache.generation()
+
+
+def l1_set(key, value, tags=(), ttl=None, seen=None):
+    _ensure_l1_listener_a()
+    return l1_cache.set(key, value, ttl=ttl, tags=tags, seen=seen)
+
+
+def l1_invalidate(keys=(), tags=()):
+    """Drop entries here right away and in every other process via pub/sub."""
+    keys, tags = list(keys), list(tags)
+    if not keys and not tags:
+        return
+    l1_cache.invalidate(keys, tags)
+    try:
+        get_redis().publish(
+            L1_INVALIDATION_CHANNEL, json.dumps({"keys": keys, "tags": tags})
         )
+    except Exception as e:
+        print(f"[L1] Could not publish invalidation: {e}")
+
+
+from mailer import get_mailer
+
+
+def send_email(to_email, subject, body):
+    # pooled connection + retries, see mailer.py
+    return get_mailer().send_batch([(to_email, subject, body)]) == 1
@@ -0,0 +1,97 @@
+# backend/job_queries.py
+
+from sqlalchemy import exists, func
+
+from extensions import db
+from models import Booking, ParkingLot, ParkingSlot, User
+
+# -------------------------------------------------
+# QUERIES OF THE SCHEDULED JOBS
+# -------------------------------------------------
+# The Celery tasks build their DB reads here rather than inline, so that
+# query_plans.py can EXPLAIN the exact same statements without importing
+# celery_worker (which creates its own Flask app on import).
+
+
+def stale_bookings_query_a(cutoff_time, after_id, limit):
+    """
+    One cleanup batch: ACTIVE bookings started before cutoff_time, after
+    booking id after_id, with the price of their lot (None if it is gone).
+    """
+    return (
+        db.session.query(
+            Booking.id,
+            Booking.user_id,
+            Booking.slot_id,
+            Booking.start_time,
+            ParkingLot.price_per_hour,
+        )
+        .outerjoin(ParkingSlot, ParkingSlot.id == Booking.slot_id)
+        .outerjoin(ParkingLot, ParkingLot.id == ParkingSlot.lot_id)
+        .filter(
+            Booking.status == "ACTIVE",
+            Booking.start_time < cutoff_time,
+            Booking.id > after_id,
+        )
+        .order_by(Booking.id.asc())
+        .limit(limit)
+    )
+
+
+def users_without_booking_query_a(start, end):
+    """
+    Regular users (no ADMIN) with no booking started in [start, end),
+    oldest first: one anti-join. Callers add the keyset (User.id > ...).
+    """
+    booked_a = exists().where(
+        Booking.user_id == User.id,
+        Booking.start_time >= start,
+        Booking.start_time < end,
+    )
+    return (
+        db.session.query(User.id, User.name, User.email)
+        .filter(User.role == "USER", ~booked_a)
+        .order_by(User.id.asc())
+    )
+
+
+def monthly_usage_query_a(start, end):
+    """
+    Every user (admins included) with one row per lot name they booked in
+    [start, end): (user id, name, email, lot name, bookings, amount),
+    ordered by user, then by each lot name's first booking of the month.
+    Users without bookings get one row with NULL lot / bookings.
+    """
+    # ONE grouped aggregate: per (user, lot name) bookings + amount for
+    # the month; outer joins keep bookings whose slot/lot is gone in totals.
+    # Lots sharing a name count as one, as the report always did.
+    usage_a = (
+        db.session.query(
+            Booking.user_id.label("user_id"),
+            ParkingLot.name.label("lot_name"),
+            func.min(Booking.id).label("first_booking_id"),
+            func.count(Booking.id).label("bookings"),
+            func.coalesce(func.sum(Booking.amount), 0.0).label("amount"),
+        )
+        .outerjoin(ParkingSlot, ParkingSlot.id == Booking.slot_id)
+        .outerjoin(ParkingLot, ParkingLot.id == ParkingSlot.lot_id)
+        .filter(
+            Booking.start_time >= start,
+            Booking.start_time < end,
+        )
+        .group_by(Booking.user_id, ParkingLot.name)
+        .subquery()
+    )
+
+    return (
+        db.session.query(
+            User.id,
+            User.name,
+            User.email,
+            usage_a.c.lot_name,
+            usage_a.c.bookings,
+            usage_a.c.amount,
+        )
+        .outerjoin(usage_a, usage_a.c.user_id == User.id)
+        .order_by(User.id.asc(), usage_a.c.first_booking_id.asc())
+    )
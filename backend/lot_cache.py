@@ -0,0 +1,127 @@
+# backend/lot_cache.py
+
+import json
+
+from redis.exceptions import WatchError
+
+from extensions import get_redis, l1_invalidate
+
+# -------------------------------------------------
+# PER-LOT CACHE KEYS FOR /parking/lots
+# -------------------------------------------------
+# parking_lot_user_{id}      -> JSON of one lot as users see it
+# parking_lots_user_all      -> JSON list of lot ids (all lots)
+# parking_lots_user_{pin}    -> JSON list of lot ids with that pin code
+#
+# parking_lot_gen_{id}       -> invalidation counter of that lot
+#
+# Occupancy changes only touch the lot's own entry; the id lists change
+# only when a lot is created, deleted or moved to another pin code.
+# Redis failures are logged and ignored, the TTL is the safety net.
+#
+# A request that misses a lot entry reads the lot's counter together with
+# the entry, loads the lot from the DB, and stores it only if the counter
+# is still the same (WATCH/MULTI). A booking committed and invalidated in
+# between therefore cannot be undone by that late SET.
+#
+# Every web process also keeps rendered /parking/lots responses in its L1
+# cache (extensions.l1_cache), tagged with the lots they contain; the
+# helpers below invalidate those too.
+
+LOT_LIST_ALL_KEY_A = "parking_lots_user_all"
+
+
+def lot_key_a(lot_id):
+    return f"parking_lot_user_{lot_id}"
+
+
+def lot_gen_key_a(lot_id):
+    return f"parking_lot_gen_{lot_id}"
+
+
+def lot_tag_a(lot_id):
+    return f"lot:{lot_id}"
+
+
+def lot_list_key_a(pin_code=None):
+    if pin_code:
+        return f"parking_lots_user_{pin_code}"
+    return LOT_LIST_ALL_KEY_A
+
+
+def invalidate_lots_a(lot_ids):
+    """Drop the cached entries of these lots (e.g. after a booking)."""
+    lot_ids = sorted(set(lot_ids))
+    if not lot_ids:
+        return
+    try:
+        pipe_a = get_redis().pipeline(transaction=True)
+        pipe_a.delete(*[lot_key_a(lot_id) for lot_id in lot_ids])
+        for lot_id in lot_ids:
+            pipe_a.incr(lot_gen_key_a(lot_id))
+        pipe_a.execute()
+        print(f"[CACHE] Invalidated parking lot entries for lots {lot_ids}")
+    except Exception as e:
+        print(f"[CACHE] Could not invalidate lot entries: {e}")
+    # after Redis: a process rebuilding on this message reads fresh entries
+    l1_invalidate(tags=[lot_tag_a(lot_id) for lot_id in lot_ids])
+
+
+def read_lot_entries_a(lot_ids):
+    """
+    One MGET for entries and counters: ({lot_id: lot dict}, {lot_id: counter}).
+    Lots without an entry are missing from the first dict.
+    """
+    lot_ids = list(lot_ids)
+    if not lot_ids:
+        return {}, {}
+    values_a = get_redis().mget(
+        [lot_key_a(i) for i in lot_ids] + [lot_gen_key_a(i) for i in lot_ids]
+    )
+    entries_a = {
+        lot_id: json.loads(raw_a)
+        for lot_id, raw_a in zip(lot_ids, values_a[: len(lot_ids)])
+        if raw_a
+    }
+    return entries_a, dict(zip(lot_ids, values_a[len(lot_ids):]))
+
+
+def store_lot_entries_a(lots, gens_seen, ex):
+    """
+    SET the entries of lots ({lot_id: lot dict}) whose counter still has
+    the value read before they were loaded (gens_seen). Returns how many
+    were stored; the rest are left for the next request.
+    """
+    lot_ids = [lot_id for lot_id in lots if lot_id in gens_seen]
+    if not lot_ids:
+        return 0
+
+    gen_keys_a = [lot_gen_key_a(i) for i in lot_ids]
+    with get_redis().pipeline(transaction=True) as pipe_a:
+        try:
+            pipe_a.watch(*gen_keys_a)
+            current_a = pipe_a.mget(gen_keys_a)
+            fresh_a = [
+                lot_id
+                for lot_id, gen_a in zip(lot_ids, current_a)
+                if gen_a == gens_seen[lot_id]
+            ]
+            pipe_a.multi()
+            for lot_id in fresh_a:
+                pipe_a.set(lot_key_a(lot_id), json.dumps(lots[lot_id]), ex=ex)
+            pipe_a.execute()
+        except WatchError:
+            # one of the lots changed while we stored: keep none of them
+            return 0
+    return len(fresh_a)
+
+
+def invalidate_lot_lists_a(pin_codes=()):
+    """Drop the id lists: 'all' plus the given pin codes."""
+    keys_a = {LOT_LIST_ALL_KEY_A}
+    keys_a.update(lot_list_key_a(pin) for pin in pin_codes if pin)
+    try:
+        get_redis().delete(*keys_a)
+    except Exception as e:
+        print(f"[CACHE] Could not invalidate lot lists: {e}")
+    l1_invalidate(keys=keys_a)
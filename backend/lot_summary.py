@@ -0,0 +1,106 @@
+# backend/lot_summary.py
+
+from sqlalchemy import func, or_, select
+
+from extensions import db
+from models import ParkingLot, ParkingSlot
+
+
+def adjust_lot_counters_a(lot_id, occupied_delta):
+    """
+    Move occupied_delta slots of a lot from free to occupied (or back)
+    and bump the lot's slots_version.
+
+    Runs as a single UPDATE with column arithmetic so concurrent writers
+    never lose an increment. It joins the caller's transaction; the
+    caller commits together with the slot change. Callers run it BEFORE
+    updating the slots: the lot row is then locked first, so slots can
+    take the new version (lot_slots_version_sq_a) in commit order.
+    """
+    if not occupied_delta:
+        return
+
+    db.session.query(ParkingLot).filter(ParkingLot.id == lot_id).update(
+        {
+            ParkingLot.occupied_slots: ParkingLot.occupied_slots + occupied_delta,
+            ParkingLot.free_slots: ParkingLot.free_slots - occupied_delta,
+            ParkingLot.slots_version: ParkingLot.slots_version + 1,
+        },
+        synchronize_session=False,
+    )
+
+
+def lot_slots_version_sq_a():
+    """Current slots_version of the slot's own lot, for UPDATE ... SET version."""
+    return (
+        select(ParkingLot.slots_version)
+        .where(ParkingLot.id == ParkingSlot.lot_id)
+        .scalar_subquery()
+    )
+
+
+def reconcile_lot_counters_a(repair=True):
+    """
+    Find lots whose counters disagree with parking_slots and optionally fix them.
+
+    Returns a list of dicts describing each drifted lot (stored vs actual).
+    The repair is one UPDATE with correlated subqueries, so it is computed
+    and applied atomically.
+    """
+    total_sq = (
+        select(func.count(ParkingSlot.id))
+        .where(ParkingSlot.lot_id == ParkingLot.id)
+        .scalar_subquery()
+    )
+    busy_sq = (
+        select(func.count(ParkingSlot.id))
+        .where(
+            ParkingSlot.lot_id == ParkingLot.id,
+            ParkingSlot.is_occupied == True,  # noqa: E712
+        )
+        .scalar_subquery()
+    )
+
+    rows_a = (
+        db.session.query(
+            ParkingLot.id,
+            ParkingLot.total_slots,
+            ParkingLot.occupied_slots,
+            ParkingLot.free_slots,
+            total_sq,
+            busy_sq,
+        )
+        .filter(
+            or_(
+                ParkingLot.total_slots != total_sq,
+                ParkingLot.occupied_slots != busy_sq,
+                ParkingLot.free_slots != total_sq - busy_sq,
+            )
+        )
+        .all()
+    )
+
+    drifted_a = [
+        {
+            "lot_id": lot_id,
+            "stored": {"total": total, "occupied": occupied, "free": free},
+            "actual": {"total": real_total, "occupied": real_busy,
+                       "free": real_total - real_busy},
+        }
+        for lot_id, total, occupied, free, real_total, real_busy in rows_a
+    ]
+
+    if repair and drifted_a:
+        db.session.query(ParkingLot).filter(
+            ParkingLot.id.in_([d["lot_id"] for d in drifted_a])
+        ).update(
+            {
+                ParkingLot.total_slots: total_sq,
+                ParkingLot.occupied_slots: busy_sq,
+                ParkingLot.free_slots: total_sq - busy_sq,
+            },
+            synchronize_session=False,
+        )
+        db.session.commit()
+
+    return drifted_a
@@ -0,0 +1,254 @@
+# backend/mailer.py
+
+import queue
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+
+from config import Config
+
+# -------------------------------------------------
+# POOLED, BATCHED SMTP DELIVERY
+# -------------------------------------------------
+# One Mailer per process keeps up to MAIL_POOL_SIZE SMTP connections open.
+# A batch borrows one connection and sends every message over it, under a
+# shared messages-per-second limit, retrying transient failures with
+# exponential backoff on a fresh connection. Works against MailHog or any
+# local SMTP stand-in (e.g. `python -m aiosmtpd -n -l localhost:1025`).
+
+
+class RateLimiter:
+    """Token bucket shared by all threads of the process (0 = unlimited)."""
+
+    def __init__(self, per_second):
+        self.per_second = float(per_second or 0)
+        self._lock = threading.Lock()
+        self._tokens = self.per_second
+        self._updated = time.monotonic()
+
+    def wait(self):
+        if self.per_second <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.per_second,
+                    self._tokens + (now - self._updated) * self.per_second,
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.per_second
+            time.sleep(delay)
+
+
+class SMTPConnectionPool:
+    """Reusable smtplib.SMTP connections, at most `size` open at once."""
+
+    def __init__(self, host, port, size=4, timeout=10):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        return smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+
+    def acquire(self):
+        """Borrow a live connection (reused if it still answers NOOP)."""
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                try:
+                    if conn.noop()[0] == 250:
+                        return conn
+                except smtplib.SMTPException:
+                    pass
+                except OSError:
+                    pass
+                self._close(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, broken=False):
+        if conn is not None:
+            if broken:
+                self._close(conn)
+            else:
+                self._idle.put(conn)
+        self._slots.release()
+
+    def reconnect(self, conn):
+        """Replace a broken connection while keeping the borrowed slot."""
+        self._close(conn)
+        return self._connect()
+
+    def close_all(self):
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.quit()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+# errors worth retrying on a new connection
+_TRANSIENT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError)
+
+
+class _ConnectionLost(Exception):
+    """Retries ran out; carries the connection in use by then (or None)."""
+
+    def __init__(self, conn, error):
+        super().__init__(str(error))
+        self.conn = conn
+
+
+class Mailer:
+
+    def __init__(self, host, port, from_email, pool_size=4, rate_per_second=0,
+                 max_retries=3, backoff_seconds=0.5):
+        self.from_email = from_email
+        self.pool = SMTPConnectionPool(host, port, size=pool_size)
+        self.limiter = RateLimiter(rate_per_second)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+
+    def build_message(self, to_email, subject, html_body):
+        msg = MIMEText(html_body, "html")
+        msg["Subject"] = subject
+        msg["From"] = self.from_email
+        msg["To"] = to_email
+        return msg
+
+    def send_batch(self, messages):
+        """
+        Send [(to_email, subject, html_body), ...] over one pooled connection.
+
+        Returns the number of messages the server accepted. Permanent
+        failures (e.g. recipient refused) are logged and skipped.
+        """
+        if not messages:
+            return 0
+
+        started = time.perf_counter()
+        sent_count = 0
+        conn = None
+        acquired = False
+        broken = False
+
+        try:
+            conn = self.pool.acquire()
+            acquired = True
+            for to_email, subject, html_body in messages:
+                payload = self.build_message(to_email, subject, html_body).as_string()
+                self.limiter.wait()
+                ok, conn = self._send_with_retry(conn, to_email, payload)
+                sent_count += ok
+        except Exception as e:
+            # the retries may have swapped the connection: give back that one
+            if isinstance(e, _ConnectionLost):
+                conn = e.conn
+            # Do not crash the calling job if the mail server is unreachable
+            broken = True
+            print(f"[EMAIL] Batch aborted after {sent_count} mail(s): {e}")
+        finally:
+            # if acquire() itself failed there is nothing to give back
+            if acquired:
+                self.pool.release(conn, broken=broken)
+
+        elapsed = time.perf_counter() - started
+        rate = sent_count / elapsed if elapsed > 0 else 0.0
+        print(
+            f"[EMAIL] Batch sent {sent_count}/{len(messages)} mail(s) "
+            f"in {elapsed:.2f}s ({rate:.1f} msg/s)"
+        )
+        return sent_count
+
+    def _send_with_retry(self, conn, to_email, payload):
+        """
+        Send one message. Returns (1 if accepted else 0, connection in use).
+
+        4xx replies and dropped connections are retried on a fresh
+        connection (a 4xx such as 421 often means the server is ending the
+        session). When the server stays unreachable, _ConnectionLost hands
+        the current connection back to send_batch for release.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                conn.sendmail(self.from_email, [to_email], payload)
+                return 1, conn
+            except smtplib.SMTPRecipientsRefused as e:
+                print(f"[EMAIL] Recipient refused {to_email}: {e}")
+                return 0, conn
+            except smtplib.SMTPResponseException as e:
+                # 4xx is temporary, 5xx is permanent
+                temporary = 400 <= e.smtp_code < 500
+                if not temporary or attempt == self.max_retries:
+                    print(f"[EMAIL] Failed to send mail to {to_email}: {e}")
+                    return 0, conn
+                error = e
+            except _TRANSIENT_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise _ConnectionLost(conn, e) from e
+                error = e
+
+            print(f"[EMAIL] Retrying {to_email} after error: {error}")
+            time.sleep(self.backoff_seconds * (2 ** attempt))
+            try:
+                conn = self.pool.reconnect(conn)
+            except _TRANSIENT_ERRORS as e:
+                # reconnect closed the old connection before failing
+                raise _ConnectionLost(None, e) from e
+
+        return 0, conn
+
+
+_mailer = None
+_mailer_lock = threading.Lock()
+
+
+def get_mailer():
+    """Process-wide Mailer built from Config (created on first use)."""
+    global _mailer
+    if _mailer is None:
+        with _mailer_lock:
+            if _mailer is None:
+                _mailer = Mailer(
+                    Config.MAIL_SERVER,
+                    Config.MAIL_PORT,
+                    Config.FROM_EMAIL,
+                    pool_size=Config.MAIL_POOL_SIZE,
+                    rate_per_second=Config.MAIL_RATE_LIMIT_PER_SEC,
+                    max_retries=Config.MAIL_MAX_RETRIES,
+                    backoff_seconds=Config.MAIL_RETRY_BACKOFF_SECONDS,
+                )
+    return _mailer
+
+
+def send_bulk_email(messages, batch_size=None):
+    """Send many [(to, subject, html)] in batches of MAIL_BATCH_SIZE."""
+    batch_size = batch_size or Config.MAIL_BATCH_SIZE
+    mailer = get_mailer()
+    sent_count = 0
+    for i in range(0, len(messages), batch_size):
+        sent_count += mailer.send_batch(messages[i:i + batch_size])
+    return sent_count
@@ -21,6 +21,14 @@ class User(db.Model):
 
 class ParkingLot(db.Model):
     __tablename__ = "parking_lots"
+    __table_args__ = (
+        # /parking/lots?pin_code=...
+        db.Index("ix_parking_lots_pin_code", "pin_code"),
+        # ids are never reused: lot ids key the slot-map ETags, the cached
+        # slot runs and the Redis pools/bitmaps, so a new lot must not
+        # inherit a deleted lot's id (see db_upgrade for existing files)
+        {"sqlite_autoincrement": True},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -29,18 +37,48 @@ class ParkingLot(db.Model):
     total_slots = db.Column(db.Integer, nullable=False, default=0)
     price_per_hour = db.Column(db.Float, nullable=False, default=0.0)
 
+    # live counters, kept in step with parking_slots.is_occupied by
+    # lot_summary.adjust_lot_counters_a (see reconcile_lot_counters_a)
+    occupied_slots = db.Column(db.Integer, nullable=False, default=0)
+    free_slots = db.Column(db.Integer, nullable=False, default=0)
+
+    # bumped on every occupancy change; layout_version is the slots_version
+    # at which slots were last added/removed (older deltas are not enough)
+    slots_version = db.Column(db.Integer, nullable=False, default=0)
+    layout_version = db.Column(db.Integer, nullable=False, default=0)
+
 
 class ParkingSlot(db.Model):
     __tablename__ = "parking_slots"
+    __table_args__ = (
+        # slots of a lot, free slots of a lot (listing, book-any, pools)
+        db.Index("ix_parking_slots_lot_id_is_occupied", "lot_id", "is_occupied"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     lot_id = db.Column(db.Integer, db.ForeignKey("parking_lots.id"), nullable=False)
     slot_number = db.Column(db.String(20), nullable=False)
     is_occupied = db.Column(db.Boolean, default=False)
 
+    # lot slots_version of this slot's last occupancy change
+    version = db.Column(db.Integer, nullable=False, default=0)
+
 
 class Booking(db.Model):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # booking history pages: WHERE user_id [AND status] ORDER BY id DESC
+        db.Index("ix_bookings_user_id_id", "user_id", "id"),
+        db.Index("ix_bookings_user_status_id", "user_id", "status", "id"),
+        # a user's bookings by time: daily reminders, user exports
+        db.Index("ix_bookings_user_id_start_time", "user_id", "start_time"),
+        # stale ACTIVE bookings (cleanup), bookings of a status by time
+        db.Index("ix_bookings_status_start_time", "status", "start_time"),
+        # all bookings of a period: monthly report, admin export counts
+        db.Index("ix_bookings_start_time", "start_time"),
+        # bookings of a slot, "slot still has an ACTIVE booking" checks
+        db.Index("ix_bookings_slot_id_status", "slot_id", "status"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -61,6 +99,21 @@ class ExportJob(db.Model):
     user_id = db.Column(db.Integer, nullable=False)  
     status = db.Column(db.String(20), default="PENDING")  
     file_path = db.Column(db.String(255), nullable=True)
+    file_format = db.Column(db.String(20), nullable=False, default="csv")
     error_message = db.Column(db.Text, nullable=True)
+
+    # progress, updated by the export task after every chunk
+    rows_total = db.Column(db.Integer, nullable=True)
+    rows_written = db.Column(db.Integer, nullable=False, default=0)
+    bytes_written = db.Column(db.Integer, nullable=False, default=0)
+
+    # admin-wide export: "ALL" bookings in [range_start, range_end),
+    # written by partitions_total parallel tasks (one per lot)
+    scope = db.Column(db.String(10), nullable=False, default="USER")
+    range_start = db.Column(db.DateTime, nullable=True)
+    range_end = db.Column(db.DateTime, nullable=True)
+    partitions_total = db.Column(db.Integer, nullable=True)
+    partitions_done = db.Column(db.Integer, nullable=False, default=0)
+
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime, nullable=True)
\ No newline at end of file
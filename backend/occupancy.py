@@ -0,0 +1,199 @@
+# backend/occupancy.py
+
+import math
+
+from sqlalchemy import and_, exists, update
+
+from extensions import db
+from lot_cache import invalidate_lots_a
+from lot_summary import adjust_lot_counters_a, lot_slots_version_sq_a
+from models import Booking, ParkingSlot
+from slot_bitmap import sync_bitmap_changes_a
+from slot_events import publish_slot_changes_a
+from slot_pool import pool_pop_a, pool_remove_a, sync_pool_changes_a
+
+# how many stale pool entries / lost races to tolerate before giving up
+CLAIM_ANY_ATTEMPTS_A = 5
+
+# -------------------------------------------------
+# SLOT CLAIM / FREE
+# -------------------------------------------------
+# Every occupancy change goes through a conditional UPDATE, so the database
+# decides which of several concurrent requests wins a slot. No row is read
+# and written back, and no lock is held outside the statement itself.
+#
+# The lot row (counters + slots_version) is updated first and the slot then
+# records that version, so "slots changed since version N" is exact. A lost
+# race undoes the counters; the extra version bump is harmless.
+
+
+def claim_slot_a(slot_id, lot_id):
+    """
+    Mark a free slot occupied. Returns True if this call claimed it.
+
+    UPDATE parking_slots SET is_occupied = 1, version = <lot slots_version>
+    WHERE id = :slot_id AND lot_id = :lot_id AND is_occupied IS NOT 1
+
+    Exactly one concurrent caller sees rowcount == 1. The lot counters are
+    moved in the same transaction; the caller commits. A lost claim also
+    drops the slot from the lot's free-slot pool, should a late update
+    have left it there.
+    """
+    adjust_lot_counters_a(lot_id, +1)
+
+    result_a = db.session.execute(
+        update(ParkingSlot)
+        .where(
+            ParkingSlot.id == slot_id,
+            ParkingSlot.lot_id == lot_id,
+            ParkingSlot.is_occupied.isnot(True),
+        )
+        .values(is_occupied=True, version=lot_slots_version_sq_a())
+        .execution_options(synchronize_session=False)
+    )
+    if result_a.rowcount != 1:
+        adjust_lot_counters_a(lot_id, -1)
+        pool_remove_a(lot_id, [slot_id])
+        return False
+
+    return True
+
+
+def free_slot_a(slot_id, lot_id):
+    """
+    Mark an occupied slot free. Returns True if this call freed it.
+
+    Freeing an already-free slot is a no-op, so the counters never go
+    below the real number of occupied slots.
+    """
+    adjust_lot_counters_a(lot_id, -1)
+
+    result_a = db.session.execute(
+        update(ParkingSlot)
+        .where(ParkingSlot.id == slot_id, ParkingSlot.is_occupied == True)  # noqa: E712
+        .values(is_occupied=False, version=lot_slots_version_sq_a())
+        .execution_options(synchronize_session=False)
+    )
+    if result_a.rowcount != 1:
+        adjust_lot_counters_a(lot_id, +1)
+        return False
+
+    return True
+
+
+def unbooked_occupied_slots_query_a(slot_ids):
+    """
+    (lot_id, slot_id) of the slots among slot_ids that are still marked
+    occupied but no longer have an ACTIVE booking.
+    """
+    still_booked_a = exists().where(
+        and_(Booking.slot_id == ParkingSlot.id, Booking.status == "ACTIVE")
+    )
+    return db.session.query(ParkingSlot.lot_id, ParkingSlot.id).filter(
+        ParkingSlot.id.in_(slot_ids),
+        ParkingSlot.is_occupied == True,  # noqa: E712
+        ~still_booked_a,
+    )
+
+
+def free_slot_query_a(lot_id):
+    """Some free slot of a lot (the SQL fallback of claim_any_slot_a)."""
+    return (
+        db.session.query(ParkingSlot.id)
+        .filter(
+            ParkingSlot.lot_id == lot_id,
+            ParkingSlot.is_occupied.isnot(True),
+        )
+        .limit(1)
+    )
+
+
+def free_slots_without_booking_a(slot_ids):
+    """
+    Set-based free: mark occupied slots among slot_ids free when they no
+    longer have an ACTIVE booking. Used after closing bookings in bulk.
+
+    Returns [(lot_id, slot_id), ...] that were freed; lot counters are
+    moved with one UPDATE per lot. The caller commits.
+    """
+    slot_ids = list(slot_ids)
+    if not slot_ids:
+        return []
+
+    freed_a = unbooked_occupied_slots_query_a(slot_ids).all()
+    if not freed_a:
+        return []
+
+    per_lot_a = {}
+    for lot_id, _ in freed_a:
+        per_lot_a[lot_id] = per_lot_a.get(lot_id, 0) + 1
+    for lot_id, count_a in per_lot_a.items():
+        adjust_lot_counters_a(lot_id, -count_a)
+
+    db.session.execute(
+        update(ParkingSlot)
+        .where(ParkingSlot.id.in_([slot_id for _, slot_id in freed_a]))
+        .values(is_occupied=False, version=lot_slots_version_sq_a())
+        .execution_options(synchronize_session=False)
+    )
+
+    return [tuple(row) for row in freed_a]
+
+
+def claim_any_slot_a(lot_id):
+    """
+    Claim some free slot in a lot. Returns its id, or None if the lot is full.
+
+    Candidates come from the Redis free-slot pool (SPOP, O(1)). If the pool
+    is empty, unavailable or keeps handing out stale ids, fall back to
+    picking a free slot in SQL. Either way the conditional UPDATE in
+    claim_slot_a decides, so two callers never get the same slot.
+    """
+    for _ in range(CLAIM_ANY_ATTEMPTS_A):
+        slot_id_a = pool_pop_a(lot_id)
+        if slot_id_a is None:
+            break
+        if claim_slot_a(slot_id_a, lot_id):
+            return slot_id_a
+
+    for _ in range(CLAIM_ANY_ATTEMPTS_A):
+        slot_id_a = free_slot_query_a(lot_id).scalar()
+        if slot_id_a is None:
+            return None
+        if claim_slot_a(slot_id_a, lot_id):
+            return slot_id_a
+
+    return None
+
+
+def on_slots_changed_a(changes):
+    """
+    Post-commit side effects of occupancy changes.
+
+    changes: [(lot_id, slot_id, is_occupied), ...] that are already committed.
+    """
+    if not changes:
+        return
+    sync_pool_changes_a(changes)
+    invalidate_lots_a(lot_id for lot_id, _, _ in changes)
+    sync_bitmap_changes_a(changes)
+    publish_slot_changes_a(changes)
+
+
+# -------------------------------------------------
+# BILLING
+# -------------------------------------------------
+def compute_amount_a(start_time, end_time, price_per_hour):
+    """
+    Return (amount, billed_hours) for a booking.
+
+    Full hours are billed, rounded up, with a minimum of one hour.
+    A booking without a start time is not billed.
+    """
+    if not start_time:
+        return 0.0, 0
+
+    hours_a = (end_time - start_time).total_seconds() / 3600
+    billed_hours_a = max(1, math.ceil(hours_a))
+
+    return billed_hours_a * (price_per_hour or 0.0), billed_hours_a
@@ -0,0 +1,171 @@
+# backend/query_plans.py
+
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import sqlite
+
+from booking_export import booking_chunk_query_a, partition_criteria_a
+from extensions import db
+from job_queries import (
+    monthly_usage_query_a,
+    stale_bookings_query_a,
+    users_without_booking_query_a,
+)
+from models import Booking, User
+from occupancy import free_slot_query_a, unbooked_occupied_slots_query_a
+from routes.admin_routes import users_page_query_a
+from routes.booking_routes import history_query_a
+from routes.parking_routes import lot_slots_query_a, lots_query_a
+
+# -------------------------------------------------
+# HOT QUERIES AND THE INDEX EACH ONE MUST USE
+# -------------------------------------------------
+# The queries the routes and jobs run most, with the index from models.py
+# they are meant to hit. check_query_plans_a() runs EXPLAIN QUERY PLAN
+# (SQLite) on each of them, so a dropped index or a rewritten filter that
+# stops using it shows up before it shows up as latency.
+#
+# Each entry calls the same query builder its route or job calls (with
+# sample arguments), so the plan is the plan of the SQL actually sent;
+# changing a route's query changes what is checked here.
+#
+# By default the plans come from an empty in-memory database created from
+# the models: without ANALYZE statistics the planner's choice depends only
+# on the schema, so the result is the same on every machine. (On a small,
+# ANALYZEd dev database SQLite rightly prefers scanning a 10-row table.)
+#
+# (name, expected index, builder -> Query or select)
+
+_T0 = datetime(2024, 1, 1)
+_T1 = datetime(2024, 1, 2)
+
+HOT_QUERIES_A = [
+    (
+        "lots by pin code (/parking/lots)",
+        "ix_parking_lots_pin_code",
+        lambda: lots_query_a("560001"),
+    ),
+    (
+        "free slots of a lot (/parking/lots/<id>/slots?only_free)",
+        "ix_parking_slots_lot_id_is_occupied",
+        lambda: lot_slots_query_a(1, only_free=True),
+    ),
+    (
+        "slots changed since a version (/parking/lots/<id>/slots?since_version)",
+        "ix_parking_slots_lot_id_is_occupied",
+        lambda: lot_slots_query_a(1, since_version=42),
+    ),
+    (
+        "some free slot (book-any fallback)",
+        "ix_parking_slots_lot_id_is_occupied",
+        lambda: free_slot_query_a(1),
+    ),
+    (
+        "history page (/parking/history)",
+        "ix_bookings_user_id_id",
+        lambda: history_query_a(1, 50, before_id=1000),
+    ),
+    (
+        "history page by status (/parking/history?status)",
+        "ix_bookings_user_status_id",
+        lambda: history_query_a(1, 50, status="ACTIVE"),
+    ),
+    (
+        "users page (/admin/users)",
+        "INTEGER PRIMARY KEY",
+        lambda: users_page_query_a(50, after_id=100),
+    ),
+    (
+        "user export chunk",
+        "ix_bookings_user_id_start_time",
+        lambda: booking_chunk_query_a(
+            [Booking.user_id == 1], 1000, after=(_T0, 10)
+        ),
+    ),
+    (
+        "admin export partition chunk (one lot)",
+        "ix_bookings_slot_id_status",
+        lambda: booking_chunk_query_a(
+            partition_criteria_a(_T0, _T1, 1), 1000, after=(_T0, 10)
+        ),
+    ),
+    (
+        "admin export partition chunk (slot / lot gone)",
+        "ix_bookings_start_time",
+        lambda: booking_chunk_query_a(
+            partition_criteria_a(_T0, _T1, None), 1000, after=(_T0, 10)
+        ),
+    ),
+    (
+        "stale ACTIVE bookings (cleanup batch)",
+        "ix_bookings_status_start_time",
+        lambda: stale_bookings_query_a(_T0, 0, 500),
+    ),
+    (
+        "slot still booked (release / cleanup)",
+        "ix_bookings_slot_id_status",
+        lambda: unbooked_occupied_slots_query_a([1, 2, 3]),
+    ),
+    (
+        "users without a booking today (reminder anti-join)",
+        "ix_bookings_user_id_start_time",
+        lambda: users_without_booking_query_a(_T0, _T1)
+        .filter(User.id > 0)
+        .limit(500),
+    ),
+    (
+        "monthly activity aggregate (monthly report)",
+        "ix_bookings_start_time",
+        lambda: monthly_usage_query_a(_T0, _T1),
+    ),
+]
+
+
+def explain_a(connection, statement):
+    """EXPLAIN QUERY PLAN rows' detail strings for a SQLAlchemy statement or Query."""
+    statement = getattr(statement, "statement", statement)
+    # named parameters, so the SQL can be re-run through text()
+    compiled_a = statement.compile(
+        dialect=sqlite.dialect(paramstyle="named"),
+        compile_kwargs={"render_postcompile": True},
+    )
+    rows_a = connection.execute(
+        text(f"EXPLAIN QUERY PLAN {compiled_a}"), compiled_a.params
+    ).all()
+    return [row_a[-1] for row_a in rows_a]
+
+
+def check_query_plans_a(live=False):
+    """
+    Returns [{"query", "index", "ok", "plan"}, ...] for HOT_QUERIES_A.
+
+    ok means the expected index appears in the plan (SQLite only).
+    live=True explains against the app's database instead of a fresh
+    schema built from the models.
+    """
+    if live:
+        return _check_plans_a(db.session)
+
+    engine_a = create_engine("sqlite://")
+    try:
+        db.metadata.create_all(engine_a)
+        with engine_a.connect() as conn_a:
+            return _check_plans_a(conn_a)
+    finally:
+        engine_a.dispose()
+
+
+def _check_plans_a(connection):
+    results_a = []
+    for name_a, index_a, build_a in HOT_QUERIES_A:
+        plan_a = explain_a(connection, build_a())
+        results_a.append(
+            {
+                "query": name_a,
+                "index": index_a,
+                "ok": any(index_a in line_a for line_a in plan_a),
+                "plan": plan_a,
+            }
+        )
+    return results_a
@@ -1,27 +1,95 @@
 # backend/routes/admin_routes.py
 
 from flask import Blueprint, request, jsonify
-from extensions import db, get_redis
+from sqlalchemy import Integer, cast, exists, func, insert, or_
+from active_users import active_user_flags_a
+from auth_tokens import authenticate_a
+from db_routing import mark_primary_sticky_a, replica_route_a
+from extensions import db, l1_cache
 from models import ParkingLot, ParkingSlot, Booking, User
+from lot_cache import invalidate_lot_lists_a, invalidate_lots_a
+from slot_bitmap import bitmap_drop_a, rebuild_lot_bitmaps_a
+from slot_events import publish_lot_resync_a
+from slot_pool import rebuild_free_slot_pools_a, pool_drop_a, pool_remove_a
 
 admin_bp = Blueprint("admin", __name__)
 
 
-def lot_to_dict_a(_lot_obj):
-    """Helper: convert ParkingLot to dict with slot info."""
-    total_a = ParkingSlot.query.filter_by(lot_id=_lot_obj.id).count()
-    busy_a = ParkingSlot.query.filter_by(
-        lot_id=_lot_obj.id, is_occupied=True
-    ).count()
-    free_a = total_a - busy_a
+@admin_bp.before_request
+def require_admin_a():
+    """Every /admin route needs an ADMIN token (CORS preflights pass through)."""
+    if request.method == "OPTIONS":
+        return None
+    return authenticate_a(role="ADMIN")
+
+
+def insert_slots_a(lot_id, first_num, last_num):
+    """Bulk-insert free slots S{first_num} .. S{last_num} (executemany)."""
+    rows_a = [
+        {"lot_id": lot_id, "slot_number": f"S{num_a}", "is_occupied": False}
+        for num_a in range(first_num, last_num + 1)
+    ]
+    if rows_a:
+        db.session.execute(insert(ParkingSlot), rows_a)
+    return len(rows_a)
 
+
+def remove_free_slots_a(lot_id, count_a):
+    """
+    Delete count_a free slots (highest ids first) with bulk statements.
+
+    Only slots that were never booked are removed, so a shrink never
+    touches booking history (history, exports and reports keep their
+    rows). Returns the deleted slot ids, or None if the lot does not have
+    that many such slots (or one was booked meanwhile); the caller rolls
+    back.
+    """
+    removable_a = (
+        ParkingSlot.lot_id == lot_id,
+        ParkingSlot.is_occupied.isnot(True),
+        ~exists().where(Booking.slot_id == ParkingSlot.id),
+    )
+    slot_ids_a = [
+        sid
+        for (sid,) in db.session.query(ParkingSlot.id)
+        .filter(*removable_a)
+        .order_by(ParkingSlot.id.desc())
+        .limit(count_a)
+        .all()
+    ]
+    if len(slot_ids_a) < count_a:
+        return None
+
+    deleted_a = ParkingSlot.query.filter(
+        ParkingSlot.id.in_(slot_ids_a), *removable_a
+    ).delete(synchronize_session=False)
+
+    if deleted_a != count_a:
+        return None
+    return slot_ids_a
+
+
+def max_slot_number_a(lot_id):
+    """Highest N among the lot's "S<N>" slot numbers (0 if none)."""
+    return (
+        db.session.query(
+            func.max(cast(func.substr(ParkingSlot.slot_number, 2), Integer))
+        )
+        .filter(ParkingSlot.lot_id == lot_id)
+        .scalar()
+        or 0
+    )
+
+
+def lot_to_dict_a(_lot_obj):
+    """Helper: convert ParkingLot to dict with slot info (from its counters)."""
     return {
         "id": _lot_obj.id,
         "name": _lot_obj.name,
         "address": _lot_obj.address,
         "pin_code": _lot_obj.pin_code,
-        "total_slots": total_a,
-        "free_slots": free_a,
+        "total_slots": _lot_obj.total_slots,
+        "free_slots": _lot_obj.free_slots,
         "price_per_hour": _lot_obj.price_per_hour,
     }
 
@@ -61,36 +129,37 @@ def create_parking_lot_a():
     except Exception:
         return jsonify({"message": "price_per_hour must be a number"}), 400
 
+    if total_slots_a < 1:
+        return jsonify({"message": "total_slots must be at least 1"}), 400
+
     lot_a = ParkingLot(
         name=name_a,
         address=address_a,
         pin_code=pin_code_a,
         total_slots=total_slots_a,
+        occupied_slots=0,
+        free_slots=total_slots_a,
         price_per_hour=price_a,
     )
     db.session.add(lot_a)
-    db.session.commit()
+    db.session.flush()   # assigns lot_a.id, still inside this transaction
 
-    # create slots S1 ... S{total}
-    for num_a in range(1, total_slots_a + 1):
-        slot_a = ParkingSlot(
-            lot_id=lot_a.id,
-            slot_number=f"S{num_a}",
-            is_occupied=False,
-        )
-        db.session.add(slot_a)
+    # create slots S1 ... S{total} with one bulk INSERT, same transaction
+    insert_slots_a(lot_a.id, 1, total_slots_a)
 
     db.session.commit()
+    mark_primary_sticky_a("admin")
 
-    # ✅ CLEAR CACHE after creating parking lot
+    # seed the Redis free-slot pool for "book any slot" and the bitmap
     try:
-        redis = get_redis()
-        redis.delete("parking_lots_user_all")
-        if pin_code_a:
-            redis.delete(f"parking_lots_user_{pin_code_a}")
-        print("[CACHE] Invalidated parking lot cache after CREATE")
-    except Exception:
-        pass
+        rebuild_free_slot_pools_a([lot_a.id])
+        rebuild_lot_bitmaps_a([lot_a.id])
+    except Exception as e:
+        print(f"[POOL] Could not seed pool for lot {lot_a.id}: {e}")
+
+    # ✅ CLEAR CACHE after creating parking lot (new id in the lists)
+    invalidate_lot_lists_a([pin_code_a])
+    print("[CACHE] Invalidated parking lot cache after CREATE")
 
     return (
         jsonify(
@@ -107,6 +176,7 @@ def create_parking_lot_a():
 # LIST ALL PARKING LOTS
 # ------------------------------------------
 @admin_bp.route("/parking-lots", methods=["GET"])
+@replica_route_a(scope="admin")
 def get_all_lots_a():
     lots_a = ParkingLot.query.all()
     output_a = [lot_to_dict_a(l) for l in lots_a]
@@ -124,6 +194,7 @@ def update_lot_a(lot_id):
     if not lot_a:
         return jsonify({"message": "Parking lot not found"}), 404
 
+    old_pin_code_a = lot_a.pin_code
     lot_a.name = data_a.get("name", lot_a.name)
     lot_a.address = data_a.get("address", lot_a.address)
     lot_a.pin_code = data_a.get("pin_code", lot_a.pin_code)
@@ -134,17 +205,81 @@ def update_lot_a(lot_id):
     except Exception:
         return jsonify({"message": "price_per_hour must be a number"}), 400
 
-    db.session.commit()
+    # optional: grow / shrink the lot (slots are added or removed in bulk)
+    added_a, removed_ids_a = 0, []
+    if data_a.get("total_slots") is not None:
+        try:
+            new_total_a = int(data_a.get("total_slots"))
+        except Exception:
+            return jsonify({"message": "total_slots must be an integer"}), 400
 
-    #  CLEAR CACHE after updating parking lot
-    try:
-        redis = get_redis()
-        redis.delete("parking_lots_user_all")
-        if lot_a.pin_code:
-            redis.delete(f"parking_lots_user_{lot_a.pin_code}")
-        print("[CACHE] Invalidated parking lot cache after UPDATE")
-    except Exception:
-        pass
+        if new_total_a < 1:
+            return jsonify({"message": "total_slots must be at least 1"}), 400
+
+        current_total_a = (
+            ParkingSlot.query.filter_by(lot_id=lot_id).count()
+        )
+
+        if new_total_a > current_total_a:
+            first_a = max_slot_number_a(lot_id) + 1
+            added_a = insert_slots_a(
+                lot_id, first_a, first_a + new_total_a - current_total_a - 1
+            )
+        elif new_total_a < current_total_a:
+            removed_ids_a = remove_free_slots_a(
+                lot_id, current_total_a - new_total_a
+            )
+            if removed_ids_a is None:
+                db.session.rollback()
+                return (
+                    jsonify(
+                        {
+                            "message": (
+                                "Not enough free, never-booked slots to remove "
+                                "(slots with booking history are kept). "
+                                "Choose a larger total_slots."
+                            )
+                        }
+                    ),
+                    400,
+                )
+
+        # a new layout: slot deltas from before it cannot describe it
+        delta_a = added_a - len(removed_ids_a)
+        if delta_a:
+            ParkingLot.query.filter_by(id=lot_id).update(
+                {
+                    ParkingLot.total_slots: ParkingLot.total_slots + delta_a,
+                    ParkingLot.free_slots: ParkingLot.free_slots + delta_a,
+                    ParkingLot.slots_version: ParkingLot.slots_version + 1,
+                    ParkingLot.layout_version: ParkingLot.slots_version + 1,
+                },
+                synchronize_session=False,
+            )
+
+    db.session.commit()
+    mark_primary_sticky_a("admin")
+
+    if added_a:
+        try:
+            rebuild_free_slot_pools_a([lot_id])
+        except Exception as e:
+            print(f"[POOL] Could not refresh pool for lot {lot_id}: {e}")
+    if removed_ids_a:
+        pool_remove_a(lot_id, removed_ids_a)
+    if added_a or removed_ids_a:
+        # slots were added/removed: the bitmap changes size
+        bitmap_drop_a(lot_id)
+
+    #  CLEAR CACHE after updating parking lot: its own entry, and the
+    #  id lists only when it moved to another pin code
+    invalidate_lots_a([lot_id])
+    if lot_a.pin_code != old_pin_code_a:
+        invalidate_lot_lists_a([old_pin_code_a, lot_a.pin_code])
+    print("[CACHE] Invalidated parking lot cache after UPDATE")
+
+    # live viewers reload the lot (details / slot list changed)
+    publish_lot_resync_a(lot_id)
 
     return (
         jsonify(
@@ -196,19 +331,21 @@ def delete_lot_a(lot_id):
     ParkingSlot.query.filter_by(lot_id=lot_id).delete()
 
     pin_code_to_clear = lot_a.pin_code
+    layout_version_a = lot_a.layout_version
 
     db.session.delete(lot_a)
     db.session.commit()
+    mark_primary_sticky_a("admin")
+
+    pool_drop_a(lot_id)
+    bitmap_drop_a(lot_id, layout_version_a)
 
     #  CLEAR CACHE after deleting parking lot
-    try:
-        redis = get_redis()
-        redis.delete("parking_lots_user_all")
-        if pin_code_to_clear:
-            redis.delete(f"parking_lots_user_{pin_code_to_clear}")
-        print("[CACHE] Invalidated parking lot cache after DELETE")
-    except Exception:
-        pass
+    invalidate_lots_a([lot_id])
+    invalidate_lot_lists_a([pin_code_to_clear])
+    print("[CACHE] Invalidated parking lot cache after DELETE")
+
+    publish_lot_resync_a(lot_id)
 
     return jsonify({"message": "Parking lot deleted"}), 200
 
@@ -216,38 +353,100 @@ def delete_lot_a(lot_id):
 # ------------------------------------------
 # LIST USERS (non-admin) + ACTIVE / INACTIVE
 # ------------------------------------------
+USERS_PAGE_SIZE_A = 50
+USERS_MAX_PAGE_SIZE_A = 200
+
+USER_COLUMNS_A = [User.id, User.name, User.email, User.role, User.created_at]
+
+
+def users_page_query_a(limit, after_id=None, search=None):
+    """
+    One /admin/users page (plus one row to tell whether more follow):
+    non-admin users after after_id, optionally matching search.
+    """
+    query_a = db.session.query(*USER_COLUMNS_A).filter(User.role != "ADMIN")
+
+    if after_id is not None:
+        query_a = query_a.filter(User.id > after_id)
+    if search:
+        pattern_a = f"%{search}%"
+        query_a = query_a.filter(
+            or_(User.name.ilike(pattern_a), User.email.ilike(pattern_a))
+        )
+
+    return query_a.order_by(User.id.asc()).limit(limit + 1)
+
+
 @admin_bp.route("/users", methods=["GET"])
+@replica_route_a(scope="admin")
 def list_users_a():
     """
-    Return all NON-ADMIN users for the Admin dashboard.
+    Return NON-ADMIN users for the Admin dashboard, one page at a time
+    (keyset on User.id, oldest first).
+
+    Query params (all optional):
+      limit=50          page size (max 200)
+      after_id=<id>     continue after the last user of the previous page
+      q=<text>          only users whose name or email contains the text
 
     is_active = True  if user has at least one ACTIVE booking
                  False otherwise
+    (from the active_booking_counts hash, see active_users.py)
+
+    Like /parking/history, the body stays a list and X-Next-Cursor holds
+    the after_id of the next page.
     """
-    users_a = (
-        User.query.filter(User.role != "ADMIN")
-        .order_by(User.id.asc())
-        .all()
-    )
+    try:
+        limit_a = int(request.args.get("limit", USERS_PAGE_SIZE_A))
+    except ValueError:
+        limit_a = 0
+    if limit_a < 1:
+        return jsonify({"message": "limit must be a positive integer"}), 400
+    limit_a = min(limit_a, USERS_MAX_PAGE_SIZE_A)
+
+    # a bad cursor must not silently restart at the first page
+    after_id_a = request.args.get("after_id")
+    if after_id_a is not None:
+        try:
+            after_id_a = int(after_id_a)
+        except ValueError:
+            return jsonify({"message": "after_id must be an integer"}), 400
+
+    search_a = (request.args.get("q") or "").strip()
+
+    # one extra row tells whether another page exists
+    rows_a = users_page_query_a(limit_a, after_id_a, search_a).all()
+    has_more_a = len(rows_a) > limit_a
+    rows_a = rows_a[:limit_a]
+
+    active_a = active_user_flags_a([row_a[0] for row_a in rows_a])
 
     result_a = []
-    for u in users_a:
-        has_active = (
-            Booking.query.filter_by(user_id=u.id, status="ACTIVE").count() > 0
-        )
-
+    for user_id, name, email, role, created_at in rows_a:
         result_a.append(
             {
-                "id": u.id,
-                "name": u.name,
-                "email": u.email,
-                "role": u.role,
-                "created_at": u.created_at.isoformat() if u.created_at else None,
-                "is_active": has_active,  # ✅ for UI badge
+                "id": user_id,
+                "name": name,
+                "email": email,
+                "role": role,
+                "created_at": created_at.isoformat() if created_at else None,
+                "is_active": active_a.get(user_id, False),  # ✅ for UI badge
             }
         )
 
-    return jsonify(result_a), 200
+    response_a = jsonify(result_a)
+    if has_more_a:
+        response_a.headers["X-Next-Cursor"] = str(rows_a[-1][0])
+        response_a.headers["Access-Control-Expose-Headers"] = "X-Next-Cursor"
+    return response_a, 200
+
+
+# ------------------------------------------
+# L1 CACHE STATS (this process only)
+# ------------------------------------------
+@admin_bp.route("/cache-stats", methods=["GET"])
+def cache_stats_a():
+    return jsonify(l1_cache.stats()), 200
 
 
 # ------------------------------------------
@@ -1,4 +1,12 @@
 from flask import Blueprint, request, jsonify
+from auth_tokens import (
+    auth_unavailable_response_a,
+    current_auth_a,
+    issue_token_a,
+    login_required_a,
+    revoke_token_a,
+    signing_key_ok_a,
+)
 from extensions import db, bcrypt
 from models import User
 
@@ -16,6 +24,9 @@ def register():
     if not name or not email or not password:
         return jsonify({"message": "Name, email and password are required"}), 400
 
+    if not signing_key_ok_a():
+        return auth_unavailable_response_a()
+
     # check if email already exists
     existing = User.query.filter_by(email=email).first()
     if existing:
@@ -44,7 +55,8 @@ def register():
             "name": user.name,
             "email": user.email,
             "role": user.role
-        }
+        },
+        "token": issue_token_a(user),
     }), 201
 
 
@@ -58,12 +70,15 @@ def login():
     if not email or not password:
         return jsonify({"message": "Email and password are required"}), 400
 
+    if not signing_key_ok_a():
+        return auth_unavailable_response_a()
+
     user = User.query.filter_by(email=email).first()
 
     if not user or not bcrypt.check_password_hash(user.password, password):
         return jsonify({"message": "Invalid email or password"}), 401
 
-    # For simplicity we just return user details (no JWT for now)
+    # signed token: send as "Authorization: Bearer <token>" (see auth_tokens.py)
     return jsonify(
         {
             "message": "Login successful",
@@ -73,5 +88,14 @@ def login():
                 "email": user.email,
                 "role": user.role,
             },
+            "token": issue_token_a(user),
         }
     ), 200
+
+
+@auth_bp.route("/logout", methods=["POST"])
+@login_required_a()
+def logout():
+    # the token stays on the denylist until it would have expired
+    revoke_token_a(current_auth_a())
+    return jsonify({"message": "Logged out"}), 200
@@ -1,11 +1,21 @@
 # backend/routes/booking_routes.py
 
 from flask import Blueprint, request, jsonify
-from datetime import datetime
-import math   # for hour rounding
+from datetime import datetime, timedelta
+from sqlalchemy import update
 
+from active_users import sync_active_users_a
+from auth_tokens import current_auth_a, login_required_a, may_act_for_a
+from db_routing import mark_primary_sticky_a, replica_route_a, user_scope_a
 from extensions import db
-from models import ParkingSlot, Booking, ParkingLot
+from models import ParkingSlot, Booking, ParkingLot, User
+from occupancy import (
+    claim_slot_a,
+    claim_any_slot_a,
+    free_slot_a,
+    compute_amount_a,
+    on_slots_changed_a,
+)
 
 booking_bp = Blueprint("booking", __name__)
 
@@ -14,27 +24,90 @@ booking_bp = Blueprint("booking", __name__)
 # BOOK SLOT
 # -------------------------------------------------
 @booking_bp.route("/book", methods=["POST"])
+@login_required_a()
 def book_slot():
     data = request.get_json() or {}
 
-    user_id = data.get("user_id")
+    # the token's user; an admin may book for the user_id in the body
+    user_id = data.get("user_id") or current_auth_a()["id"]
     slot_id = data.get("slot_id")
     vehicle_number = data.get("vehicle_number")
 
-    if not user_id or not slot_id or not vehicle_number:
-        return jsonify({"message": "user_id, slot_id and vehicle_number are required"}), 400
+    if not slot_id or not vehicle_number:
+        return jsonify({"message": "slot_id and vehicle_number are required"}), 400
+
+    if not may_act_for_a(user_id):
+        return jsonify({"message": "Not allowed to book for another user"}), 403
+
+    # the token's own user exists; one named by an admin may not
+    if user_id != current_auth_a()["id"] and not User.query.get(user_id):
+        return jsonify({"message": "User not found"}), 404
 
     slot = ParkingSlot.query.get(slot_id)
     if not slot:
         return jsonify({"message": "Slot not found"}), 404
 
-    if slot.is_occupied:
+    # Atomically mark slot occupied; loses cleanly if someone else got it first
+    if not claim_slot_a(slot.id, slot.lot_id):
+        db.session.rollback()
         return jsonify({"message": "Slot already booked"}), 400
 
-    # Mark slot occupied
-    slot.is_occupied = True
+    # Create booking (same transaction as the claim)
+    booking = Booking(
+        user_id=user_id,
+        slot_id=slot_id,
+        vehicle_number=vehicle_number,
+        start_time=datetime.utcnow(),
+        status="ACTIVE",
+    )
+
+    db.session.add(booking)
+    db.session.commit()
+    mark_primary_sticky_a(user_scope_a(user_id))
+    sync_active_users_a([user_id])
+
+    on_slots_changed_a([(slot.lot_id, slot.id, True)])
+
+    return jsonify({
+        "message": "Slot booked successfully",
+        "booking_id": booking.id,
+    }), 201
+
+
+# -------------------------------------------------
+# BOOK ANY FREE SLOT IN A LOT
+# -------------------------------------------------
+@booking_bp.route("/lots/<int:lot_id>/book-any", methods=["POST"])
+@login_required_a()
+def book_any_slot(lot_id):
+    """
+    Assign whichever slot is free in the lot, in one round trip.
+    Body: {"vehicle_number": ..., "user_id": ... (optional, defaults to the token's user)}
+    """
+    data = request.get_json() or {}
+
+    user_id = data.get("user_id") or current_auth_a()["id"]
+    vehicle_number = data.get("vehicle_number")
+
+    if not vehicle_number:
+        return jsonify({"message": "vehicle_number is required"}), 400
+
+    if not may_act_for_a(user_id):
+        return jsonify({"message": "Not allowed to book for another user"}), 403
+
+    # the token's own user exists; one named by an admin may not
+    if user_id != current_auth_a()["id"] and not User.query.get(user_id):
+        return jsonify({"message": "User not found"}), 404
+
+    lot = ParkingLot.query.get(lot_id)
+    if not lot:
+        return jsonify({"message": "Parking lot not found"}), 404
+
+    slot_id = claim_any_slot_a(lot_id)
+    if slot_id is None:
+        db.session.rollback()
+        return jsonify({"message": "No free slots in this parking lot"}), 409
 
-    # Create booking
     booking = Booking(
         user_id=user_id,
         slot_id=slot_id,
@@ -45,10 +118,18 @@ def book_slot():
 
     db.session.add(booking)
     db.session.commit()
+    mark_primary_sticky_a(user_scope_a(user_id))
+    sync_active_users_a([user_id])
+
+    on_slots_changed_a([(lot_id, slot_id, True)])
+
+    slot = ParkingSlot.query.get(slot_id)
 
     return jsonify({
         "message": "Slot booked successfully",
         "booking_id": booking.id,
+        "slot_id": slot_id,
+        "slot_number": slot.slot_number if slot else None,
     }), 201
 
 
@@ -56,6 +137,7 @@ def book_slot():
 # RELEASE SLOT (WITH AMOUNT CALCULATION)
 # -------------------------------------------------
 @booking_bp.route("/release", methods=["POST"])
+@login_required_a()
 def release_slot():
     data = request.get_json() or {}
 
@@ -69,6 +151,9 @@ def release_slot():
     if not booking:
         return jsonify({"message": "Booking not found"}), 404
 
+    if not may_act_for_a(booking.user_id):
+        return jsonify({"message": "Not allowed to release this booking"}), 403
+
     if booking.status != "ACTIVE":
         return jsonify({"message": "Booking already completed"}), 400
 
@@ -76,39 +161,40 @@ def release_slot():
     if not slot:
         return jsonify({"message": "Linked parking slot not found"}), 400
 
-    # Free slot
-    slot.is_occupied = False
-
-    # Complete booking
-    now = datetime.utcnow()
-    booking.end_time = now
-    booking.status = "COMPLETED"
-
     # -----------------------------------------------
     # AMOUNT CALCULATION LOGIC
     # -----------------------------------------------
-    amount = 0.0
-
-    if booking.start_time:
-        # Duration in hours
-        total_seconds = (now - booking.start_time).total_seconds()
-        hours = total_seconds / 3600
-
-        # Bill full hours (rounded up)
-        billed_hours = max(1, math.ceil(hours))
+    now = datetime.utcnow()
+    lot = ParkingLot.query.get(slot.lot_id)
+    amount, billed_hours = compute_amount_a(
+        booking.start_time, now, lot.price_per_hour if lot else 0.0
+    )
 
-        # Get lot price
-        lot = ParkingLot.query.get(slot.lot_id)
-        if lot and hasattr(lot, "price_per_hour"):
-            amount = billed_hours * lot.price_per_hour
+    # Complete booking only if it is still ACTIVE (a concurrent release
+    # or the cleanup job may have closed it since we read it)
+    closed = db.session.execute(
+        update(Booking)
+        .where(Booking.id == booking.id, Booking.status == "ACTIVE")
+        .values(status="COMPLETED", end_time=now, amount=amount)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if closed != 1:
+        db.session.rollback()
+        return jsonify({"message": "Booking already completed"}), 400
 
-    booking.amount = amount
+    # Free slot
+    freed = free_slot_a(slot.id, slot.lot_id)
 
     db.session.commit()
+    mark_primary_sticky_a(user_scope_a(booking.user_id))
+    sync_active_users_a([booking.user_id])
+
+    if freed:
+        on_slots_changed_a([(slot.lot_id, slot.id, False)])
 
     return jsonify({
         "message": "Slot released successfully",
-        "amount": booking.amount,
+        "amount": amount,
         "hours_charged": billed_hours,
     }), 200
 
@@ -116,20 +202,111 @@ def release_slot():
 # -------------------------------------------------
 # BOOKING HISTORY FOR A USER (WITH AMOUNT)
 # -------------------------------------------------
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+# only these columns are read; rows stay plain tuples
+HISTORY_COLUMNS = [
+    Booking.id,
+    Booking.slot_id,
+    Booking.vehicle_number,
+    Booking.start_time,
+    Booking.end_time,
+    Booking.status,
+    Booking.amount,
+]
+
+
+def history_query_a(user_id, limit, before_id=None, status=None, start=None, end=None):
+    """
+    One history page (plus one row to tell whether more follow), newest
+    first: bookings of user_id below before_id, optionally of one status
+    and started in [start, end).
+    """
+    query = db.session.query(*HISTORY_COLUMNS).filter(Booking.user_id == user_id)
+
+    if before_id is not None:
+        query = query.filter(Booking.id < before_id)
+    if status:
+        query = query.filter(Booking.status == status)
+    if start is not None:
+        query = query.filter(Booking.start_time >= start)
+    if end is not None:
+        query = query.filter(Booking.start_time < end)
+
+    return query.order_by(Booking.id.desc()).limit(limit + 1)
+
+
 @booking_bp.route("/history/<int:user_id>", methods=["GET"])
+@login_required_a()
+@replica_route_a()
 def booking_history(user_id):
-    bookings = Booking.query.filter_by(user_id=user_id).order_by(Booking.id.desc()).all()
+    """
+    Newest bookings first, one page at a time (keyset on Booking.id).
+
+    Query params (all optional):
+      limit=50                 page size (max 200)
+      before_id=<id>           continue after the last booking of the previous page
+      status=ACTIVE|COMPLETED  only bookings with that status
+      start_date, end_date     YYYY-MM-DD, on start_time (end_date inclusive)
+
+    The body stays a list; when more bookings follow, the X-Next-Cursor
+    header holds the before_id for the next page. Each page is a range
+    scan on ix_bookings_user_id_id / ix_bookings_user_status_id.
+    """
+    if not may_act_for_a(user_id):
+        return jsonify({"message": "Not allowed"}), 403
+
+    try:
+        limit = int(request.args.get("limit", HISTORY_PAGE_SIZE))
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        return jsonify({"message": "limit must be a positive integer"}), 400
+    limit = min(limit, HISTORY_MAX_PAGE_SIZE)
+
+    # a bad cursor must not silently restart at the newest page
+    before_id = request.args.get("before_id")
+    if before_id is not None:
+        try:
+            before_id = int(before_id)
+        except ValueError:
+            return jsonify({"message": "before_id must be an integer"}), 400
+
+    status = (request.args.get("status") or "").upper() or None
+
+    start_date = end_date = None
+    try:
+        if request.args.get("start_date"):
+            start_date = datetime.strptime(request.args["start_date"], "%Y-%m-%d")
+        if request.args.get("end_date"):
+            end_date = datetime.strptime(
+                request.args["end_date"], "%Y-%m-%d"
+            ) + timedelta(days=1)
+    except ValueError:
+        return jsonify({"message": "Dates must be in YYYY-MM-DD format"}), 400
+
+    # one extra row tells whether another page exists
+    rows = history_query_a(
+        user_id, limit, before_id, status, start_date, end_date
+    ).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
 
     result = []
-    for b in bookings:
+    for booking_id, slot_id, vehicle, start, end, b_status, amount in rows:
         result.append({
-            "booking_id": b.id,
-            "slot_id": b.slot_id,
-            "vehicle_number": b.vehicle_number,
-            "start_time": b.start_time.isoformat() if b.start_time else None,
-            "end_time": b.end_time.isoformat() if b.end_time else None,
-            "status": b.status,
-            "amount": b.amount,  # NEW
+            "booking_id": booking_id,
+            "slot_id": slot_id,
+            "vehicle_number": vehicle,
+            "start_time": start.isoformat() if start else None,
+            "end_time": end.isoformat() if end else None,
+            "status": b_status,
+            "amount": amount,  # NEW
         })
 
-    return jsonify(result), 200
+    response = jsonify(result)
+    if has_more:
+        response.headers["X-Next-Cursor"] = str(rows[-1][0])
+        response.headers["Access-Control-Expose-Headers"] = "X-Next-Cursor"
+    return response, 200
@@ -1,28 +1,65 @@
 # backend/routes/export_routes.py
 
+import os
+from datetime import datetime, timedelta
+
 from flask import Blueprint, request, jsonify, send_file
+from auth_tokens import current_auth_a, login_required_a, may_act_for_a
 from extensions import db
 from models import ExportJob
+from booking_export import EXPORT_FORMATS
 
 export_bp = Blueprint("export", __name__, url_prefix="/api/exports")
 
 
+def export_progress(job):
+    """Status payload for a job that is not DONE yet (with % complete)."""
+    percent = None
+    if job.rows_total:
+        percent = round(100.0 * (job.rows_written or 0) / job.rows_total, 1)
+    elif job.rows_total == 0:
+        percent = 100.0
+
+    return {
+        "export_id": job.id,
+        "status": job.status,
+        "file_format": job.file_format,
+        "rows_total": job.rows_total,
+        "rows_written": job.rows_written,
+        "bytes_written": job.bytes_written,
+        "percent_complete": percent,
+        "error_message": job.error_message,
+        "scope": job.scope,
+        "partitions_total": job.partitions_total,
+        "partitions_done": job.partitions_done,
+    }
+
+
 # -------------------------------------------------
-# START CSV EXPORT JOB
+# START BOOKINGS EXPORT JOB (CSV / Parquet)
 # -------------------------------------------------
 @export_bp.route("/bookings", methods=["POST"])
+@login_required_a()
 def start_export_bookings():
     # 👉 Import here to avoid circular import
     from celery_worker import export_user_bookings_csv
 
     data = request.get_json() or {}
-    user_id = data.get("user_id")
+    user_id = data.get("user_id") or current_auth_a()["id"]
+    # optional: {"format": "csv" | "csv.gz" | "parquet"},
+    # or {"compress": true} as a shortcut for "csv.gz"
+    file_format = data.get("format") or ("csv.gz" if data.get("compress") else "csv")
 
-    if not user_id:
-        return jsonify({"message": "user_id is required"}), 400
+    if not may_act_for_a(user_id):
+        return jsonify({"message": "Not allowed to export another user's bookings"}), 403
+
+    if file_format not in EXPORT_FORMATS:
+        return jsonify({
+            "message": "format must be one of: " + ", ".join(EXPORT_FORMATS)
+        }), 400
 
     # Create ExportJob row
-    job = ExportJob(user_id=user_id, status="PENDING")
+    job = ExportJob(user_id=user_id, status="PENDING", file_format=file_format)
     db.session.add(job)
     db.session.commit()
 
@@ -33,6 +70,58 @@ def start_export_bookings():
         "message": "Export started",
         "export_id": job.id,
         "status": job.status,
+        "file_format": job.file_format,
+    }), 202
+
+
+# -------------------------------------------------
+# START ADMIN EXPORT OF ALL BOOKINGS (date range)
+# -------------------------------------------------
+@export_bp.route("/all-bookings", methods=["POST"])
+@login_required_a(role="ADMIN")
+def start_export_all_bookings():
+    """
+    Admin: export every booking whose start_time falls in a date range.
+    Body: {"start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD" (inclusive),
+           "compress": false}; the job belongs to the admin of the token.
+    Runs as one Celery task per parking lot, merged into one file.
+    Poll / download with GET /api/exports/bookings/<export_id>.
+    """
+    from celery_worker import export_all_bookings_a
+
+    data = request.get_json() or {}
+    user_id = current_auth_a()["id"]
+
+    if not data.get("start_date") or not data.get("end_date"):
+        return jsonify({"message": "start_date and end_date are required"}), 400
+
+    try:
+        range_start = datetime.strptime(data["start_date"], "%Y-%m-%d")
+        range_end = datetime.strptime(data["end_date"], "%Y-%m-%d") + timedelta(days=1)
+    except ValueError:
+        return jsonify({"message": "Dates must be in YYYY-MM-DD format"}), 400
+
+    if range_end <= range_start:
+        return jsonify({"message": "end_date must not be before start_date"}), 400
+
+    job = ExportJob(
+        user_id=user_id,
+        status="PENDING",
+        scope="ALL",
+        file_format="csv.gz" if data.get("compress") else "csv",
+        range_start=range_start,
+        range_end=range_end,
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    export_all_bookings_a.delay(job.id)
+
+    return jsonify({
+        "message": "Export started",
+        "export_id": job.id,
+        "status": job.status,
+        "file_format": job.file_format,
     }), 202
 
 
@@ -40,15 +129,15 @@ def start_export_bookings():
 # CHECK STATUS + DOWNLOAD FILE
 # -------------------------------------------------
 @export_bp.route("/bookings/<int:export_id>", methods=["GET"])
+@login_required_a(allow_query_token=True)   # opened with window.open (no headers)
 def export_status(export_id):
     job = ExportJob.query.get_or_404(export_id)
 
+    if not may_act_for_a(job.user_id):
+        return jsonify({"message": "Not allowed"}), 403
+
     if job.status != "DONE":
-        return jsonify({
-            "export_id": job.id,
-            "status": job.status,
-            "error_message": job.error_message,
-        }), 200
+        return jsonify(export_progress(job)), 200
 
     if not job.file_path:
         return jsonify({
@@ -57,8 +146,11 @@ def export_status(export_id):
             "error_message": "File not found",
         }), 500
 
+    _, mimetype = EXPORT_FORMATS.get(job.file_format, EXPORT_FORMATS["csv"])
+
     return send_file(
         job.file_path,
         as_attachment=True,
-        mimetype="text/csv"
+        mimetype=mimetype,
+        download_name=os.path.basename(job.file_path),
     )
@@ -1,29 +1,69 @@
 # backend/routes/parking_routes.py
 
-from flask import Blueprint, request, jsonify
-from extensions import db, cache_get, cache_set   # ✅ use cache helpers
+from flask import Blueprint, Response, request, jsonify
+from config import Config
+from extensions import (   # ✅ use cache helpers
+    db,
+    cache_get,
+    cache_get_or_compute,
+    cache_set,
+    l1_generation,
+    l1_get,
+    l1_set,
+)
+from db_routing import replica_route_a, use_replica_a
+from lot_cache import (
+    lot_list_key_a,
+    lot_tag_a,
+    read_lot_entries_a,
+    store_lot_entries_a,
+)
+from slot_bitmap import lot_bitmap_a, lot_slot_runs_a, slot_runs_key_a
+from slot_events import sse_stream_a
 from models import ParkingLot, ParkingSlot
+import base64
 import json
+import zlib
 
 parking_bp = Blueprint("parking", __name__)
 
 
 def lot_to_dict_a(_lot_obj):
-    """Convert parking lot to dict for user."""
-    total_a = ParkingSlot.query.filter_by(lot_id=_lot_obj.id).count()
-    busy_a = ParkingSlot.query.filter_by(lot_id=_lot_obj.id, is_occupied=True).count()
-    free_a = total_a - busy_a
-
+    """Convert parking lot to dict for user (free count from lot counters)."""
     return {
         "id": _lot_obj.id,
         "name": _lot_obj.name,
         "address": _lot_obj.address,
         "pin_code": _lot_obj.pin_code,
-        "free_slots": free_a,
+        "free_slots": _lot_obj.free_slots,
         "price_per_hour": _lot_obj.price_per_hour,
     }
 
 
+def lot_meta_tag_a(lot_a):
+    """Short checksum of lot_to_dict_a: changes on a rename / price change."""
+    meta_a = json.dumps(lot_to_dict_a(lot_a), sort_keys=True)
+    return format(zlib.crc32(meta_a.encode("utf-8")), "08x")
+
+
+def lots_query_a(pin_code=None):
+    """Lots of the /parking/lots id list (all, or one pin code), by id."""
+    query_a = ParkingLot.query
+    if pin_code:
+        query_a = query_a.filter_by(pin_code=pin_code)
+    return query_a.order_by(ParkingLot.id)
+
+
+def lot_slots_query_a(lot_id, since_version=None, only_free=False):
+    """A lot's slots: all, only the free ones, or changed after since_version."""
+    query_a = ParkingSlot.query.filter_by(lot_id=lot_id)
+    if since_version is not None:
+        query_a = query_a.filter(ParkingSlot.version > since_version)
+    if only_free:
+        query_a = query_a.filter_by(is_occupied=False)
+    return query_a
+
+
 # -------------------------------------------------
 # LIST PARKING LOTS (with Redis cache + pin_code filter)
 # -------------------------------------------------
@@ -34,85 +74,255 @@ def list_lots_for_users_a():
     Optional query param: pin_code
     Example: /parking/lots?pin_code=560001
 
-    We use Redis to cache results.
-    We keep a separate cache key for each pin_code
-    (and one for 'all' when no pin_code is provided).
+    We use Redis to cache results, one entry per lot
+    (parking_lot_user_{id}). The 'all' / pin_code keys only hold
+    lot ids; the lot entries are then fetched with one MGET.
+    Bookings, releases and admin changes invalidate just the lots
+    they touch (see lot_cache.py). When an id list expires, one
+    request rebuilds it while the others keep the stale list.
+    The finished JSON body is also kept in this process (L1) for a
+    few seconds, tagged with its lots.
     """
     pin_code_a = request.args.get("pin_code")
+    list_key_a = lot_list_key_a(pin_code_a)
 
-    # build a cache key based on pin code
-    if pin_code_a:
-        cache_key_a = f"parking_lots_user_{pin_code_a}"
-    else:
-        cache_key_a = "parking_lots_user_all"
+    # 0) Already rendered in this process? (generation read first: an
+    #    invalidation from here on keeps this response out of L1)
+    l1_seen_a = l1_generation()
+    body_a = l1_get(list_key_a)
+    if body_a is not None:
+        return Response(body_a, status=200, mimetype="application/json")
+    loaded_a = {}   # lots read from DB by the id list rebuild
 
-    # 1) Try Redis cache first
+    def load_lot_ids_a():
+        print(f"[CACHE] Cache miss for key={list_key_a}. Querying database...")
+        for l in lots_query_a(pin_code_a).all():
+            loaded_a[l.id] = lot_to_dict_a(l)
+        return json.dumps(list(loaded_a))
+
+    # 1) Lot ids: single-flight rebuild, stale list served meanwhile
+    lot_ids_a = json.loads(
+        cache_get_or_compute(
+            list_key_a,
+            load_lot_ids_a,
+            ex=Config.LOT_CACHE_TTL_SECONDS,
+            stale_ttl=Config.LOT_CACHE_STALE_SECONDS,
+        )
+    )
+
+    # 2) Lot entries (and their invalidation counters): one MGET for
+    #    whatever the rebuild did not just load
+    wanted_a = [lot_id for lot_id in lot_ids_a if lot_id not in loaded_a]
     try:
-        cached_a = cache_get(cache_key_a)
-    except RuntimeError:
-        # Redis not initialised (safety fallback)
-        cached_a = None
+        cached_lots_a, gens_seen_a = read_lot_entries_a(wanted_a)
+    except Exception as e:
+        # Redis not initialised / unreachable (safety fallback)
+        print(f"[CACHE] Redis unavailable ({e}). Querying database...")
+        cached_lots_a, gens_seen_a = {}, {}
 
-    if cached_a:
-        print(f"[CACHE] Serving parking lots from Redis cache (key={cache_key_a})")
-        data_a = json.loads(cached_a)
-        return jsonify(data_a), 200
+    by_id_a = dict(loaded_a)
+    by_id_a.update(cached_lots_a)
 
-    print(f"[CACHE] Cache miss for key={cache_key_a}. Querying database...")
+    # 3) Only the invalidated / expired lots come from DB
+    missing_a = [lot_id for lot_id in wanted_a if lot_id not in by_id_a]
+    fetched_a = {}
+    if missing_a:
+        print(f"[CACHE] Loading lots {missing_a} from database")
+        for l in ParkingLot.query.filter(ParkingLot.id.in_(missing_a)).all():
+            fetched_a[l.id] = by_id_a[l.id] = lot_to_dict_a(l)
+    elif not loaded_a:
+        print(f"[CACHE] Serving parking lots from Redis cache (key={list_key_a})")
 
-    # 2) Not in cache → load from DB
-    query_a = ParkingLot.query
-    if pin_code_a:
-        query_a = query_a.filter_by(pin_code=pin_code_a)
+    # a lot deleted after the list was cached is simply left out
+    result_a = [by_id_a[lot_id] for lot_id in lot_ids_a if lot_id in by_id_a]
 
-    lots_a = query_a.all()
-    result_a = [lot_to_dict_a(lot_a) for lot_a in lots_a]
+    # 4) Store what came from the DB, unless the lot was invalidated since
+    #    step 2 (a late SET would bring back the old free count). Lots
+    #    loaded by the id list rebuild have no counter read before the DB
+    #    read, so they are served but left for the next request to cache.
+    if fetched_a:
+        try:
+            stored_a = store_lot_entries_a(
+                fetched_a, gens_seen_a, ex=Config.LOT_CACHE_TTL_SECONDS
+            )
+            print(
+                f"[CACHE] Stored {stored_a}/{len(fetched_a)} lot(s) in Redis "
+                f"(ttl={Config.LOT_CACHE_TTL_SECONDS}s)"
+            )
+        except Exception:
+            # Redis not available, skip caching
+            pass
 
-    # 3) Store in cache for 30 seconds
-    try:
-        cache_set(cache_key_a, json.dumps(result_a), ex=30)
-        print(f"[CACHE] Stored parking lots in Redis (key={cache_key_a}, ttl=30s)")
-    except RuntimeError:
-        # Redis not initialised, skip caching
-        pass
+    # 5) Serialize once; later hits in this process reuse the bytes
+    response_a = jsonify(result_a)
+    l1_set(
+        list_key_a,
+        response_a.get_data(),
+        tags=[lot_tag_a(i) for i in lot_ids_a],
+        seen=l1_seen_a,
+    )
 
-    return jsonify(result_a), 200
+    return response_a, 200
 
 
 # -------------------------------------------------
 # LIST SLOTS IN A LOT
 # -------------------------------------------------
+def lot_bitmap_payload_a(lot_a, send_runs):
+    """Compact occupancy: base64 bitset, counts from BITCOUNT."""
+    # a missing bitmap is rebuilt into Redis: from the primary, never a
+    # replica. The slot total comes from the primary too: lot_a may be a
+    # lagging replica's row, and free_slots mixes the two numbers.
+    with use_replica_a(False):
+        bits_a, occupied_a = lot_bitmap_a(lot_a.id)
+        total_a = (
+            db.session.query(ParkingLot.total_slots)
+            .filter(ParkingLot.id == lot_a.id)
+            .scalar()
+        )
+    if total_a is None:
+        total_a = lot_a.total_slots     # deleted on the primary meanwhile
+
+    payload_a = {
+        "lot": lot_to_dict_a(lot_a),
+        "format": "bitmap",
+        "bitmap": base64.b64encode(bits_a).decode("ascii"),
+        "bits": len(bits_a) * 8,
+        "occupied_slots": occupied_a,
+        "free_slots": total_a - occupied_a,
+        "layout_version": lot_a.layout_version,
+    }
+
+    if send_runs:
+        runs_key_a = slot_runs_key_a(lot_a.id, lot_a.layout_version)
+        try:
+            cached_a = cache_get(runs_key_a)
+        except Exception:
+            cached_a = None
+        if cached_a:
+            payload_a["slot_runs"] = json.loads(cached_a)
+        else:
+            payload_a["slot_runs"] = lot_slot_runs_a(lot_a.id)
+            try:
+                cache_set(runs_key_a, json.dumps(payload_a["slot_runs"]), ex=3600)
+            except Exception:
+                pass
+
+    return payload_a
+
+
 @parking_bp.route("/lots/<int:lot_id>/slots", methods=["GET"])
+@replica_route_a()
 def list_slots_in_lot_a(lot_id):
     """
     User: list slots for a given lot.
-    Optional query param: only_free=true
-    Example: /parking/lots/1/slots?only_free=true
+    Optional query params:
+      only_free=true       only free slots (full listing)
+      since_version=N      only slots changed after lot version N
+      format=bitmap        occupancy as a base64 bitset (see below)
+      user_id=N            read from the primary right after N booked/released
+    Example: /parking/lots/1/slots?since_version=42
+
+    The response carries the lot's current "version" and an ETag, so an
+    unchanged lot is answered with 304 without reading its slots. The
+    ETag also covers the embedded "lot" (name, address, price), which
+    admin edits change without touching slots_version. A
+    since_version older than the lot's last resize (layout_version) gets
+    the full listing ("full": true).
+
+    format=bitmap: bit N-1 of "bitmap" is slot S<N> (1 = occupied, most
+    significant bit first). "slot_runs" maps offsets to slot ids as
+    [offset, first_slot_id, length]; it only changes when the lot is
+    resized, so it is left out when the client already sends the
+    current layout_version.
     """
     only_free_a = request.args.get("only_free", "false").lower() == "true"
+    since_a = request.args.get("since_version", type=int)
+    bitmap_a = request.args.get("format") == "bitmap"
+    known_layout_a = request.args.get("layout_version", type=int)
 
     lot_a = ParkingLot.query.get(lot_id)
     if not lot_a:
         return jsonify({"message": "Parking lot not found"}), 404
 
-    query_a = ParkingSlot.query.filter_by(lot_id=lot_id)
-    if only_free_a:
-        query_a = query_a.filter_by(is_occupied=False)
+    version_a = lot_a.slots_version
+    full_a = since_a is None or since_a < lot_a.layout_version
+    send_runs_a = known_layout_a != lot_a.layout_version
+
+    # one ETag per lot version, lot details and representation
+    if bitmap_a:
+        variant_a = "bitmap+runs" if send_runs_a else "bitmap"
+    elif full_a:
+        variant_a = "free" if only_free_a else "all"
+    else:
+        variant_a = f"since{since_a}"
+    etag_a = f"lot{lot_id}-v{version_a}-m{lot_meta_tag_a(lot_a)}-{variant_a}"
+
+    if request.if_none_match.contains_weak(etag_a):
+        response_a = Response(status=304)
+    elif bitmap_a:
+        response_a = jsonify(
+            lot_bitmap_payload_a(lot_a, send_runs_a) | {"version": version_a}
+        )
+    else:
+        # deltas report both states, so only_free does not apply
+        slots_a = lot_slots_query_a(
+            lot_id,
+            since_version=None if full_a else since_a,
+            only_free=full_a and only_free_a,
+        ).all()
+
+        slots_result_a = [
+            {
+                "id": slot_a.id,
+                "slot_number": slot_a.slot_number,
+                "is_occupied": slot_a.is_occupied,
+            }
+            for slot_a in slots_a
+        ]
+
+        response_a = jsonify(
+            {
+                "lot": lot_to_dict_a(lot_a),
+                "slots": slots_result_a,
+                "version": version_a,
+                "full": full_a,
+            }
+        )
+
+    response_a.set_etag(etag_a, weak=True)
+    response_a.headers["Cache-Control"] = "no-cache"   # always revalidate
+    return response_a
+
+
+# -------------------------------------------------
+# LIVE SLOT EVENTS (Server-Sent Events)
+# -------------------------------------------------
+SSE_HEADERS_A = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",   # nginx: do not buffer the stream
+}
+
+
+@parking_bp.route("/lots/<int:lot_id>/events", methods=["GET"])
+def lot_events_a(lot_id):
+    """
+    User: stream occupancy changes of one lot (text/event-stream).
+    Example: new EventSource("/parking/lots/1/events")
+    """
+    if not db.session.query(ParkingLot.id).filter_by(id=lot_id).first():
+        return jsonify({"message": "Parking lot not found"}), 404
+
+    # release the DB connection before the long-lived stream starts
+    db.session.remove()
+    return Response(
+        sse_stream_a(lot_id), mimetype="text/event-stream", headers=SSE_HEADERS_A
+    )
+
 
-    slots_a = query_a.all()
-
-    slots_result_a = [
-        {
-            "id": slot_a.id,
-            "slot_number": slot_a.slot_number,
-            "is_occupied": slot_a.is_occupied,
-        }
-        for slot_a in slots_a
-    ]
-
-    return jsonify(
-        {
-            "lot": lot_to_dict_a(lot_a),
-            "slots": slots_result_a,
-        }
-    ), 200
+@parking_bp.route("/lots/events", methods=["GET"])
+def all_lot_events_a():
+    """User: stream occupancy changes of every lot (dashboard free counts)."""
+    return Response(
+        sse_stream_a(), mimetype="text/event-stream", headers=SSE_HEADERS_A
+    )
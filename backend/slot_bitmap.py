@@ -0,0 +1,199 @@
+# backend/slot_bitmap.py
+
+from redis.client import NEVER_DECODE
+
+from extensions import db, get_redis
+from models import ParkingLot, ParkingSlot
+
+# -------------------------------------------------
+# LOT OCCUPANCY BITMAPS (Redis string, one bit per slot)
+# -------------------------------------------------
+# Bit N-1 of lot_bitmap_{id} is slot "S<N>": 1 = occupied, 0 = free
+# (bit 0 is the most significant bit of the first byte, as in SETBIT).
+# A 10k-slot lot is 1.25 KB and BITCOUNT gives its occupied count.
+#
+# Bits are set after commit from the slots' committed state. Like the
+# free-slot pool this is a derived copy: a missing key is rebuilt from
+# parking_slots on read, and the key expires so any drift heals itself.
+
+BITMAP_TTL_SECONDS_A = 300
+
+
+def bitmap_key_a(lot_id):
+    return f"lot_bitmap_{lot_id}"
+
+
+def slot_runs_key_a(lot_id, layout_version):
+    return f"lot_slot_runs_{lot_id}_{layout_version}"
+
+
+def slot_offset_a(slot_number):
+    """'S12' -> 11 (None for numbers that do not follow S<N>)."""
+    try:
+        return int(slot_number[1:]) - 1
+    except (TypeError, ValueError):
+        return None
+
+
+def pack_occupancy_a(occupied_offsets, size):
+    """Pack offsets into a bitset of `size` bits (same layout as SETBIT)."""
+    bits_a = bytearray((size + 7) // 8)
+    for offset_a in occupied_offsets:
+        bits_a[offset_a // 8] |= 0x80 >> (offset_a % 8)
+    return bytes(bits_a)
+
+
+def load_lot_bitmaps_a(lot_ids):
+    """{lot_id: (bitmap_bytes, occupied_count)} computed from parking_slots."""
+    rows_a = (
+        db.session.query(
+            ParkingSlot.lot_id, ParkingSlot.slot_number, ParkingSlot.is_occupied
+        )
+        .filter(ParkingSlot.lot_id.in_(list(lot_ids)))
+        .all()
+    )
+
+    sizes_a = {lot_id: 0 for lot_id in lot_ids}
+    occupied_a = {lot_id: [] for lot_id in lot_ids}
+    for lot_id, slot_number, is_occupied in rows_a:
+        offset_a = slot_offset_a(slot_number)
+        if offset_a is None:
+            continue
+        sizes_a[lot_id] = max(sizes_a[lot_id], offset_a + 1)
+        if is_occupied:
+            occupied_a[lot_id].append(offset_a)
+
+    return {
+        lot_id: (
+            pack_occupancy_a(occupied_a[lot_id], sizes_a[lot_id]),
+            len(occupied_a[lot_id]),
+        )
+        for lot_id in lot_ids
+    }
+
+
+def bitmap_drop_a(lot_id, layout_version=None):
+    """Drop a lot's bitmap (and, for a deleted lot, its cached slot runs)."""
+    keys_a = [bitmap_key_a(lot_id)]
+    if layout_version is not None:
+        keys_a.append(slot_runs_key_a(lot_id, layout_version))
+    try:
+        get_redis().delete(*keys_a)
+    except Exception as e:
+        print(f"[BITMAP] DEL failed for lot {lot_id}: {e}")
+
+
+def rebuild_lot_bitmaps_a(lot_ids=None):
+    """Rewrite the bitmaps of all lots (or lot_ids). Returns {lot_id: occupied}."""
+    if lot_ids is None:
+        lot_ids = [lot_id for (lot_id,) in db.session.query(ParkingLot.id).all()]
+
+    bitmaps_a = load_lot_bitmaps_a(lot_ids)
+
+    pipe_a = get_redis().pipeline(transaction=False)
+    for lot_id, (bits_a, _) in bitmaps_a.items():
+        pipe_a.set(bitmap_key_a(lot_id), bits_a, ex=BITMAP_TTL_SECONDS_A)
+    pipe_a.execute()
+
+    print(f"[BITMAP] Rebuilt occupancy bitmaps for {len(bitmaps_a)} lot(s)")
+    return {lot_id: count_a for lot_id, (_, count_a) in bitmaps_a.items()}
+
+
+def sync_bitmap_changes_a(changes):
+    """
+    SETBIT the slots of committed [(lot_id, slot_id, is_occupied), ...].
+
+    The bit is taken from the slot's current row rather than from the
+    change, so a late-arriving update cannot overwrite a newer state.
+    SETBIT on a missing key would create a bitmap with every other slot
+    "free", so such a key (recognisable by having no TTL) is dropped
+    again and rebuilt whole on its next read.
+    """
+    rows_a = (
+        db.session.query(
+            ParkingSlot.lot_id, ParkingSlot.slot_number, ParkingSlot.is_occupied
+        )
+        .filter(ParkingSlot.id.in_([slot_id for _, slot_id, _ in changes]))
+        .all()
+    )
+
+    per_lot_a = {}
+    for lot_id, slot_number, is_occupied in rows_a:
+        offset_a = slot_offset_a(slot_number)
+        if offset_a is not None:
+            per_lot_a.setdefault(lot_id, []).append((offset_a, int(bool(is_occupied))))
+
+    try:
+        redis_a = get_redis()
+        pipe_a = redis_a.pipeline(transaction=False)
+        for lot_id, bits_a in per_lot_a.items():
+            for offset_a, bit_a in bits_a:
+                pipe_a.setbit(bitmap_key_a(lot_id), offset_a, bit_a)
+            pipe_a.ttl(bitmap_key_a(lot_id))
+        results_a = pipe_a.execute()
+
+        pos_a = 0
+        for lot_id, bits_a in per_lot_a.items():
+            pos_a += len(bits_a)
+            if results_a[pos_a] == -1:
+                redis_a.delete(bitmap_key_a(lot_id))
+            pos_a += 1
+    except Exception as e:
+        print(f"[BITMAP] Could not update bitmaps: {e}")
+
+
+def lot_bitmap_a(lot_id):
+    """
+    (bitmap_bytes, occupied_count) of a lot: GET + BITCOUNT in one round
+    trip, rebuilt from parking_slots if missing, computed from the DB if
+    Redis is unavailable.
+    """
+    key_a = bitmap_key_a(lot_id)
+    try:
+        redis_a = get_redis()
+        pipe_a = redis_a.pipeline(transaction=False)
+        # raw bytes even though the client decodes responses
+        pipe_a.execute_command("GET", key_a, **{NEVER_DECODE: []})
+        pipe_a.bitcount(key_a)
+        bits_a, count_a = pipe_a.execute()
+        if bits_a is not None:
+            return bits_a, count_a
+
+        bits_a, count_a = load_lot_bitmaps_a([lot_id])[lot_id]
+        redis_a.set(key_a, bits_a, ex=BITMAP_TTL_SECONDS_A)
+        print(f"[BITMAP] Rebuilt occupancy bitmap for lot {lot_id}")
+        return bits_a, count_a
+    except Exception as e:
+        print(f"[BITMAP] Redis unavailable, packing bitmap from DB: {e}")
+        return load_lot_bitmaps_a([lot_id])[lot_id]
+
+
+def lot_slot_runs_a(lot_id):
+    """
+    Map bitmap offsets to slot ids as runs [offset, first_slot_id, length]:
+    slots created together have consecutive numbers and ids, so a lot
+    usually needs only a few runs instead of one entry per slot.
+    """
+    rows_a = sorted(
+        (offset_a, slot_id)
+        for slot_id, offset_a in (
+            (slot_id, slot_offset_a(number))
+            for slot_id, number in db.session.query(
+                ParkingSlot.id, ParkingSlot.slot_number
+            ).filter(ParkingSlot.lot_id == lot_id)
+        )
+        if offset_a is not None
+    )
+
+    runs_a = []
+    for offset_a, slot_id in rows_a:
+        last_a = runs_a[-1] if runs_a else None
+        if (
+            last_a
+            and offset_a == last_a[0] + last_a[2]
+            and slot_id == last_a[1] + last_a[2]
+        ):
+            last_a[2] += 1
+        else:
+            runs_a.append([offset_a, slot_id, 1])
+    return runs_a
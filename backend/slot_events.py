@@ -0,0 +1,182 @@
+# backend/slot_events.py
+
+import json
+import os
+import queue
+import threading
+import time
+
+from config import Config
+from extensions import db, get_redis
+from models import ParkingLot
+
+# -------------------------------------------------
+# LIVE SLOT EVENTS (Redis pub/sub -> Server-Sent Events)
+# -------------------------------------------------
+# Whoever commits an occupancy change publishes one message per lot on
+# lot_events_{id}. Every API process runs ONE pattern subscription
+# (lot_events_*) and hands each message to the in-memory queues of its own
+# SSE clients, so idle subscribers cost a queue, not a DB query or a Redis
+# connection each.
+#
+# Message: {"lot_id": 1, "free_slots": 4, "version": 42,
+#           "changes": [{"slot_id": 2, "is_occupied": true}]}
+# or       {"lot_id": 1, "resync": true}  (reload the lot, e.g. after resize)
+
+CHANNEL_PREFIX_A = "lot_events_"
+
+
+def lot_channel_a(lot_id):
+    return f"{CHANNEL_PREFIX_A}{lot_id}"
+
+
+def publish_slot_changes_a(changes):
+    """Publish committed [(lot_id, slot_id, is_occupied), ...], one message per lot."""
+    per_lot_a = {}
+    for lot_id, slot_id, is_occupied in changes:
+        per_lot_a.setdefault(lot_id, []).append(
+            {"slot_id": slot_id, "is_occupied": bool(is_occupied)}
+        )
+
+    lots_a = {
+        lot_id: (free_slots, version)
+        for lot_id, free_slots, version in db.session.query(
+            ParkingLot.id, ParkingLot.free_slots, ParkingLot.slots_version
+        )
+        .filter(ParkingLot.id.in_(list(per_lot_a)))
+        .all()
+    }
+
+    try:
+        pipe_a = get_redis().pipeline(transaction=False)
+        for lot_id, lot_changes in per_lot_a.items():
+            free_slots_a, version_a = lots_a.get(lot_id, (None, None))
+            pipe_a.publish(
+                lot_channel_a(lot_id),
+                json.dumps(
+                    {
+                        "lot_id": lot_id,
+                        "free_slots": free_slots_a,
+                        "version": version_a,
+                        "changes": lot_changes,
+                    }
+                ),
+            )
+        pipe_a.execute()
+    except Exception as e:
+        print(f"[EVENTS] Could not publish slot changes: {e}")
+
+
+def publish_lot_resync_a(lot_id):
+    """Tell subscribers to reload a lot whose slots were added/removed."""
+    try:
+        get_redis().publish(
+            lot_channel_a(lot_id), json.dumps({"lot_id": lot_id, "resync": True})
+        )
+    except Exception as e:
+        print(f"[EVENTS] Could not publish resync for lot {lot_id}: {e}")
+
+
+class Subscriber:
+    """One SSE client: a bounded queue; a full queue means 'resync'."""
+
+    def __init__(self, lot_id, size):
+        self.lot_id = lot_id          # None = every lot
+        self.queue = queue.Queue(maxsize=size)
+        self.overflowed = False
+
+    def offer(self, payload):
+        try:
+            self.queue.put_nowait(payload)
+        except queue.Full:
+            # slow client: drop events, it will be told to reload instead
+            self.overflowed = True
+
+
+class SlotEventHub:
+    """Per-process fan-out from one Redis pattern subscription to SSE clients."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._listener_pid = None
+
+    def subscribe(self, lot_id=None):
+        self._ensure_listener()
+        sub_a = Subscriber(lot_id, Config.SSE_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(sub_a)
+        return sub_a
+
+    def unsubscribe(self, sub_a):
+        with self._lock:
+            self._subscribers.discard(sub_a)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def dispatch(self, lot_id, payload):
+        with self._lock:
+            targets_a = [
+                s for s in self._subscribers if s.lot_id is None or s.lot_id == lot_id
+            ]
+        for sub_a in targets_a:
+            sub_a.offer(payload)
+
+    def _resync_all(self):
+        with self._lock:
+            for sub_a in self._subscribers:
+                sub_a.overflowed = True
+
+    def _ensure_listener(self):
+        # one listener thread per process (re-created after a fork)
+        if self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            threading.Thread(target=self._listen, name="slot-events", daemon=True).start()
+            self._listener_pid = os.getpid()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub_a = get_redis().pubsub(ignore_subscribe_messages=True)
+                pubsub_a.psubscribe(f"{CHANNEL_PREFIX_A}*")
+                print("[EVENTS] Listening for slot events")
+                for message_a in pubsub_a.listen():
+                    channel_a = message_a["channel"]
+                    lot_id_a = int(channel_a[len(CHANNEL_PREFIX_A):])
+                    self.dispatch(lot_id_a, message_a["data"])
+            except Exception as e:
+                print(f"[EVENTS] Listener error, resubscribing: {e}")
+                # events may have been missed while disconnected
+                self._resync_all()
+                time.sleep(1)
+
+
+slot_event_hub = SlotEventHub()
+
+
+def sse_stream_a(lot_id=None):
+    """
+    Generator of SSE frames for one client: slot events as they arrive,
+    a comment line as heartbeat every SSE_HEARTBEAT_SECONDS.
+    """
+    sub_a = slot_event_hub.subscribe(lot_id)
+    try:
+        yield f"retry: {Config.SSE_RETRY_MS}\n\n"
+        while True:
+            if sub_a.overflowed:
+                sub_a.overflowed = False
+                yield f"event: resync\ndata: {json.dumps({'lot_id': lot_id})}\n\n"
+            try:
+                payload_a = sub_a.queue.get(timeout=Config.SSE_HEARTBEAT_SECONDS)
+            except queue.Empty:
+                yield ": heartbeat\n\n"
+                continue
+            yield f"event: slots\ndata: {payload_a}\n\n"
+    finally:
+        # client went away (GeneratorExit) or the server is shutting down
+        slot_event_hub.unsubscribe(sub_a)
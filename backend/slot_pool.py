@@ -0,0 +1,112 @@
+# backend/slot_pool.py
+
+from extensions import db, get_redis
+from models import ParkingLot, ParkingSlot
+
+# -------------------------------------------------
+# REDIS FREE-SLOT POOL (one SET of free slot ids per lot)
+# -------------------------------------------------
+# The pool only speeds up "book any free slot": SPOP hands out a candidate
+# in O(1) and the SQL claim (occupancy.claim_slot_a) still decides. A stale
+# entry just loses its claim and is dropped, so Redis failures are logged
+# and ignored here, like the other cache helpers.
+
+
+def pool_key_a(lot_id):
+    return f"free_slots_lot_{lot_id}"
+
+
+def pool_pop_a(lot_id):
+    """Take one candidate free slot id out of the lot's pool (None if empty)."""
+    try:
+        slot_id_a = get_redis().spop(pool_key_a(lot_id))
+    except Exception as e:
+        print(f"[POOL] SPOP failed for lot {lot_id}: {e}")
+        return None
+    return int(slot_id_a) if slot_id_a is not None else None
+
+
+def pool_add_a(lot_id, slot_ids):
+    slot_ids = list(slot_ids)
+    if not slot_ids:
+        return
+    try:
+        get_redis().sadd(pool_key_a(lot_id), *slot_ids)
+    except Exception as e:
+        print(f"[POOL] SADD failed for lot {lot_id}: {e}")
+
+
+def pool_remove_a(lot_id, slot_ids):
+    slot_ids = list(slot_ids)
+    if not slot_ids:
+        return
+    try:
+        get_redis().srem(pool_key_a(lot_id), *slot_ids)
+    except Exception as e:
+        print(f"[POOL] SREM failed for lot {lot_id}: {e}")
+
+
+def pool_drop_a(lot_id):
+    try:
+        get_redis().delete(pool_key_a(lot_id))
+    except Exception as e:
+        print(f"[POOL] DEL failed for lot {lot_id}: {e}")
+
+
+def sync_pool_changes_a(changes):
+    """
+    Apply committed [(lot_id, slot_id, is_occupied), ...] to the pools.
+
+    As for the bitmaps, a slot goes in or out by its current row rather
+    than by the change: a release whose SADD runs after the slot was
+    booked again must not put an occupied slot back into the pool. Slots
+    that no longer exist are removed.
+    """
+    current_a = {
+        slot_id: (lot_id, is_occupied)
+        for lot_id, slot_id, is_occupied in db.session.query(
+            ParkingSlot.lot_id, ParkingSlot.id, ParkingSlot.is_occupied
+        ).filter(ParkingSlot.id.in_({slot_id for _, slot_id, _ in changes}))
+    }
+
+    added_a, removed_a = {}, {}
+    for lot_id, slot_id, _ in changes:
+        lot_id, is_occupied = current_a.get(slot_id, (lot_id, True))
+        target_a = removed_a if is_occupied else added_a
+        target_a.setdefault(lot_id, []).append(slot_id)
+
+    for lot_id, slot_ids in added_a.items():
+        pool_add_a(lot_id, slot_ids)
+    for lot_id, slot_ids in removed_a.items():
+        pool_remove_a(lot_id, slot_ids)
+
+
+def rebuild_free_slot_pools_a(lot_ids=None):
+    """
+    Rebuild the pools from parking_slots (all lots, or only lot_ids).
+
+    Each lot's key is replaced inside one MULTI/EXEC, so readers never
+    see a half-built pool. Returns {lot_id: free_count}.
+    """
+    lots_query_a = db.session.query(ParkingLot.id)
+    slots_query_a = db.session.query(ParkingSlot.lot_id, ParkingSlot.id).filter(
+        ParkingSlot.is_occupied.isnot(True)
+    )
+    if lot_ids is not None:
+        lots_query_a = lots_query_a.filter(ParkingLot.id.in_(lot_ids))
+        slots_query_a = slots_query_a.filter(ParkingSlot.lot_id.in_(lot_ids))
+
+    free_a = {lot_id: [] for (lot_id,) in lots_query_a.all()}
+    for lot_id, slot_id in slots_query_a.all():
+        free_a.setdefault(lot_id, []).append(slot_id)
+
+    redis_a = get_redis()
+    for lot_id, slot_ids in free_a.items():
+        pipe_a = redis_a.pipeline(transaction=True)
+        pipe_a.delete(pool_key_a(lot_id))
+        if slot_ids:
+            pipe_a.sadd(pool_key_a(lot_id), *slot_ids)
+        pipe_a.execute()
+
+    print(f"[POOL] Rebuilt free-slot pools for {len(free_a)} lot(s)")
+    return {lot_id: len(ids) for lot_id, ids in free_a.items()}
@@ -0,0 +1,160 @@
+# backend/tests/conftest.py
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+import fakeredis
+import pytest
+from sqlalchemy import event
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# celery_worker builds its own app from Config on import: keep it off the
+# real parking_system.db and give tokens a non-default key
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+import booking_export  # noqa: E402
+import extensions  # noqa: E402
+from app import create_app  # noqa: E402
+
+# imported before any test app: its own create_app() on import would
+# otherwise swap the test's fakeredis for a real client
+import celery_worker  # noqa: E402
+from auth_tokens import issue_token_a  # noqa: E402
+from extensions import bcrypt, db  # noqa: E402
+from models import User  # noqa: E402
+
+# -------------------------------------------------
+# TEST APP: sqlite:// (or a temp file) + fakeredis
+# -------------------------------------------------
+# Every test gets a fresh app, schema and Redis. Tests that need several
+# threads writing at once pass a file database (in-memory SQLite is one
+# shared connection). Benchmarks are marked `bench` and only run with
+# `pytest -m bench -s`; their numbers are printed, not asserted.
+
+
+@pytest.fixture
+def make_app():
+    apps_a = []
+
+    def factory(db_uri="sqlite://", **overrides):
+        app_a = create_app(
+            {
+                "TESTING": True,
+                "SQLALCHEMY_DATABASE_URI": db_uri,
+                "SQLALCHEMY_REPLICA_URIS": [],
+                "SECRET_KEY": "test-secret-key",
+                **overrides,
+            }
+        )
+        extensions.redis_client_a = fakeredis.FakeRedis(
+            server=fakeredis.FakeServer(), decode_responses=True
+        )
+        extensions.l1_cache.clear()
+        with app_a.app_context():
+            # primary only: replicas are copies (replicate_sqlite_a), and
+            # db remembers bind keys of earlier apps in this process
+            db.create_all(bind_key=None)
+        apps_a.append(app_a)
+        return app_a
+
+    yield factory
+
+    for app_a in apps_a:
+        with app_a.app_context():
+            db.session.remove()
+            for engine_a in db.engines.values():
+                engine_a.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def redis_client(app):
+    return extensions.redis_client_a
+
+
+@pytest.fixture
+def worker(app, monkeypatch):
+    """celery_worker with its tasks running inside the test app."""
+    monkeypatch.setattr(celery_worker, "_flask_app", app)
+    return celery_worker
+
+
+@pytest.fixture
+def eager_worker(worker, monkeypatch, tmp_path):
+    """celery_worker running tasks (and chords) in-process, exports in tmp_path."""
+    monkeypatch.setattr(worker.celery.conf, "task_always_eager", True)
+    monkeypatch.setattr(booking_export, "exports_dir_a", lambda: str(tmp_path))
+    monkeypatch.setattr(worker, "exports_dir_a", lambda: str(tmp_path))
+    return worker
+
+
+def make_user(app, role="USER", name="user"):
+    """Create a user; returns (user_id, {"Authorization": "Bearer ..."})."""
+    with app.app_context():
+        user_a = User(
+            name=name,
+            email=f"{name}-{time.perf_counter_ns()}@test.invalid",
+            password=bcrypt.generate_password_hash("secret").decode("utf-8"),
+            role=role,
+        )
+        db.session.add(user_a)
+        db.session.commit()
+        with app.test_request_context():
+            token_a = issue_token_a(user_a)
+        return user_a.id, {"Authorization": f"Bearer {token_a}"}
+
+
+@pytest.fixture
+def admin_headers(app):
+    return make_user(app, role="ADMIN", name="admin")[1]
+
+
+@pytest.fixture
+def user(app):
+    return make_user(app)
+
+
+def create_lot(client, admin_headers, total_slots=5, **fields):
+    """Create a lot through the admin API; returns its dict."""
+    body_a = {
+        "name": "Lot",
+        "address": "Street 1",
+        "pin_code": "560001",
+        "total_slots": total_slots,
+        "price_per_hour": 10,
+        **fields,
+    }
+    response_a = client.post("/admin/parking-lots", json=body_a, headers=admin_headers)
+    assert response_a.status_code == 201, response_a.get_json()
+    return response_a.get_json()["lot"]
+
+
+@contextmanager
+def count_queries(app):
+    """Collect the SQL statements run on the app's primary engine."""
+    statements_a = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        statements_a.append(statement)
+
+    with app.app_context():
+        engine_a = db.engine
+    event.listen(engine_a, "before_cursor_execute", listener)
+    try:
+        yield statements_a
+    finally:
+        event.remove(engine_a, "before_cursor_execute", listener)
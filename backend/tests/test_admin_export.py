@@ -0,0 +1,90 @@
+# backend/tests/test_admin_export.py
+
+import csv
+import gzip
+from datetime import datetime
+
+import pytest
+
+from conftest import create_lot
+from extensions import db
+from models import Booking, ExportJob, ParkingSlot
+from routes.export_routes import export_progress
+
+
+def _booking(slot_id, day, month=1):
+    return Booking(
+        user_id=1,
+        slot_id=slot_id,
+        vehicle_number="KA01",
+        start_time=datetime(2024, month, day, 9),
+        end_time=datetime(2024, month, day, 10),
+        amount=10.0,
+        status="COMPLETED",
+    )
+
+
+def _export(app, worker, file_format="csv"):
+    with app.app_context():
+        job_a = ExportJob(
+            user_id=1,
+            scope="ALL",
+            file_format=file_format,
+            range_start=datetime(2024, 1, 1),
+            range_end=datetime(2024, 2, 1),
+        )
+        db.session.add(job_a)
+        db.session.commit()
+        export_id_a = job_a.id
+
+    worker.export_all_bookings_a(export_id_a)
+
+    with app.app_context():
+        job_a = ExportJob.query.get(export_id_a)
+        opener_a = gzip.open if file_format == "csv.gz" else open
+        with opener_a(job_a.file_path, "rt", newline="") as f:
+            rows_a = list(csv.DictReader(f))
+        return job_a, rows_a
+
+
+@pytest.mark.parametrize("file_format", ["csv", "csv.gz"])
+def test_export_covers_every_counted_booking(
+    app, client, admin_headers, eager_worker, file_format
+):
+    lots_a = [create_lot(client, admin_headers, total_slots=2) for _ in range(2)]
+    with app.app_context():
+        slot_ids_a = [
+            ParkingSlot.query.filter_by(lot_id=lot_a["id"]).first().id
+            for lot_a in lots_a
+        ]
+        db.session.add_all(
+            [
+                _booking(slot_ids_a[0], 3),
+                _booking(slot_ids_a[0], 4),
+                _booking(slot_ids_a[1], 5),
+                # its slot is gone (lot deleted outside the API)
+                _booking(9999, 6),
+                # outside the exported January
+                _booking(slot_ids_a[1], 1, month=2),
+            ]
+        )
+        db.session.commit()
+
+    job_a, rows_a = _export(app, eager_worker, file_format)
+
+    assert job_a.status == "DONE"
+    assert job_a.partitions_total == job_a.partitions_done == len(lots_a) + 1
+    assert job_a.rows_total == job_a.rows_written == len(rows_a) == 4
+    assert "9999" in {row["slot_id"] for row in rows_a}
+    assert export_progress(job_a)["percent_complete"] == 100.0
+
+
+def test_export_without_lots_still_lists_orphans(app, eager_worker):
+    with app.app_context():
+        db.session.add(_booking(9999, 6))
+        db.session.commit()
+
+    job_a, rows_a = _export(app, eager_worker)
+
+    assert job_a.status == "DONE"
+    assert job_a.rows_total == job_a.rows_written == len(rows_a) == 1
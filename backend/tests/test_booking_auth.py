@@ -0,0 +1,150 @@
+# backend/tests/test_booking_auth.py
+
+import time
+
+import pytest
+
+from auth_tokens import verify_token_a
+from config import DEFAULT_SECRET_KEY
+from conftest import count_queries, create_lot, make_user
+from extensions import db
+from models import Booking, ExportJob, ParkingSlot
+
+
+def _slot_id(app, lot):
+    with app.app_context():
+        return ParkingSlot.query.filter_by(lot_id=lot["id"]).first().id
+
+
+def _book(client, app, lot, kind, headers, **body):
+    if kind == "book":
+        return client.post(
+            "/parking/book",
+            json={"slot_id": _slot_id(app, lot), "vehicle_number": "KA01", **body},
+            headers=headers,
+        )
+    return client.post(
+        f"/parking/lots/{lot['id']}/book-any",
+        json={"vehicle_number": "KA01", **body},
+        headers=headers,
+    )
+
+
+@pytest.mark.parametrize("kind", ["book", "book-any"])
+def test_admin_booking_for_a_missing_user_is_404(app, client, admin_headers, kind):
+    lot_a = create_lot(client, admin_headers, total_slots=1)
+
+    response_a = _book(client, app, lot_a, kind, admin_headers, user_id=9999)
+
+    assert response_a.status_code == 404
+    assert response_a.get_json()["message"] == "User not found"
+    with app.app_context():
+        assert Booking.query.count() == 0
+        assert ParkingSlot.query.filter_by(is_occupied=True).count() == 0
+
+
+@pytest.mark.parametrize("kind", ["book", "book-any"])
+def test_admin_may_book_for_an_existing_user(app, client, admin_headers, kind):
+    lot_a = create_lot(client, admin_headers, total_slots=1)
+    user_id, _ = make_user(app)
+
+    response_a = _book(client, app, lot_a, kind, admin_headers, user_id=user_id)
+
+    assert response_a.status_code == 201
+    with app.app_context():
+        assert Booking.query.one().user_id == user_id
+
+
+@pytest.mark.parametrize("kind", ["book", "book-any"])
+def test_user_cannot_book_for_another_user(app, client, admin_headers, user, kind):
+    lot_a = create_lot(client, admin_headers, total_slots=1)
+    other_id, _ = make_user(app, name="other")
+
+    response_a = _book(client, app, lot_a, kind, user[1], user_id=other_id)
+
+    assert response_a.status_code == 403
+
+
+@pytest.mark.parametrize("kind", ["book", "book-any"])
+def test_booking_for_yourself_runs_no_user_query(app, client, admin_headers, user, kind):
+    lot_a = create_lot(client, admin_headers, total_slots=1)
+    slot_id_a = _slot_id(app, lot_a)   # outside the counted block
+
+    with count_queries(app) as statements_a:
+        if kind == "book":
+            response_a = client.post(
+                "/parking/book",
+                json={"slot_id": slot_id_a, "vehicle_number": "KA01"},
+                headers=user[1],
+            )
+        else:
+            response_a = _book(client, app, lot_a, kind, user[1])
+
+    assert response_a.status_code == 201
+    # identity and role come from the token, not from the users table
+    assert not [s for s in statements_a if "FROM users" in s]
+
+
+def test_logout_revokes_the_token(client, user):
+    _, headers_a = user
+    assert client.get(f"/parking/history/{user[0]}", headers=headers_a).status_code == 200
+
+    assert client.post("/auth/logout", headers=headers_a).status_code == 200
+
+    assert client.get(f"/parking/history/{user[0]}", headers=headers_a).status_code == 401
+    assert client.post("/auth/logout", headers=headers_a).status_code == 401
+
+
+def test_missing_or_tampered_token_is_401(client, user):
+    user_id, headers_a = user
+    tampered_a = {"Authorization": headers_a["Authorization"][:-2] + "xx"}
+
+    assert client.get(f"/parking/history/{user_id}").status_code == 401
+    assert client.get(f"/parking/history/{user_id}", headers=tampered_a).status_code == 401
+
+
+def test_default_secret_key_is_refused_outside_testing(make_app):
+    app_a = make_app(TESTING=False, DEBUG=False, SECRET_KEY=DEFAULT_SECRET_KEY)
+    client_a = app_a.test_client()
+
+    login_a = client_a.post(
+        "/auth/login", json={"email": "a@test.invalid", "password": "secret"}
+    )
+    history_a = client_a.get(
+        "/parking/history/1", headers={"Authorization": "Bearer anything"}
+    )
+
+    assert login_a.status_code == 503
+    assert history_a.status_code == 503
+
+
+def test_query_token_is_only_accepted_by_the_export_download(app, client, user):
+    user_id, headers_a = user
+    token_a = headers_a["Authorization"][len("Bearer "):]
+    with app.app_context():
+        job_a = ExportJob(user_id=user_id, status="PENDING")
+        db.session.add(job_a)
+        db.session.commit()
+        export_id_a = job_a.id
+
+    download_a = client.get(f"/api/exports/bookings/{export_id_a}?token={token_a}")
+    history_a = client.get(f"/parking/history/{user_id}?token={token_a}")
+
+    assert download_a.status_code == 200
+    assert download_a.get_json()["status"] == "PENDING"
+    assert history_a.status_code == 401
+
+
+@pytest.mark.bench
+def test_bench_token_verification(app, user):
+    token_a = user[1]["Authorization"][len("Bearer "):]
+    rounds_a = 5000
+    with app.test_request_context():
+        started_a = time.perf_counter()
+        for _ in range(rounds_a):
+            assert verify_token_a(token_a) is not None
+        elapsed_a = time.perf_counter() - started_a
+    print(
+        f"\n[BENCH] verify_token_a (signature + fakeredis denylist): "
+        f"{elapsed_a / rounds_a * 1e6:.1f} us per token"
+    )
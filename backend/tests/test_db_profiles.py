@@ -0,0 +1,174 @@
+# backend/tests/test_db_profiles.py
+
+import random
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+
+from conftest import create_lot, make_user
+from extensions import db
+
+
+def _pragmas(app, bind_key=None):
+    with app.app_context():
+        engine_a = db.engines[bind_key]
+        with engine_a.connect() as conn_a:
+            return {
+                name: conn_a.execute(text(f"PRAGMA {name}")).scalar()
+                for name in ("journal_mode", "synchronous", "busy_timeout", "query_only")
+            }
+
+
+def _file_app(make_app, tmp_path, profile, **overrides):
+    return make_app(
+        f"sqlite:///{tmp_path / f'{profile}.db'}", DB_PROFILE=profile, **overrides
+    )
+
+
+def test_tuned_profile_sets_wal_pragmas_and_pool(make_app, tmp_path):
+    replica_a = f"sqlite:///{tmp_path / 'replica.db'}"
+    app_a = _file_app(make_app, tmp_path, "tuned", SQLALCHEMY_REPLICA_URIS=[replica_a])
+
+    assert _pragmas(app_a) == {
+        "journal_mode": "wal",
+        "synchronous": 1,          # NORMAL
+        "busy_timeout": 5000,
+        "query_only": 0,
+    }
+    # replicas get the profile too, and refuse writes
+    assert _pragmas(app_a, "replica_0")["query_only"] == 1
+    with app_a.app_context():
+        assert db.engine.pool.size() == 10
+
+
+def test_default_profile_keeps_sqlite_defaults(make_app, tmp_path):
+    app_a = _file_app(make_app, tmp_path, "default")
+
+    pragmas_a = _pragmas(app_a)
+    assert pragmas_a["journal_mode"] == "delete"
+    assert pragmas_a["synchronous"] == 2       # FULL
+
+
+def test_explicit_engine_options_override_the_profile(make_app, tmp_path):
+    app_a = _file_app(
+        make_app, tmp_path, "tuned", SQLALCHEMY_ENGINE_OPTIONS={"pool_size": 3}
+    )
+    with app_a.app_context():
+        assert db.engine.pool.size() == 3
+
+
+def test_unknown_profile_is_rejected(make_app):
+    with pytest.raises(RuntimeError, match="Unknown DB_PROFILE"):
+        make_app(DB_PROFILE="fast")
+
+
+# -------------------------------------------------
+# MIXED READ / WRITE LOAD: default vs tuned
+# -------------------------------------------------
+# Threads mix bookings (book-any + release, 20%) with history and lot
+# slot reads through the real routes on a temporary SQLite file.
+
+
+def _mixed_load(app, threads, ops):
+    client_a = app.test_client()
+    admin_a = make_user(app, role="ADMIN", name="admin")[1]
+    lot_a = create_lot(client_a, admin_a, total_slots=threads * 2)
+    users_a = [make_user(app, name=f"load{i}") for i in range(threads)]
+    errors_a = []
+
+    def worker(user_id, headers, n_ops):
+        c = app.test_client()
+        for _ in range(n_ops):
+            if random.random() < 0.2:
+                r = c.post(
+                    f"/parking/lots/{lot_a['id']}/book-any",
+                    json={"vehicle_number": "KA01"},
+                    headers=headers,
+                )
+                if r.status_code == 201:
+                    r = c.post(
+                        "/parking/release",
+                        json={"booking_id": r.get_json()["booking_id"]},
+                        headers=headers,
+                    )
+            elif random.random() < 0.5:
+                r = c.get(f"/parking/history/{user_id}", headers=headers)
+            else:
+                r = c.get(f"/parking/lots/{lot_a['id']}/slots")
+            if r.status_code >= 500:
+                errors_a.append(r.status_code)
+
+    workers_a = [
+        threading.Thread(target=worker, args=(uid, headers, ops // threads))
+        for uid, headers in users_a
+    ]
+    started_a = time.perf_counter()
+    for t in workers_a:
+        t.start()
+    for t in workers_a:
+        t.join()
+    return time.perf_counter() - started_a, errors_a
+
+
+def _mixed_sql_load(app, threads, ops):
+    """The same mix straight on the engine: what the profile itself changes."""
+    with app.app_context():
+        engine_a = db.engine
+    insert_a = text(
+        "INSERT INTO bookings (user_id, slot_id, vehicle_number, start_time, status) "
+        "VALUES (:u, 1, 'KA01', CURRENT_TIMESTAMP, 'ACTIVE')"
+    )
+    history_a = text(
+        "SELECT id, status FROM bookings WHERE user_id = :u ORDER BY id DESC LIMIT 20"
+    )
+    errors_a = []
+
+    def worker(user_id, n_ops):
+        try:
+            for _ in range(n_ops):
+                with engine_a.connect() as conn_a:
+                    if random.random() < 0.2:
+                        conn_a.execute(insert_a, {"u": user_id})
+                        conn_a.commit()
+                    else:
+                        conn_a.execute(history_a, {"u": user_id}).all()
+        except Exception as e:
+            errors_a.append(repr(e))
+
+    workers_a = [
+        threading.Thread(target=worker, args=(i, ops // threads)) for i in range(threads)
+    ]
+    started_a = time.perf_counter()
+    for t in workers_a:
+        t.start()
+    for t in workers_a:
+        t.join()
+    return time.perf_counter() - started_a, errors_a
+
+
+@pytest.mark.bench
+def test_bench_default_vs_tuned_profile_sql(make_app, tmp_path):
+    threads_a, ops_a = 16, 16_000
+    for profile in ("default", "tuned"):
+        app_a = _file_app(make_app, tmp_path, profile)
+        elapsed_a, errors_a = _mixed_sql_load(app_a, threads_a, ops_a)
+        print(
+            f"\n[BENCH] {profile:>7} profile, SQL only: {ops_a} mixed ops from "
+            f"{threads_a} threads in {elapsed_a:.2f}s ({ops_a / elapsed_a:.0f} ops/s, "
+            f"{len(errors_a)} thread(s) failed: {errors_a[:1]})"
+        )
+
+
+@pytest.mark.bench
+def test_bench_default_vs_tuned_profile(make_app, tmp_path):
+    threads_a, ops_a = 16, 2400
+    for profile in ("default", "tuned"):
+        app_a = _file_app(make_app, tmp_path, profile)
+        elapsed_a, errors_a = _mixed_load(app_a, threads_a, ops_a)
+        assert errors_a == []
+        print(
+            f"\n[BENCH] {profile:>7} profile: {ops_a} mixed ops from {threads_a} "
+            f"threads in {elapsed_a:.2f}s ({ops_a / elapsed_a:.0f} ops/s)"
+        )
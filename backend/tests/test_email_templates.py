@@ -0,0 +1,94 @@
+# backend/tests/test_email_templates.py
+
+import time
+
+import pytest
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+import email_templates
+from email_templates import TEMPLATES_DIR, render_email_a, render_many_a, render_stats_a
+
+
+def _renders(name):
+    return render_stats_a().get(name, {}).get("renders", 0)
+
+
+def test_templates_are_compiled_once(monkeypatch):
+    def no_source(*args, **kwargs):
+        raise AssertionError("template source read after import")
+
+    # every template was compiled at import: rendering never reads a file
+    monkeypatch.setattr(email_templates._env.loader, "get_source", no_source)
+
+    html_a = render_email_a("daily_reminder.html", name="Asha")
+    many_a = render_many_a("daily_reminder.html", [{"name": "A"}, {"name": "B"}])
+
+    assert "Hello Asha," in html_a
+    assert "Hello A," in many_a[0] and "Hello B," in many_a[1]
+
+
+def test_values_are_html_escaped():
+    html_a = render_email_a(
+        "monthly_report.html",
+        month_str="2024-01",
+        user_name="<script>x</script>",
+        user_email="a@b.c",
+        total_bookings=1,
+        total_amount=2.5,
+        most_used_lot_name="A & B",
+    )
+    assert "<script>" not in html_a
+    assert "&lt;script&gt;" in html_a and "A &amp; B" in html_a
+    assert "₹2.50" in html_a
+
+
+def test_render_stats_count_each_render():
+    before_a = _renders("daily_reminder.html")
+
+    render_email_a("daily_reminder.html", name="A")
+    render_many_a("daily_reminder.html", [{"name": str(i)} for i in range(5)])
+
+    assert _renders("daily_reminder.html") == before_a + 6
+    stats_a = render_stats_a()["daily_reminder.html"]
+    assert stats_a["total_ms"] >= 0 and stats_a["avg_ms"] >= 0
+
+
+def test_reminder_chunk_renders_once_per_recipient(worker, monkeypatch):
+    sent_a = []
+    monkeypatch.setattr(
+        worker,
+        "send_email_batch_a",
+        lambda messages: sent_a.extend(messages) or len(messages),
+    )
+    before_a = _renders("daily_reminder.html")
+
+    assert worker.send_daily_reminders_chunk_a([("Asha", "a@x"), ("Ben", "b@x")]) == 2
+
+    assert _renders("daily_reminder.html") == before_a + 2
+    assert [to for to, _, _ in sent_a] == ["a@x", "b@x"]
+    assert "Hello Asha," in sent_a[0][2] and "Hello Ben," in sent_a[1][2]
+
+
+@pytest.mark.bench
+@pytest.mark.parametrize("count", [1_000, 10_000])
+def test_bench_precompiled_vs_compile_per_render(count):
+    contexts_a = [{"name": f"user{i}"} for i in range(count)]
+
+    started_a = time.perf_counter()
+    render_many_a("daily_reminder.html", contexts_a)
+    precompiled_s = time.perf_counter() - started_a
+
+    # what a cache-less setup pays: load + compile the template per mail
+    started_a = time.perf_counter()
+    for ctx in contexts_a:
+        env_a = Environment(
+            loader=FileSystemLoader(TEMPLATES_DIR), autoescape=select_autoescape(["html"])
+        )
+        env_a.get_template("daily_reminder.html").render(**ctx)
+    per_render_s = time.perf_counter() - started_a
+
+    print(
+        f"\n[BENCH] {count} reminders: precompiled {precompiled_s / count * 1e6:.1f} us/mail, "
+        f"compiled per mail {per_render_s / count * 1e6:.1f} us/mail "
+        f"({per_render_s / precompiled_s:.0f}x)"
+    )
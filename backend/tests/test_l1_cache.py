@@ -0,0 +1,88 @@
+# backend/tests/test_l1_cache.py
+
+import pytest
+
+import extensions
+import lot_cache
+from conftest import create_lot
+from extensions import LocalCache
+from routes import parking_routes
+
+
+def test_set_is_skipped_after_an_invalidation_since_seen():
+    cache_a = LocalCache()
+    seen_a = cache_a.generation()
+
+    cache_a.invalidate(tags=["lot:1"])
+    assert cache_a.set("list", b"old", tags=["lot:1", "lot:2"], seen=seen_a) is False
+    assert cache_a.get("list") is None
+
+    # unrelated invalidations do not block the set
+    seen_a = cache_a.generation()
+    cache_a.invalidate(tags=["lot:3"], keys=["other"])
+    assert cache_a.set("list", b"new", tags=["lot:1", "lot:2"], seen=seen_a)
+    assert cache_a.get("list") == b"new"
+
+
+@pytest.mark.parametrize("change", ["key", "clear"])
+def test_set_is_skipped_after_key_invalidation_or_clear(change):
+    cache_a = LocalCache()
+    seen_a = cache_a.generation()
+    if change == "key":
+        cache_a.invalidate(keys=["list"])
+    else:
+        cache_a.clear()
+    assert cache_a.set("list", b"old", seen=seen_a) is False
+
+
+def test_lot_list_built_during_an_invalidation_is_not_kept(
+    app, client, admin_headers, user, monkeypatch
+):
+    lot_a = create_lot(client, admin_headers, total_slots=3)
+    read_entries_a = parking_routes.read_lot_entries_a
+
+    def read_then_book(lot_ids):
+        # a booking lands (and is invalidated) after the entries were read
+        entries_a = read_entries_a(lot_ids)
+        booked_a = client.post(
+            f"/parking/lots/{lot_a['id']}/book-any",
+            json={"vehicle_number": "KA01"},
+            headers=user[1],
+        )
+        assert booked_a.status_code == 201
+        return entries_a
+
+    # warm the Redis entries (the id list rebuild does not store lots)
+    client.get("/parking/lots")
+    extensions.l1_cache.clear()
+    client.get("/parking/lots")
+    extensions.l1_cache.clear()
+    monkeypatch.setattr(parking_routes, "read_lot_entries_a", read_then_book)
+    assert client.get("/parking/lots").get_json()[0]["free_slots"] == 3
+    monkeypatch.setattr(parking_routes, "read_lot_entries_a", read_entries_a)
+
+    assert extensions.l1_get(lot_cache.lot_list_key_a()) is None
+    assert client.get("/parking/lots").get_json()[0]["free_slots"] == 2
+
+
+def test_listener_backs_off_while_redis_is_down(monkeypatch):
+    class Stop(BaseException):
+        pass
+
+    delays_a = []
+
+    def sleep(seconds):
+        delays_a.append(seconds)
+        if len(delays_a) == 8:
+            raise Stop()
+
+    def get_redis():
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(extensions, "get_redis", get_redis)
+    monkeypatch.setattr(extensions.time, "sleep", sleep)
+    monkeypatch.setattr(extensions, "_l1_max_backoff", 30)
+    with pytest.raises(Stop):
+        extensions._l1_listen_a()
+
+    assert delays_a == [1, 2, 4, 8, 16, 30, 30, 30]
@@ -0,0 +1,127 @@
+# backend/tests/test_lot_slots.py
+
+import time
+
+import pytest
+
+from conftest import count_queries, create_lot
+from extensions import db
+from models import ParkingLot, ParkingSlot
+from slot_pool import pool_key_a
+
+
+def _slots(app, lot_id):
+    with app.app_context():
+        return {
+            s.slot_number: s.id
+            for s in ParkingSlot.query.filter_by(lot_id=lot_id)
+        }
+
+
+def _counters(app, lot_id):
+    with app.app_context():
+        lot_a = db.session.get(ParkingLot, lot_id)
+        return lot_a.total_slots, lot_a.free_slots, lot_a.occupied_slots
+
+
+def _resize(client, admin_headers, lot_id, total):
+    return client.put(
+        f"/admin/parking-lots/{lot_id}",
+        json={"total_slots": total},
+        headers=admin_headers,
+    )
+
+
+@pytest.mark.parametrize("slots", [1, 10, 500])
+def test_create_lot_inserts_its_slots_in_one_statement(
+    app, client, admin_headers, redis_client, slots
+):
+    with count_queries(app) as statements_a:
+        lot_a = create_lot(client, admin_headers, total_slots=slots)
+
+    slot_inserts_a = [s for s in statements_a if s.startswith("INSERT INTO parking_slots")]
+    assert len(slot_inserts_a) == 1
+    assert set(_slots(app, lot_a["id"])) == {f"S{n}" for n in range(1, slots + 1)}
+    assert _counters(app, lot_a["id"]) == (slots, slots, 0)
+    assert redis_client.scard(pool_key_a(lot_a["id"])) == slots
+
+
+def test_grow_adds_slots_after_the_highest_number(
+    app, client, admin_headers, redis_client
+):
+    lot_a = create_lot(client, admin_headers, total_slots=3)
+
+    assert _resize(client, admin_headers, lot_a["id"], 6).status_code == 200
+
+    assert set(_slots(app, lot_a["id"])) == {f"S{n}" for n in range(1, 7)}
+    assert _counters(app, lot_a["id"]) == (6, 6, 0)
+    assert redis_client.scard(pool_key_a(lot_a["id"])) == 6
+
+
+def _book(client, headers, slot_id):
+    response_a = client.post(
+        "/parking/book",
+        json={"slot_id": slot_id, "vehicle_number": "KA01"},
+        headers=headers,
+    )
+    assert response_a.status_code == 201
+    return response_a.get_json()["booking_id"]
+
+
+def test_shrink_removes_free_never_booked_slots(
+    app, client, admin_headers, user, redis_client
+):
+    lot_a = create_lot(client, admin_headers, total_slots=4)
+    _book(client, user[1], _slots(app, lot_a["id"])["S4"])
+
+    assert _resize(client, admin_headers, lot_a["id"], 2).status_code == 200
+
+    slots_a = _slots(app, lot_a["id"])
+    assert set(slots_a) == {"S1", "S4"}
+    assert _counters(app, lot_a["id"]) == (2, 1, 1)
+    assert {int(s) for s in redis_client.smembers(pool_key_a(lot_a["id"]))} == {
+        slots_a["S1"]
+    }
+
+
+def test_shrink_is_rejected_when_too_few_slots_can_go(
+    app, client, admin_headers, user
+):
+    lot_a = create_lot(client, admin_headers, total_slots=3)
+    slots_a = _slots(app, lot_a["id"])
+    _book(client, user[1], slots_a["S2"])
+    # S3 is free again but has booking history: it stays
+    released_a = client.post(
+        "/parking/release",
+        json={"booking_id": _book(client, user[1], slots_a["S3"])},
+        headers=user[1],
+    )
+    assert released_a.status_code == 200
+
+    assert _resize(client, admin_headers, lot_a["id"], 1).status_code == 400
+
+    assert set(_slots(app, lot_a["id"])) == {"S1", "S2", "S3"}
+    assert _counters(app, lot_a["id"]) == (3, 2, 1)
+
+
+@pytest.mark.bench
+@pytest.mark.parametrize("slots", [100, 5_000, 50_000])
+def test_bench_create_and_resize_lot(app, client, admin_headers, slots):
+    started_a = time.perf_counter()
+    lot_a = create_lot(client, admin_headers, total_slots=slots)
+    created_a = time.perf_counter() - started_a
+
+    started_a = time.perf_counter()
+    assert _resize(client, admin_headers, lot_a["id"], slots * 2).status_code == 200
+    grown_a = time.perf_counter() - started_a
+
+    started_a = time.perf_counter()
+    assert _resize(client, admin_headers, lot_a["id"], slots).status_code == 200
+    shrunk_a = time.perf_counter() - started_a
+
+    assert _counters(app, lot_a["id"]) == (slots, slots, 0)
+    print(
+        f"\n[BENCH] {slots:>6} slots: create {created_a * 1000:.0f} ms, "
+        f"grow +{slots} {grown_a * 1000:.0f} ms, shrink -{slots} "
+        f"{shrunk_a * 1000:.0f} ms (pool and bitmap seeding included)"
+    )
@@ -0,0 +1,68 @@
+# backend/tests/test_lot_summary.py
+
+import time
+
+import pytest
+
+import extensions
+from conftest import count_queries, create_lot
+
+
+def _cold_get(app, client, url, headers=None):
+    """GET url with empty Redis / L1 caches; returns (response, queries, seconds)."""
+    extensions.redis_client_a.flushall()
+    extensions.l1_cache.clear()
+    with count_queries(app) as statements_a:
+        started_a = time.perf_counter()
+        response_a = client.get(url, headers=headers)
+        elapsed_a = time.perf_counter() - started_a
+    assert response_a.status_code == 200
+    return response_a, len(statements_a), elapsed_a
+
+
+def _listing_costs(app, client, admin_headers, lots):
+    for i in range(lots):
+        create_lot(client, admin_headers, total_slots=3, name=f"Lot {i}")
+    admin_a = _cold_get(app, client, "/admin/parking-lots", admin_headers)
+    user_a = _cold_get(app, client, "/parking/lots")
+    assert len(admin_a[0].get_json()) == len(user_a[0].get_json()) == lots
+    return admin_a[1:], user_a[1:]
+
+
+@pytest.mark.parametrize("lots", [1, 20])
+def test_lot_listings_run_a_fixed_number_of_queries(app, client, admin_headers, lots):
+    (admin_queries, _), (user_queries, _) = _listing_costs(
+        app, client, admin_headers, lots
+    )
+    # one lot query each, whatever the number of lots (was 2N+1)
+    assert admin_queries == 1
+    assert user_queries == 1
+
+
+def test_lot_listings_report_counters(app, client, admin_headers, user):
+    lot_a = create_lot(client, admin_headers, total_slots=4)
+    _, headers_a = user
+    booked_a = client.post(
+        f"/parking/lots/{lot_a['id']}/book-any",
+        json={"vehicle_number": "KA01"},
+        headers=headers_a,
+    )
+    assert booked_a.status_code == 201
+
+    admin_lot_a = client.get("/admin/parking-lots", headers=admin_headers).get_json()[0]
+    user_lot_a = client.get("/parking/lots").get_json()[0]
+    assert (admin_lot_a["total_slots"], admin_lot_a["free_slots"]) == (4, 3)
+    assert user_lot_a["free_slots"] == 3
+
+
+@pytest.mark.bench
+@pytest.mark.parametrize("lots", [10, 100, 500])
+def test_bench_lot_listings(app, client, admin_headers, lots):
+    (admin_queries, admin_s), (user_queries, user_s) = _listing_costs(
+        app, client, admin_headers, lots
+    )
+    print(
+        f"\n[BENCH] {lots:>4} lots: /admin/parking-lots {admin_queries} queries "
+        f"{admin_s * 1000:.1f} ms, /parking/lots {user_queries} queries "
+        f"{user_s * 1000:.1f} ms (cold cache)"
+    )
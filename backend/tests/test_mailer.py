@@ -0,0 +1,185 @@
+# backend/tests/test_mailer.py
+
+import smtplib
+import socket
+import threading
+import time
+
+import pytest
+
+from mailer import Mailer
+
+controller_mod = pytest.importorskip("aiosmtpd.controller")
+
+# -------------------------------------------------
+# A LOCAL SMTP SERVER (aiosmtpd) THAT CAN REFUSE ON CUE
+# -------------------------------------------------
+# replies: {recipient: ["421 ...", ...]} answered (one per attempt) to
+# DATA for that recipient before it is finally accepted.
+
+
+def _free_port():
+    """A port nothing listens on (for the server, or as an unreachable one)."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.delivered = []
+        self.peers = set()
+        self.replies = {}
+
+    async def handle_DATA(self, server, session, envelope):
+        to_a = envelope.rcpt_tos[0]
+        with self.lock:
+            self.peers.add(session.peer)
+            queued_a = self.replies.get(to_a)
+            if queued_a:
+                return queued_a.pop(0)
+            self.delivered.append(to_a)
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp_server():
+    handler_a = RecordingHandler()
+    handler_a.port = _free_port()
+    controller_a = controller_mod.Controller(
+        handler_a, hostname="127.0.0.1", port=handler_a.port
+    )
+    controller_a.start()
+    yield handler_a
+    controller_a.stop()
+
+
+class TrackingMailer(Mailer):
+    """Mailer whose pool records every connection it opens."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.opened = []
+        connect_a = self.pool._connect
+
+        def connect():
+            conn = connect_a()
+            self.opened.append(conn)
+            return conn
+
+        self.pool._connect = connect
+
+
+def _mailer(port, **kwargs):
+    kwargs.setdefault("pool_size", 2)
+    kwargs.setdefault("backoff_seconds", 0)
+    return TrackingMailer("127.0.0.1", port, "noreply@test.invalid", **kwargs)
+
+
+def _messages(n, prefix="user"):
+    return [(f"{prefix}{i}@test.invalid", "Subject", "<p>hi</p>") for i in range(n)]
+
+
+def test_batch_goes_over_one_connection(smtp_server):
+    mailer_a = _mailer(smtp_server.port)
+
+    assert mailer_a.send_batch(_messages(20)) == 20
+    assert mailer_a.send_batch(_messages(5, "again")) == 5
+
+    assert len(smtp_server.delivered) == 25
+    assert len(mailer_a.opened) == len(smtp_server.peers) == 1
+    mailer_a.pool.close_all()
+
+
+def test_temporary_reply_is_retried_on_a_new_connection(smtp_server):
+    smtp_server.replies["user1@test.invalid"] = ["421 4.3.0 try again later"]
+    mailer_a = _mailer(smtp_server.port)
+
+    assert mailer_a.send_batch(_messages(3)) == 3
+
+    assert smtp_server.delivered == [f"user{i}@test.invalid" for i in range(3)]
+    assert len(mailer_a.opened) == 2
+    mailer_a.pool.close_all()
+    # the connection given up on was closed, not leaked
+    assert all(conn.sock is None for conn in mailer_a.opened)
+
+
+def test_permanent_reply_skips_only_that_message(smtp_server):
+    smtp_server.replies["user1@test.invalid"] = ["550 5.1.1 no such user"]
+    mailer_a = _mailer(smtp_server.port)
+
+    assert mailer_a.send_batch(_messages(3)) == 2
+
+    assert smtp_server.delivered == ["user0@test.invalid", "user2@test.invalid"]
+    assert len(mailer_a.opened) == 1
+    mailer_a.pool.close_all()
+
+
+def test_retries_that_run_out_leave_no_connection_open(smtp_server):
+    smtp_server.replies["user0@test.invalid"] = ["421 busy"] * 10
+    mailer_a = _mailer(smtp_server.port, max_retries=2)
+
+    assert mailer_a.send_batch(_messages(1)) == 0
+
+    mailer_a.pool.close_all()
+    assert len(mailer_a.opened) == 3
+    assert all(conn.sock is None for conn in mailer_a.opened)
+
+
+def test_unreachable_server_does_not_raise_or_hold_pool_slots():
+    mailer_a = _mailer(_free_port(), pool_size=1, max_retries=1)
+    results_a = []
+
+    def send_twice():
+        for _ in range(2):
+            results_a.append(mailer_a.send_batch(_messages(2)))
+
+    sender_a = threading.Thread(target=send_twice, daemon=True)
+    sender_a.start()
+    sender_a.join(timeout=10)
+
+    # a leaked slot would block the second batch in acquire()
+    assert not sender_a.is_alive()
+    assert results_a == [0, 0]
+
+
+def _naive_send(port, messages):
+    """Baseline: one SMTP session per message, as before the pool."""
+    for to_email, subject, html_body in messages:
+        conn = smtplib.SMTP("127.0.0.1", port, timeout=10)
+        try:
+            conn.sendmail("noreply@test.invalid", [to_email], html_body)
+        finally:
+            conn.quit()
+
+
+@pytest.mark.bench
+@pytest.mark.parametrize("count", [200, 1000])
+def test_bench_pooled_vs_per_message_sessions(smtp_server, count):
+    messages_a = _messages(count)
+
+    started_a = time.perf_counter()
+    _naive_send(smtp_server.port, messages_a)
+    naive_s = time.perf_counter() - started_a
+
+    mailer_a = _mailer(smtp_server.port, pool_size=4)
+    batches_a = [messages_a[i:i + 100] for i in range(0, count, 100)]
+    threads_a = [
+        threading.Thread(target=mailer_a.send_batch, args=(batch,))
+        for batch in batches_a
+    ]
+    started_a = time.perf_counter()
+    for t in threads_a:
+        t.start()
+    for t in threads_a:
+        t.join()
+    pooled_s = time.perf_counter() - started_a
+    mailer_a.pool.close_all()
+
+    assert len(smtp_server.delivered) == 2 * count
+    print(
+        f"\n[BENCH] {count} mails: one session per mail {count / naive_s:.0f} msg/s, "
+        f"pooled batches of 100 on 4 connections {count / pooled_s:.0f} msg/s "
+        f"({len(mailer_a.opened)} connections opened)"
+    )
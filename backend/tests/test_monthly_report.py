@@ -0,0 +1,198 @@
+# backend/tests/test_monthly_report.py
+
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from conftest import create_lot, make_user
+from email_templates import render_stats_a
+from extensions import db
+from models import Booking, ParkingSlot, User
+
+
+@pytest.fixture
+def report_worker(worker, monkeypatch, tmp_path):
+    """celery_worker writing reports under tmp_path, mails collected."""
+    sent_a = []
+
+    def send_batch(messages):
+        sent_a.extend(messages)
+        return len(messages)
+
+    monkeypatch.setattr(worker, "reports_dir_a", lambda: str(tmp_path))
+    monkeypatch.setattr(worker, "send_email_batch_a", send_batch)
+    worker.sent = sent_a
+    return worker
+
+
+def _last_month():
+    first_of_month_a = datetime.utcnow().replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+    return (first_of_month_a - timedelta(days=1)).replace(day=1)
+
+
+def _slot_of(app, lot):
+    with app.app_context():
+        return ParkingSlot.query.filter_by(lot_id=lot["id"]).first().id
+
+
+def _book(user_id, slot_id, day, amount=10.0):
+    start_a = _last_month() + timedelta(days=day, hours=9)
+    return {
+        "user_id": user_id,
+        "slot_id": slot_id,
+        "vehicle_number": "KA01",
+        "start_time": start_a,
+        "end_time": start_a + timedelta(hours=1),
+        "amount": amount,
+        "status": "COMPLETED",
+    }
+
+
+def _insert(app, rows):
+    with app.app_context():
+        db.session.execute(insert(Booking), rows)
+        db.session.commit()
+
+
+def _insert_users(app, count):
+    with app.app_context():
+        db.session.execute(
+            insert(User),
+            [
+                {"name": f"u{i}", "email": f"u{i}@test.invalid", "password": "x"}
+                for i in range(count)
+            ],
+        )
+        db.session.commit()
+
+
+def _report_for(worker, tmp_path, user_id):
+    month_a = _last_month()
+    path_a = os.path.join(
+        tmp_path, f"monthly_report_user_{user_id}_{month_a:%Y_%m}.html"
+    )
+    with open(path_a, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_monthly_report_totals_and_top_lot(
+    app, client, admin_headers, report_worker, tmp_path
+):
+    # two lots share a name: the report counts them as one
+    north_a = [create_lot(client, admin_headers, name="North") for _ in range(2)]
+    south_a = create_lot(client, admin_headers, name="South")
+    north_slots_a = [_slot_of(app, lot) for lot in north_a]
+    south_slot_a = _slot_of(app, south_a)
+
+    user_id, _ = make_user(app, name="alice")
+    idle_id, _ = make_user(app, name="idle")
+    admin_id, _ = make_user(app, role="ADMIN", name="boss")
+    _insert(
+        app,
+        [
+            _book(user_id, south_slot_a, 0),
+            _book(user_id, south_slot_a, 1),
+            _book(user_id, north_slots_a[0], 2),
+            _book(user_id, north_slots_a[1], 3),
+            _book(user_id, north_slots_a[1], 4),
+            # slot gone: in the totals, not a top lot
+            _book(user_id, 9999, 5, amount=5.0),
+            _book(admin_id, south_slot_a, 6),
+        ],
+    )
+
+    generated_a = report_worker.send_monthly_activity_report_a()
+
+    # every user gets a report and a mail, admins included
+    with app.app_context():
+        users_a = User.query.count()
+    assert generated_a == len(report_worker.sent) == users_a
+
+    alice_a = _report_for(report_worker, tmp_path, user_id)
+    assert "Total bookings: 6" in alice_a
+    assert "55.00" in alice_a
+    assert "Most used parking lot: North" in alice_a
+
+    assert "Most used parking lot: South" in _report_for(
+        report_worker, tmp_path, admin_id
+    )
+    assert "No bookings this month" in _report_for(report_worker, tmp_path, idle_id)
+
+
+def test_monthly_report_tie_goes_to_the_lot_booked_first(
+    app, client, admin_headers, report_worker, tmp_path
+):
+    # "Zeta" has the lower lot id, "Alpha" is booked first this month
+    zeta_a = create_lot(client, admin_headers, name="Zeta")
+    alpha_a = create_lot(client, admin_headers, name="Alpha")
+    user_id, _ = make_user(app, name="bob")
+    _insert(
+        app,
+        [
+            _book(user_id, _slot_of(app, alpha_a), 0),
+            _book(user_id, _slot_of(app, zeta_a), 1),
+        ],
+    )
+
+    report_worker.send_monthly_activity_report_a()
+
+    assert "Most used parking lot: Alpha" in _report_for(
+        report_worker, tmp_path, user_id
+    )
+
+
+@pytest.mark.bench
+@pytest.mark.parametrize("bookings", [100_000, 1_000_000])
+def test_bench_monthly_report(
+    app, client, admin_headers, report_worker, tmp_path, bookings
+):
+    users_a = 1000
+    lots_a = [create_lot(client, admin_headers, total_slots=1) for _ in range(20)]
+    slots_a = [_slot_of(app, lot) for lot in lots_a]
+    # plain rows: a bcrypt hash per user would dominate the setup
+    _insert_users(app, users_a)
+    with app.app_context():
+        user_ids_a = [u for (u,) in db.session.query(User.id).filter_by(role="USER")]
+    for start_a in range(0, bookings, 50_000):
+        _insert(
+            app,
+            [
+                _book(
+                    user_ids_a[i % users_a],
+                    slots_a[(i * 7) % len(slots_a)],
+                    i % 27,
+                )
+                for i in range(start_a, min(start_a + 50_000, bookings))
+            ],
+        )
+
+    started_a = time.perf_counter()
+    generated_a = report_worker.send_monthly_activity_report_a()
+    elapsed_a = time.perf_counter() - started_a
+
+    assert generated_a == users_a + 1
+    print(
+        f"\n[BENCH] monthly report, {bookings} bookings / {users_a} users: "
+        f"{elapsed_a:.2f}s ({bookings / elapsed_a:.0f} bookings/s, "
+        f"{generated_a / elapsed_a:.0f} reports/s)"
+    )
+
+
+def test_each_report_is_rendered_once_and_mailed_as_saved(
+    app, report_worker, tmp_path
+):
+    user_ids_a = [make_user(app, name=f"r{i}")[0] for i in range(3)]
+    before_a = render_stats_a().get("monthly_report.html", {}).get("renders", 0)
+
+    assert report_worker.send_monthly_activity_report_a() == 3
+
+    assert render_stats_a()["monthly_report.html"]["renders"] == before_a + 3
+    mailed_a = [body for _, _, body in report_worker.sent]
+    assert mailed_a == [
+        _report_for(report_worker, tmp_path, user_id) for user_id in user_ids_a
+    ]
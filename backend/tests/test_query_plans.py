@@ -0,0 +1,15 @@
+# backend/tests/test_query_plans.py
+
+import pytest
+
+from query_plans import HOT_QUERIES_A, check_query_plans_a
+
+
+@pytest.mark.parametrize("live", [False, True], ids=["models", "app-db"])
+def test_hot_queries_use_their_index(app, live):
+    with app.app_context():
+        results_a = check_query_plans_a(live=live)
+
+    assert len(results_a) == len(HOT_QUERIES_A)
+    missed_a = {r["query"]: (r["index"], r["plan"]) for r in results_a if not r["ok"]}
+    assert missed_a == {}
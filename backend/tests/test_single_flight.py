@@ -0,0 +1,127 @@
+# backend/tests/test_single_flight.py
+
+import threading
+import time
+
+import pytest
+
+import extensions
+from conftest import create_lot
+from extensions import cache_get, cache_get_or_compute, cache_set
+from routes import parking_routes
+
+
+def _concurrently(n, target):
+    """Run target() from n threads released together; returns the results."""
+    barrier_a = threading.Barrier(n)
+    results_a = [None] * n
+
+    def run(i):
+        barrier_a.wait()
+        results_a[i] = target()
+
+    threads_a = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads_a:
+        t.start()
+    for t in threads_a:
+        t.join()
+    return results_a
+
+
+class SlowCompute:
+    def __init__(self, seconds=0.1):
+        self.seconds = seconds
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+            n = self.calls
+        time.sleep(self.seconds)
+        return f"value-{n}"
+
+
+def test_cold_key_is_computed_once(app):
+    compute_a = SlowCompute()
+
+    results_a = _concurrently(20, lambda: cache_get_or_compute("k", compute_a, ex=60))
+
+    assert compute_a.calls == 1
+    assert set(results_a) == {"value-1"}
+
+
+def test_stale_key_is_refreshed_once_and_served_meanwhile(app, redis_client):
+    cache_set("k", "old", ex=60, delta=0.01, stale_ttl=30)
+    redis_client.hset("k", "x", time.time() - 1)     # past its logical expiry
+    compute_a = SlowCompute()
+
+    results_a = _concurrently(20, lambda: cache_get_or_compute("k", compute_a, ex=60))
+
+    assert compute_a.calls == 1
+    assert results_a.count("value-1") == 1
+    assert results_a.count("old") == 19
+    assert cache_get("k", beta=1.0) == ("value-1", True)
+
+
+def test_early_refresh_before_expiry(app, monkeypatch):
+    cache_set("k", "v", ex=5, delta=2.0, stale_ttl=30)
+
+    # XFetch: -delta * beta * ln(1 - rand) against the time left (5s)
+    monkeypatch.setattr(extensions.random, "random", lambda: 0.5)
+    assert cache_get("k", beta=1.0) == ("v", True)       # 1.4s early
+    monkeypatch.setattr(extensions.random, "random", lambda: 0.99)
+    assert cache_get("k", beta=1.0) == ("v", False)      # 9.2s early
+
+
+def test_redis_errors_fall_back_to_compute(app, monkeypatch):
+    def broken():
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(extensions, "get_redis", broken)
+    assert cache_get_or_compute("k", lambda: "computed") == "computed"
+
+
+def test_cold_lot_list_is_rebuilt_once(app, client, admin_headers, monkeypatch):
+    for i in range(3):
+        create_lot(client, admin_headers, name=f"Lot {i}")
+    extensions.redis_client_a.flushall()
+    extensions.l1_cache.clear()
+
+    calls_a = []
+    lots_query_a = parking_routes.lots_query_a
+
+    def counted(pin_code=None):
+        calls_a.append(pin_code)
+        time.sleep(0.05)
+        return lots_query_a(pin_code)
+
+    monkeypatch.setattr(parking_routes, "lots_query_a", counted)
+    responses_a = _concurrently(
+        20, lambda: app.test_client().get("/parking/lots").get_json()
+    )
+
+    assert len(calls_a) == 1
+    assert all(len(lots) == 3 for lots in responses_a)
+
+
+@pytest.mark.bench
+@pytest.mark.parametrize("callers", [20, 100])
+def test_bench_cold_key_single_flight_vs_direct(app, callers):
+    def timed(target):
+        started_a = time.perf_counter()
+        target()
+        return time.perf_counter() - started_a
+
+    single_a = SlowCompute(0.05)
+    single_s = _concurrently(
+        callers, lambda: timed(lambda: cache_get_or_compute("k", single_a, ex=60))
+    )
+    direct_a = SlowCompute(0.05)
+    direct_s = _concurrently(callers, lambda: timed(direct_a))
+
+    print(
+        f"\n[BENCH] {callers} callers on a cold key (50 ms compute): single-flight "
+        f"{single_a.calls} compute(s), max {max(single_s) * 1000:.0f} ms; direct "
+        f"{direct_a.calls} computes, max {max(direct_s) * 1000:.0f} ms"
+    )
@@ -0,0 +1,64 @@
+# backend/tests/test_slot_listing.py
+
+import pytest
+
+from conftest import create_lot, make_user
+from db_routing import replicate_sqlite_a
+
+
+@pytest.mark.parametrize("query", ["", "?format=bitmap", "?since_version=0"])
+def test_unchanged_lot_is_answered_with_304(client, admin_headers, query):
+    lot_a = create_lot(client, admin_headers)
+    url_a = f"/parking/lots/{lot_a['id']}/slots{query}"
+
+    first_a = client.get(url_a)
+    assert first_a.status_code == 200
+    again_a = client.get(url_a, headers={"If-None-Match": first_a.headers["ETag"]})
+    assert again_a.status_code == 304
+
+
+@pytest.mark.parametrize(
+    "change", [{"name": "Renamed"}, {"address": "Street 2"}, {"price_per_hour": 25}]
+)
+@pytest.mark.parametrize("query", ["", "?format=bitmap"])
+def test_lot_edit_changes_the_etag(client, admin_headers, change, query):
+    lot_a = create_lot(client, admin_headers)
+    url_a = f"/parking/lots/{lot_a['id']}/slots{query}"
+    etag_a = client.get(url_a).headers["ETag"]
+
+    edited_a = client.put(
+        f"/admin/parking-lots/{lot_a['id']}", json=change, headers=admin_headers
+    )
+    assert edited_a.status_code == 200
+
+    # no slot changed, but the embedded lot did: no stale 304
+    after_a = client.get(url_a, headers={"If-None-Match": etag_a})
+    assert after_a.status_code == 200
+    field_a, value_a = next(iter(change.items()))
+    assert after_a.get_json()["lot"][field_a] == value_a
+
+
+def test_bitmap_free_slots_use_the_primary_total(make_app, tmp_path):
+    primary_a = f"sqlite:///{tmp_path / 'primary.db'}"
+    replica_a = f"sqlite:///{tmp_path / 'replica.db'}"
+    app_a = make_app(primary_a, SQLALCHEMY_REPLICA_URIS=[replica_a])
+    client_a = app_a.test_client()
+    admin_a = make_user(app_a, role="ADMIN", name="admin")[1]
+    user_a = make_user(app_a)[1]
+
+    lot_a = create_lot(client_a, admin_a, total_slots=2)
+    replicate_sqlite_a(primary_a, [replica_a])
+    # the replica now lags: it still has 2 slots, the primary 4 (1 booked)
+    assert client_a.put(
+        f"/admin/parking-lots/{lot_a['id']}", json={"total_slots": 4}, headers=admin_a
+    ).status_code == 200
+    assert client_a.post(
+        f"/parking/lots/{lot_a['id']}/book-any",
+        json={"vehicle_number": "KA01"},
+        headers=user_a,
+    ).status_code == 201
+
+    body_a = client_a.get(f"/parking/lots/{lot_a['id']}/slots?format=bitmap").get_json()
+    assert body_a["lot"]["free_slots"] == 2         # the replica's row
+    assert body_a["occupied_slots"] == 1
+    assert body_a["free_slots"] == 3
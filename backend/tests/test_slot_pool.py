@@ -0,0 +1,75 @@
+# backend/tests/test_slot_pool.py
+
+from conftest import create_lot
+from extensions import db
+from models import ParkingSlot
+from occupancy import claim_slot_a
+from slot_pool import pool_add_a, pool_key_a, sync_pool_changes_a
+
+
+def _pool(redis_client, lot_id):
+    return {int(s) for s in redis_client.smembers(pool_key_a(lot_id))}
+
+
+def _slot_ids(app, lot_id):
+    with app.app_context():
+        return [
+            s.id
+            for s in ParkingSlot.query.filter_by(lot_id=lot_id).order_by(ParkingSlot.id)
+        ]
+
+
+def test_late_release_does_not_put_a_booked_slot_back(
+    app, client, admin_headers, user, redis_client
+):
+    lot_a = create_lot(client, admin_headers, total_slots=2)
+    slot_id, other_id = _slot_ids(app, lot_a["id"])
+    booked_a = client.post(
+        "/parking/book",
+        json={"slot_id": slot_id, "vehicle_number": "KA01"},
+        headers=user[1],
+    )
+    assert booked_a.status_code == 201
+    assert _pool(redis_client, lot_a["id"]) == {other_id}
+
+    # a release of slot_id committed before that booking, synced only now
+    with app.app_context():
+        sync_pool_changes_a([(lot_a["id"], slot_id, False)])
+
+    assert _pool(redis_client, lot_a["id"]) == {other_id}
+
+
+def test_release_and_deleted_slots_follow_the_committed_rows(
+    app, client, admin_headers, redis_client
+):
+    lot_a = create_lot(client, admin_headers, total_slots=2)
+    slot_id, _ = _slot_ids(app, lot_a["id"])
+    redis_client.delete(pool_key_a(lot_a["id"]))
+
+    with app.app_context():
+        # free in the DB: added even though the change says "occupied"
+        sync_pool_changes_a([(lot_a["id"], slot_id, True)])
+        assert _pool(redis_client, lot_a["id"]) == {slot_id}
+
+        pool_add_a(lot_a["id"], [9999])
+        sync_pool_changes_a([(lot_a["id"], 9999, False)])
+    assert _pool(redis_client, lot_a["id"]) == {slot_id}
+
+
+def test_lost_claim_drops_the_slot_from_the_pool(
+    app, client, admin_headers, user, redis_client
+):
+    lot_a = create_lot(client, admin_headers, total_slots=2)
+    slot_id, other_id = _slot_ids(app, lot_a["id"])
+    assert client.post(
+        "/parking/book",
+        json={"slot_id": slot_id, "vehicle_number": "KA01"},
+        headers=user[1],
+    ).status_code == 201
+    pool_add_a(lot_a["id"], [slot_id])      # left there by a late update
+
+    with app.app_context():
+        assert claim_slot_a(slot_id, lot_a["id"]) is False
+        db.session.rollback()
+
+    assert _pool(redis_client, lot_a["id"]) == {other_id}
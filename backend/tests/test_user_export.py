@@ -0,0 +1,163 @@
+# backend/tests/test_user_export.py
+
+import builtins
+import csv
+import gzip
+import io
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from conftest import create_lot
+from extensions import db
+from models import Booking, ParkingSlot
+
+
+def _insert_bookings(app, user_id, slot_id, count):
+    start_a = datetime(2024, 1, 1, 8)
+    rows_a = [
+        {
+            "user_id": user_id,
+            "slot_id": slot_id,
+            "vehicle_number": f"KA01-{i % 50:02d}",
+            "start_time": start_a + timedelta(minutes=i),
+            "end_time": None if i % 10 == 0 else start_a + timedelta(minutes=i + 30),
+            "amount": 0.0 if i % 10 == 0 else round(10 + i % 7 * 2.5, 2),
+            "status": "ACTIVE" if i % 10 == 0 else "COMPLETED",
+        }
+        for i in range(count)
+    ]
+    with app.app_context():
+        for start in range(0, count, 50_000):
+            db.session.execute(insert(Booking), rows_a[start:start + 50_000])
+        db.session.commit()
+
+
+def _export(client, headers, file_format):
+    """Start an export (runs in-process) and download it: (response, seconds)."""
+    started_a = time.perf_counter()
+    job_a = client.post(
+        "/api/exports/bookings", json={"format": file_format}, headers=headers
+    ).get_json()
+    elapsed_a = time.perf_counter() - started_a
+    return client.get(f"/api/exports/bookings/{job_a['export_id']}", headers=headers), elapsed_a
+
+
+def _csv_rows(data, file_format):
+    if file_format == "csv.gz":
+        data = gzip.decompress(data)
+    return list(csv.DictReader(io.StringIO(data.decode("utf-8"))))
+
+
+@pytest.fixture
+def booked_user(app, client, admin_headers, user):
+    lot_a = create_lot(client, admin_headers, total_slots=1)
+    with app.app_context():
+        slot_id_a = ParkingSlot.query.filter_by(lot_id=lot_a["id"]).one().id
+    return user[0], user[1], slot_id_a
+
+
+@pytest.mark.parametrize("file_format", ["csv", "csv.gz"])
+def test_csv_exports_contain_every_booking(
+    app, client, eager_worker, booked_user, file_format
+):
+    user_id, headers, slot_id = booked_user
+    _insert_bookings(app, user_id, slot_id, 25)
+
+    response_a, _ = _export(client, headers, file_format)
+
+    assert response_a.status_code == 200
+    rows_a = _csv_rows(response_a.data, file_format)
+    assert len(rows_a) == 25
+    assert rows_a[0]["end_time"] == "" and rows_a[1]["amount"] == "12.5"
+
+
+def test_parquet_export_is_typed_and_matches_csv(
+    app, client, eager_worker, booked_user
+):
+    pq = pytest.importorskip("pyarrow.parquet")
+    user_id, headers, slot_id = booked_user
+    _insert_bookings(app, user_id, slot_id, 25)
+
+    csv_a = _csv_rows(_export(client, headers, "csv")[0].data, "csv")
+    response_a, _ = _export(client, headers, "parquet")
+
+    assert response_a.status_code == 200
+    assert response_a.mimetype == "application/vnd.apache.parquet"
+    table_a = pq.read_table(io.BytesIO(response_a.data))
+    types_a = {f.name: str(f.type) for f in table_a.schema}
+    assert types_a["booking_id"] == "int64"
+    assert types_a["start_time"] == "timestamp[us]"
+    assert types_a["amount"] == "double"
+    assert types_a["status"].startswith("dictionary")
+
+    rows_a = table_a.to_pylist()
+    assert [r["booking_id"] for r in rows_a] == [int(r["booking_id"]) for r in csv_a]
+    assert rows_a[0]["end_time"] is None and rows_a[0]["status"] == "ACTIVE"
+    assert rows_a[1]["amount"] == 12.5
+    assert rows_a[1]["start_time"].isoformat() == csv_a[1]["start_time"]
+
+
+def test_parquet_export_fails_cleanly_without_pyarrow(
+    app, client, eager_worker, booked_user, monkeypatch
+):
+    real_import_a = builtins.__import__
+
+    def no_pyarrow(name, *args, **kwargs):
+        if name.startswith("pyarrow"):
+            raise ImportError(name)
+        return real_import_a(name, *args, **kwargs)
+
+    user_id, headers, slot_id = booked_user
+    _insert_bookings(app, user_id, slot_id, 3)
+    monkeypatch.setattr(builtins, "__import__", no_pyarrow)
+
+    response_a, _ = _export(client, headers, "parquet")
+
+    body_a = response_a.get_json()
+    assert body_a["status"] == "FAILED"
+    assert "pyarrow" in body_a["error_message"]
+
+
+def _load_seconds(path, file_format):
+    """Time to read every amount back (what an analytics load would do)."""
+    started_a = time.perf_counter()
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+
+        amounts_a = pq.read_table(path, columns=["amount"])["amount"].to_pylist()
+        total_a = sum(amounts_a)
+    else:
+        opener_a = gzip.open if file_format == "csv.gz" else open
+        with opener_a(path, "rt", newline="") as f:
+            total_a = sum(float(r["amount"]) for r in csv.DictReader(f))
+    return time.perf_counter() - started_a, total_a
+
+
+@pytest.mark.bench
+@pytest.mark.parametrize("bookings", [100_000, 500_000])
+def test_bench_export_formats(
+    app, client, eager_worker, booked_user, tmp_path, bookings
+):
+    pytest.importorskip("pyarrow")
+    user_id, headers, slot_id = booked_user
+    _insert_bookings(app, user_id, slot_id, bookings)
+
+    totals_a = set()
+    for file_format in ("csv", "csv.gz", "parquet"):
+        response_a, write_s = _export(client, headers, file_format)
+        assert response_a.status_code == 200
+        path_a = os.path.join(tmp_path, f"bench.{file_format}")
+        with open(path_a, "wb") as f:
+            f.write(response_a.data)
+        load_s, total_a = _load_seconds(path_a, file_format)
+        totals_a.add(round(total_a, 2))
+        print(
+            f"\n[BENCH] {bookings} bookings {file_format:>7}: "
+            f"{os.path.getsize(path_a) / 1024:8.0f} KB, export {write_s:.2f}s, "
+            f"load amounts {load_s * 1000:.0f} ms"
+        )
+    assert len(totals_a) == 1
@@ -1,8 +1,31 @@
 // src/userStore.js
 import { ref } from "vue";
+import axios from "axios";
 
 export const currentUser = ref(null);
 
+// every API call carries the signed token from login / register
+function applyAuthHeader(user) {
+  if (user && user.token) {
+    axios.defaults.headers.common.Authorization = `Bearer ${user.token}`;
+  } else {
+    delete axios.defaults.headers.common.Authorization;
+  }
+}
+
+// an expired or revoked token: forget the user so the app asks to login
+axios.interceptors.response.use(
+  (res) => res,
+  (err) => {
+    if (err.response && err.response.status === 401 && currentUser.value) {
+      currentUser.value = null;
+      localStorage.removeItem("vps_user");
+      applyAuthHeader(null);
+    }
+    return Promise.reject(err);
+  }
+);
+
 // load user from localStorage when app starts
 export function loadUserFromStorage() {
   try {
@@ -12,14 +35,34 @@ export function loadUserFromStorage() {
     console.error("Failed to load user from storage", e);
     currentUser.value = null;
   }
+  applyAuthHeader(currentUser.value);
+}
+
+// user: the "user" of the login / register response, token: its "token"
+export function saveUserToStorage(user, token) {
+  const stored = { ...user, token };
+  currentUser.value = stored;
+  localStorage.setItem("vps_user", JSON.stringify(stored));
+  applyAuthHeader(stored);
 }
 
-export function saveUserToStorage(user) {
-  currentUser.value = user;
-  localStorage.setItem("vps_user", JSON.stringify(user));
+// query string for links that cannot send headers (file downloads)
+export function authTokenParam() {
+  const token = currentUser.value && currentUser.value.token;
+  return token ? `?token=${encodeURIComponent(token)}` : "";
 }
 
 export function logoutUser() {
+  // revoke the token server-side; the local logout does not wait for it
+  const token = currentUser.value && currentUser.value.token;
+  if (token) {
+    axios
+      .post("http://127.0.0.1:5000/auth/logout", null, {
+        headers: { Authorization: `Bearer ${token}` },
+      })
+      .catch(() => {});
+  }
   currentUser.value = null;
   localStorage.removeItem("vps_user");
+  applyAuthHeader(null);
 }